@@ -1,2 +1,5 @@
 from nornir_volumecontroller.factory import CreateVolumeController
 from nornir_volumecontroller.base_objects import Volume
+from nornir_volumecontroller.cache import TransformCache, ChunkCache
+from nornir_volumecontroller.baked import BakedStore, BakedVolume
+from nornir_volumecontroller.sparse import SparseVolumeData
@@ -0,0 +1,370 @@
+'''
+Functions that assemble the image of one channel of one section.
+
+These are module level functions, rather than methods of
+:class:`~nornir_volumecontroller.base_objects.Volume`, so they can be
+submitted to a process pool.
+'''
+
+import os
+
+import numpy
+import scipy.ndimage
+
+from nornir_imageregistration import iBox
+
+from . import spatial
+from .cache import TransformCache
+
+# Output types GetData can produce.  Integer types hold intensities in [0, 1] scaled to their full range.
+SupportedOutputDTypes = (numpy.uint8, numpy.uint16, numpy.float16, numpy.float32)
+DefaultOutputDType = numpy.float32
+
+# Pixels converted at once when writing into an integer output, bounds the float32 temporary
+ConvertBlockPixels = 1 << 16
+
+# Transform cache used by worker processes, which cannot share the cache of the volume in the parent process
+_process_transform_cache = None
+
+
+def AssembleRegion(mosaic, tilesPath, region, return_mask=False):
+    '''Assemble the tiles of a mosaic inside a region at the resolution of the tiles
+    :param Mosaic mosaic: Channel to volume mosaic
+    :param str tilesPath: Directory containing the tiles of the pyramid level to assemble
+    :param ndarray region: Region to assemble in volume space as (minY, minX, maxY, maxX)
+    :param bool return_mask: Also return the coverage mask, True where a tile contributed to the pixel
+    :returns: Assembled image, or (image, mask) if return_mask is set
+    :rtype: ndarray
+    '''
+    [image, mask] = mosaic.AssembleTiles(tilesPath, FixedRegion=region, usecluster=False)
+    if return_mask:
+        return (image, mask)
+
+    return image
+
+
+# Tolerance when comparing a requested downsample to pyramid levels, so 4 - epsilon still selects level 4
+LevelTolerance = 1e-6
+
+
+def SelectLevel(levels, downsample):
+    '''Return the coarsest pyramid level whose resolution still meets the requested downsample
+    :param dict levels: {level downsample: tiles path}
+    :param float downsample: Requested downsample relative to full resolution
+    :returns: (level downsample, tiles path), the most detailed level if every level is too coarse
+    :rtype: tuple
+    '''
+    if len(levels) == 0:
+        raise ValueError("No pyramid levels available")
+
+    candidates = [level for level in levels.keys() if level <= downsample * (1.0 + LevelTolerance)]
+    if len(candidates) == 0:
+        level = min(levels.keys())
+    else:
+        level = max(candidates)
+
+    return (level, levels[level])
+
+
+def ResampleToShape(image, shape, region=None, level=None):
+    '''Resample an image to exactly the requested shape in a single pass.
+       When shrinking, the image is low-pass filtered first so the result is anti-aliased.
+       Pixel centers are aligned, so the corners of the input and output cover the same area.
+    :param tuple shape: Shape of the result, the last two axes are (rows, columns)
+    :param ndarray region: When given with level, the image covers the pixels of the level the (minY, minX, maxY, maxX)
+                           volume space region touches, see :func:`spatial.SnapRegion`.  Only the region is sampled, so
+                           the part of the edge pixels outside the region is not stretched into the result.
+    :param float level: Downsample of the pixels of the image
+    '''
+    shape = tuple([int(v) for v in shape])
+    if region is None:
+        if image.shape == shape:
+            return image
+
+        scale = numpy.array(image.shape, dtype=numpy.float64) / numpy.array(shape, dtype=numpy.float64)
+        origin = numpy.zeros(len(shape), dtype=numpy.float64)
+    else:
+        (scale, origin) = _RegionSampling(image, shape, region, level)
+        crop = _AlignedCrop(image, shape, scale, origin)
+        if crop is not None:
+            return crop
+
+    # Outputs are at most float32, so resampling in float64 would only double the memory of the temporaries
+    work_dtype = numpy.float32
+
+    # Gaussian sigma approximating the footprint of an output pixel on the input grid
+    sigma = numpy.maximum((scale - 1.0) / 2.0, 0)
+    if numpy.any(sigma > 0):
+        image = scipy.ndimage.gaussian_filter(image.astype(work_dtype, copy=False), sigma=sigma, mode='nearest')
+
+    return scipy.ndimage.affine_transform(image.astype(work_dtype, copy=False),
+                                          matrix=scale,
+                                          offset=origin + 0.5 * scale - 0.5,
+                                          output_shape=shape,
+                                          output=work_dtype,
+                                          order=1,
+                                          mode='nearest')
+
+
+def _RegionSampling(image, shape, region, level):
+    '''Return the (scale, origin) of each axis mapping output pixels onto the pixels of an image covering the snapped region.
+       Leading axes, such as the channels of a stack, are not scaled.'''
+    pixel_region = spatial.PixelRegion(region, level)
+    scale = numpy.ones(len(shape), dtype=numpy.float64)
+    origin = numpy.zeros(len(shape), dtype=numpy.float64)
+    for (iAxis, (iMin, iMax)) in zip((-2, -1), ((0, 2), (1, 3))):
+        scale[iAxis] = (region[iMax] - region[iMin]) / level / shape[iAxis]
+        origin[iAxis] = region[iMin] / level - pixel_region[iMin]
+
+    return (scale, origin)
+
+
+def _AlignedCrop(image, shape, scale, origin):
+    '''The pixels of the image that are the result, without resampling, when the output pixels are the image's pixels'''
+    offsets = numpy.rint(origin)
+    if not numpy.allclose(scale, 1.0, rtol=0, atol=spatial.PixelTolerance) or \
+       not numpy.allclose(origin, offsets, rtol=0, atol=spatial.PixelTolerance):
+        return None
+
+    if image.shape == shape and not numpy.any(offsets):
+        return image
+
+    slices = tuple([slice(int(offset), int(offset) + size) for (offset, size) in zip(offsets, shape)])
+    crop = image[slices]
+    return crop if crop.shape == shape else None
+
+
+def ResampleStackToShape(images, shape, region=None, level=None):
+    '''Resample several images to the requested shape, in a single pass when they have the same shape.
+       Each result matches :func:`ResampleToShape` of the corresponding image.
+    :returns: list of resampled images
+    '''
+    shape = tuple([int(v) for v in shape])
+    if len(images) == 1 or any([image.shape != images[0].shape for image in images]):
+        return [ResampleToShape(image, shape, region, level) for image in images]
+
+    if region is None and images[0].shape == shape:
+        return list(images)
+
+    # The channel axis has a scale of one, so it is neither filtered nor interpolated
+    stack = numpy.empty((len(images),) + images[0].shape, dtype=numpy.float32)
+    for (i, image) in enumerate(images):
+        stack[i] = image
+
+    stack = ResampleToShape(stack, (len(images),) + shape, region, level)
+    return [stack[i] for i in range(0, len(images))]
+
+
+def ResampleMaskToShape(mask, shape, region=None, level=None):
+    '''Resample a coverage mask to a shape, an output pixel is covered if at least half of the pixels it
+    is resampled from are.  region and level are those of :func:`ResampleToShape`.'''
+    mask = numpy.asarray(mask)
+    if region is None and mask.shape == tuple(shape):
+        return mask.astype(bool, copy=False)
+
+    return ResampleToShape(mask.astype(numpy.float32), shape, region, level) >= 0.5
+
+
+def AssembleChannel(mosaic, tilesPath, region, level, output_shape):
+    '''Assemble the tiles of a mosaic inside a region and resample the result to the output shape
+    :param Mosaic mosaic: Channel to volume mosaic
+    :param str tilesPath: Directory containing the tiles of the pyramid level to assemble
+    :param ndarray region: Region to assemble in volume space as (minY, minX, maxY, maxX), assembled on the
+                           pixel grid of the level, see :func:`spatial.SnapRegion`
+    :param float level: Downsample of the tiles in tilesPath
+    :param tuple output_shape: (rows, columns) of the output image covering the region
+    :returns: Assembled image
+    :rtype: ndarray
+    '''
+    level_region = spatial.SnapRegion(region, level)
+    image = FitToShape(AssembleRegion(mosaic, tilesPath, level_region), spatial.PixelShape(level_region, level))
+    return ResampleToShape(image, output_shape, region, level)
+
+
+def AssembleIndexedRegion(mosaic, tile_index, tilesPath, region, level):
+    '''Assemble only the tiles of a mosaic that intersect the region, using a spatial index of the tiles
+    :param TileIndex tile_index: Index of the mapped extent of the mosaic's tiles
+    :param float level: Downsample of the tiles in tilesPath, the region is assembled on the pixel grid of the level
+    '''
+    region = spatial.SnapRegion(region, level)
+    region_mosaic = spatial.MosaicForRegion(mosaic, tile_index, region)
+    if region_mosaic is None:
+        return EmptyRegionImage(region, level)
+
+    return FitToShape(AssembleRegion(region_mosaic, tilesPath, region), spatial.PixelShape(region, level))
+
+
+def EmptyRegionImage(region, level):
+    '''Image of zeros covering a region at a pyramid level, used where no tile intersects the region'''
+    return numpy.zeros(spatial.PixelShape(region, level), dtype=numpy.float32)
+
+
+def TileBytes(tilesPath, tile_names):
+    '''Total size of the tile files that will be read to assemble the named tiles'''
+    total = 0
+    for tile_name in tile_names:
+        try:
+            total += os.path.getsize(os.path.join(tilesPath, tile_name))
+        except OSError:
+            pass
+
+    return total
+
+
+def AssembleChannelFromFile(transform_path, tilesPath, region, level, output_shape):
+    '''Same as :func:`AssembleChannel`, but loads the mosaic through a cache local to the calling process'''
+    global _process_transform_cache
+    if _process_transform_cache is None:
+        _process_transform_cache = TransformCache()
+
+    (mosaic, tile_index) = _process_transform_cache.GetTileIndex(transform_path)
+    image = AssembleIndexedRegion(mosaic, tile_index, tilesPath, region, level)
+    return ResampleToShape(image, output_shape, region, level)
+
+
+def FitToShape(image, shape):
+    '''Crop or zero pad an image so it has exactly the requested shape'''
+    shape = tuple(shape)
+    if image is None:
+        return numpy.zeros(shape, dtype=numpy.float32)
+
+    if image.shape == shape:
+        return image
+
+    output = numpy.zeros(shape, dtype=image.dtype)
+    rows = min(shape[0], image.shape[0])
+    cols = min(shape[1], image.shape[1])
+    output[:rows, :cols] = image[:rows, :cols]
+    return output
+
+
+def OutputDType(dtype):
+    '''Return the numpy dtype of a requested output type, raising ValueError if GetData cannot produce it'''
+    dtype = numpy.dtype(dtype)
+    if dtype not in [numpy.dtype(supported) for supported in SupportedOutputDTypes]:
+        raise ValueError("Unsupported output dtype %s, expected one of %s" % (str(dtype), ', '.join([numpy.dtype(supported).name for supported in SupportedOutputDTypes])))
+
+    return dtype
+
+
+def CopyConverted(dest, source):
+    '''Copy intensities into an array of the same shape, converting them to the type of the destination.
+       Integer destinations receive intensities in [0, 1] scaled to the full range of the type, rounded to the
+       nearest integer with halves to even, and clipped to the range.  NaN becomes zero.  Float destinations
+       receive the values rounded to the nearest representable value.  Conversion runs in blocks of rows so the
+       float32 temporary stays small however large the image is.
+    '''
+    if dest.dtype.kind not in 'ui' or source.dtype.kind != 'f':
+        dest[...] = source
+        return
+
+    maximum = numpy.iinfo(dest.dtype).max
+    rows_per_block = max(1, ConvertBlockPixels // max(1, source.shape[-1]))
+    for iRow in range(0, source.shape[0], rows_per_block):
+        block = numpy.multiply(source[iRow:iRow + rows_per_block], maximum, dtype=numpy.float32)
+        numpy.nan_to_num(block, copy=False)
+        numpy.rint(block, out=block)
+        numpy.clip(block, 0, maximum, out=block)
+        dest[iRow:iRow + rows_per_block] = block
+
+
+def WriteIntoSlice(dest, image):
+    '''Copy an image into the top left of a preallocated slice, cropping the image or zeroing the uncovered part of the slice.
+       The image is converted to the type of the slice by :func:`CopyConverted`.'''
+    rows = min(dest.shape[0], image.shape[0])
+    cols = min(dest.shape[1], image.shape[1])
+    CopyConverted(dest[:rows, :cols], image[:rows, :cols])
+    dest[rows:, :] = 0
+    dest[:rows, cols:] = 0
+
+
+def CopyOverlap(dest, dest_pixel_region, source, source_pixel_region):
+    '''Copy the pixels where two images overlap on a shared pixel grid
+    :param ndarray dest: Image receiving the pixels
+    :param tuple dest_pixel_region: (minY, minX, maxY, maxX) of dest on the grid
+    :param ndarray source: Image providing the pixels
+    :param tuple source_pixel_region: (minY, minX, maxY, maxX) of source on the grid
+    '''
+    minY = max(dest_pixel_region[0], source_pixel_region[0])
+    minX = max(dest_pixel_region[1], source_pixel_region[1])
+    maxY = min(dest_pixel_region[2], source_pixel_region[2])
+    maxX = min(dest_pixel_region[3], source_pixel_region[3])
+    if minY >= maxY or minX >= maxX:
+        return
+
+    dest[minY - dest_pixel_region[0]:maxY - dest_pixel_region[0],
+         minX - dest_pixel_region[1]:maxX - dest_pixel_region[1]] = source[minY - source_pixel_region[0]:maxY - source_pixel_region[0],
+                                                                          minX - source_pixel_region[1]:maxX - source_pixel_region[1]]
+
+
+def OutputShape(region, downsample, num_channels):
+    '''Shape of the dense output for a region
+    :param ndarray region: (minZ, minY, minX, maxZ, maxY, maxX), maxZ is inclusive
+    :param float downsample: Size of an output pixel in volume space pixels
+    :param int num_channels: Number of channels in the output
+    :returns: (Channel, Z, Y, X) shape
+    :rtype: tuple
+    '''
+    numZ = int(region[iBox.MaxZ]) - int(region[iBox.MinZ]) + 1
+    numY = int(numpy.ceil((region[iBox.MaxY] - region[iBox.MinY]) / downsample))
+    numX = int(numpy.ceil((region[iBox.MaxX] - region[iBox.MinX]) / downsample))
+    return (num_channels, numZ, numY, numX)
+
+
+def OutputRect(region, downsample):
+    '''Volume space (minY, minX, maxY, maxX) covered by the output pixels of a region.  Output pixels are downsample
+       wide and start at the minimum of the region, so the last row and column can extend past it, see :func:`OutputShape`.
+    :rtype: ndarray
+    '''
+    (numY, numX) = OutputShape(region, downsample, 1)[2:]
+    return numpy.array((region[iBox.MinY], region[iBox.MinX],
+                        region[iBox.MinY] + numY * downsample, region[iBox.MinX] + numX * downsample), dtype=numpy.float64)
+
+
+class OutputBuffer(object):
+    """Dense (Channel, Z, Y, X) array a request is written into.
+
+    Tracks which section/channel slices received an image so the remaining slices can be
+    zeroed once, which lets a caller reuse a buffer across requests.
+    """
+
+    @property
+    def Data(self):
+        return self._data
+
+    @property
+    def SliceShape(self):
+        '''(Y, X) shape of each section/channel image'''
+        return self._data.shape[2:4]
+
+    def __init__(self, shape, channel_names, minZ, out=None, dtype=None):
+        '''
+        :param tuple shape: (Channel, Z, Y, X) shape of the output
+        :param list channel_names: Channel name of each index of the channel axis
+        :param int minZ: Section number of the first index of the Z axis
+        :param ndarray out: Optional preallocated array to write into
+        :param dtype: Type of the output, defaults to the type of out or float32
+        '''
+        shape = tuple(shape)
+        if out is None:
+            out = numpy.empty(shape, dtype=dtype if dtype is not None else DefaultOutputDType)
+        elif tuple(out.shape) != shape:
+            raise ValueError("Output buffer has shape %s, expected %s" % (str(out.shape), str(shape)))
+        elif dtype is not None and out.dtype != numpy.dtype(dtype):
+            raise ValueError("Output buffer has dtype %s, expected %s" % (str(out.dtype), str(numpy.dtype(dtype))))
+
+        self._data = out
+        self._minZ = minZ
+        self._channel_index = dict([(name, i) for (i, name) in enumerate(channel_names)])
+        self._written = numpy.zeros(shape[0:2], dtype=bool)
+
+    def Write(self, sectionNumber, channel_name, image):
+        iChannel = self._channel_index[channel_name]
+        iZ = sectionNumber - self._minZ
+        WriteIntoSlice(self._data[iChannel, iZ], image)
+        self._written[iChannel, iZ] = True
+
+    def Finish(self):
+        '''Zero every slice that was not written and return the array'''
+        self._data[~self._written] = 0
+        return self._data
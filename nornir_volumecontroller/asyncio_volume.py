@@ -0,0 +1,99 @@
+'''
+Asyncio front end for a volume controller.
+
+Every method of :class:`AsyncVolume` delegates the actual work to the
+synchronous :class:`~nornir_volumecontroller.base_objects.Volume` it wraps,
+running it on an executor so the event loop is never blocked.
+'''
+
+import asyncio
+
+DefaultMaxConcurrency = 4
+
+
+class AsyncVolume(object):
+    """Awaitable counterpart of :class:`~nornir_volumecontroller.base_objects.Volume` for asyncio servers.
+
+    :meth:`GetData` assembles sections concurrently, at most ``max_concurrency`` at a time, through
+    :meth:`Volume.AssembleSection`, so requests are assembled, cached and measured exactly as
+    :meth:`Volume.GetData` would.  Cancelling the awaiting task, for example when a client
+    disconnects, cancels every section that has not started.  Sections already running on a
+    worker thread cannot be stopped, the cancellation waits for them so nothing is written into
+    the output after :meth:`GetData` raises.
+    """
+
+    @property
+    def Volume(self):
+        '''The synchronous volume controller requests are delegated to'''
+        return self._volume
+
+    @property
+    def MaxConcurrency(self):
+        return self._max_concurrency
+
+    def __init__(self, volume, max_concurrency=DefaultMaxConcurrency, executor=None):
+        '''
+        :param Volume volume: Synchronous controller to delegate to
+        :param int max_concurrency: Maximum number of sections assembled at once by a single request
+        :param Executor executor: Thread pool to run blocking work on, defaults to the event loop's default executor.
+                                  It must not be the volume's executor, sections wait on that executor's workers.
+        '''
+        if executor is not None and executor is getattr(volume, 'Executor', None):
+            raise ValueError("AsyncVolume needs an executor other than the volume's own")
+
+        self._volume = volume
+        self._max_concurrency = max_concurrency
+        self._executor = executor
+
+    async def _Run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def Bounds(self):
+        '''Bounding box of the entire volume
+        :return: (minZ, minY, minX, maxZ, maxY, maxX)'''
+        return await self._Run(lambda: self._volume.Bounds)
+
+    async def Channels(self):
+        '''List of all channels in the volume'''
+        return await self._Run(lambda: self._volume.Channels)
+
+    async def GetHighestResolution(self, region=None, channel_names=None):
+        '''Return the highest resolution of data within the bounding box'''
+        return await self._Run(self._volume.GetHighestResolution, region, channel_names)
+
+    async def GetData(self, region, resolution, channel_names, out=None, dtype=None):
+        '''Return data for the specified region, see :meth:`Volume.GetData`
+           :returns: 4D Matrix with Channel,Z,Y,X axes
+           :rtype: ndarray
+        '''
+        # Planning may build the transform map on first use, so it runs on the executor
+        request = await self._Run(self._volume.PlanRequest, region, resolution, channel_names, out, dtype)
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        started = []
+
+        async def AssembleSection(sectionNumber):
+            async with semaphore:
+                future = loop.run_in_executor(self._executor, self._volume.AssembleSection, request, sectionNumber)
+                started.append(future)
+                # Cancelling this task must not lose track of a section that is writing into the output
+                await asyncio.shield(future)
+
+        tasks = [asyncio.ensure_future(AssembleSection(sectionNumber)) for sectionNumber in request.SectionNumbers]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop sections still waiting for a slot, whether we were cancelled or one section failed
+            for task in tasks:
+                task.cancel()
+
+            # Sections handed to the executor write into the caller's out, wait for them before giving it back
+            running = [future for future in started if not future.done()]
+            if len(running) > 0:
+                await asyncio.wait(running)
+
+            raise
+
+        return await self._Run(self._volume.FinishRequest, request)
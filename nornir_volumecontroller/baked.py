@@ -0,0 +1,479 @@
+'''
+Baked, memory-mapped store of stitched sections.
+
+Assembling a region restitches the tiles that intersect it on every request,
+although registered volumes rarely change.  :class:`BakedStore` renders each
+section/channel/pyramid level once into an uncompressed ``.npy`` array, written
+chunk by chunk so baking never holds a whole section in memory.  Reads
+memory-map those arrays, so a region inside a baked section is returned as a
+view of the file without evaluating a transform or decoding a tile.
+
+Layout of a store directory::
+
+    store.json
+    <Section>/<Channel>/<Level>.npy
+
+``store.json`` records, for every section/channel, the stamp of the channel to
+volume transform it was baked from, and for every level the chunks that hold no
+data.  Those chunks are never written, so the arrays stay sparse on disk.  An entry is only used while the transform
+is unchanged, and :meth:`BakedStore.Bake` rebakes only the entries whose
+transform changed.
+'''
+
+import json
+import logging
+import os
+import threading
+
+import numpy
+import numpy.lib.format
+
+import nornir_imageregistration
+
+from . import assemble
+from . import spatial
+from .base_objects import VolumeInterface
+from .cache import FileStamp
+
+BakedStoreVersion = 1
+DefaultBakedStoreDirname = 'VolumeController.baked'
+DefaultBakeFilter = 'Leveled'
+BakedDType = numpy.float32
+
+
+def BakedStorePathForVolumeXml(volume_xml_path):
+    '''Default location of the baked store for a VolumeData.xml file'''
+    return os.path.join(os.path.dirname(os.path.abspath(volume_xml_path)), DefaultBakedStoreDirname)
+
+
+def _EntryKey(sectionNumber, channel_name):
+    return '%d/%s' % (sectionNumber, channel_name)
+
+
+def _LevelKey(level):
+    return repr(float(level))
+
+
+class BakedStore(object):
+    """Directory of section/channel/level images rendered once from the tiles of a volume.
+
+    Use :meth:`Bake` to render or update the store from a :class:`~nornir_volumecontroller.base_objects.Volume`
+    and :meth:`ReadRegion` to read from it.  Reading is thread safe.  Baking should be done by one
+    process at a time, readers see either the previous or the new array of an entry since files
+    are replaced atomically.
+    """
+
+    @property
+    def Path(self):
+        return self._path
+
+    @property
+    def ChunkShape(self):
+        '''(rows, columns) of the blocks images are rendered in while baking'''
+        return tuple(self._data['chunk_shape'])
+
+    @property
+    def Name(self):
+        return self._data.get('name', None)
+
+    @property
+    def Channels(self):
+        return set([entry['channel'] for entry in self._data['entries'].values()])
+
+    @property
+    def SectionNumbers(self):
+        return sorted(set([entry['section'] for entry in self._data['entries'].values()]))
+
+    @property
+    def Bounds(self):
+        '''Bounding box of the baked sections as (minZ, minY, minX, maxZ, maxY, maxX), None if the store is empty'''
+        entries = list(self._data['entries'].values())
+        if len(entries) == 0:
+            return None
+
+        section_numbers = [entry['section'] for entry in entries]
+        boundsXY = numpy.array([entry['bounds'] for entry in entries], dtype=numpy.float64)
+        return [min(section_numbers),
+                float(boundsXY[:, nornir_imageregistration.iRect.MinY].min()),
+                float(boundsXY[:, nornir_imageregistration.iRect.MinX].min()),
+                max(section_numbers),
+                float(boundsXY[:, nornir_imageregistration.iRect.MaxY].max()),
+                float(boundsXY[:, nornir_imageregistration.iRect.MaxX].max())]
+
+    def __init__(self, path, data=None):
+        '''
+        :param str path: Directory of the store
+        :param dict data: Decoded contents of store.json, an empty store if None
+        '''
+        self._path = path
+        if data is None:
+            data = {'version': BakedStoreVersion,
+                    'name': None,
+                    'chunk_shape': [512, 512],
+                    'entries': {}}
+
+        self._data = data
+        self._lock = threading.Lock()
+        self._arrays = {}  # relative path -> memory mapped array
+
+    @classmethod
+    def IndexPath(cls, path):
+        return os.path.join(path, 'store.json')
+
+    @classmethod
+    def Open(cls, path):
+        '''Open an existing store, returning None if it does not exist or cannot be read'''
+        try:
+            with open(BakedStore.IndexPath(path), 'r') as hFile:
+                data = json.load(hFile)
+        except (OSError, ValueError):
+            return None
+
+        if data.get('version', None) != BakedStoreVersion:
+            return None
+
+        return BakedStore(path, data)
+
+    @classmethod
+    def Create(cls, path, chunk_shape=None):
+        '''Open the store at path, or create an empty store if there is no valid store there'''
+        store = BakedStore.Open(path)
+        if store is None:
+            store = BakedStore(path)
+
+        if chunk_shape is not None:
+            store._data['chunk_shape'] = [int(v) for v in chunk_shape]
+
+        os.makedirs(path, exist_ok=True)
+        return store
+
+    def Save(self):
+        '''Write the index atomically, so concurrent readers never see a partial file'''
+        index_path = BakedStore.IndexPath(self._path)
+        temp_path = index_path + '.%d.tmp' % os.getpid()
+        with open(temp_path, 'w') as hFile:
+            json.dump(self._data, hFile, separators=(',', ':'))
+
+        os.replace(temp_path, index_path)
+
+    def _FullPath(self, relpath):
+        return os.path.join(self._path, relpath)
+
+    def _Entry(self, sectionNumber, channel_name):
+        return self._data['entries'].get(_EntryKey(sectionNumber, channel_name), None)
+
+    def IsCurrent(self, sectionNumber, channel_name):
+        '''True if the section/channel is baked and its transform has not changed since'''
+        entry = self._Entry(sectionNumber, channel_name)
+        if entry is None:
+            return False
+
+        try:
+            return list(FileStamp(entry['transform'])) == entry['stamp']
+        except OSError:
+            return False
+
+    def Levels(self, sectionNumber, channel_name):
+        '''Downsamples baked for a section/channel, empty if it was not baked'''
+        entry = self._Entry(sectionNumber, channel_name)
+        if entry is None:
+            return []
+
+        return sorted([float(level) for level in entry['levels'].keys()])
+
+    def EmptyChunks(self, sectionNumber, channel_name, level):
+        '''(row, column) indices, on the grid of :attr:`ChunkShape`, of the chunks of a baked level that hold no data.
+           Stores baked before empty chunks were recorded report none.'''
+        level_entry = self._Entry(sectionNumber, channel_name)['levels'][_LevelKey(level)]
+        return [tuple(chunk_index) for chunk_index in level_entry.get('empty_chunks', [])]
+
+    def Bake(self, volume, levels=None, channel_names=None, sections=None, filtername=DefaultBakeFilter, force=False):
+        '''Render section/channel images from the tiles of a volume.  Entries whose transform is unchanged
+           and that already contain the requested levels are skipped unless force is True.
+        :param Volume volume: Controller to assemble tiles with
+        :param list levels: Pyramid levels to bake, every level of each channel if None
+        :param list channel_names: Channels to bake, all channels if None
+        :param list sections: Section numbers to bake, all sections if None
+        :param str filtername: Filter whose tile pyramid is baked
+        :param bool force: Rebake entries even if they are current
+        :returns: List of (sectionNumber, channel name) entries that were baked.  Mosaics without tiles are not baked.
+        :rtype: list
+        '''
+        if self._data.get('name', None) is None:
+            self._data['name'] = volume.Name
+
+        transform_path_map = volume.transform_path_map
+        if sections is None:
+            sections = sorted(transform_path_map.keys())
+
+        baked = []
+        for sectionNumber in sections:
+            if sectionNumber not in transform_path_map:
+                continue
+
+            for (channel_name, channel) in sorted(transform_path_map[sectionNumber].items()):
+                if channel_names is not None and channel_name not in channel_names:
+                    continue
+
+                level_paths = channel.GetLevelPaths(filtername)
+                channel_levels = sorted(level_paths.keys()) if levels is None else [level for level in levels if level in level_paths]
+                if len(channel_levels) == 0:
+                    continue
+
+                if not force and self.IsCurrent(sectionNumber, channel_name):
+                    baked_levels = self.Levels(sectionNumber, channel_name)
+                    if all([float(level) in baked_levels for level in channel_levels]):
+                        continue
+
+                if self._BakeEntry(volume, sectionNumber, channel, level_paths, channel_levels):
+                    baked.append((sectionNumber, channel_name))
+
+            # Save after each section so an interrupted bake keeps its progress
+            self.Save()
+
+        return baked
+
+    def _BakeEntry(self, volume, sectionNumber, channel, level_paths, levels):
+        '''Bake the levels of a section/channel
+           :returns: False if the mosaic has no tiles, in which case any previous entry is removed
+        '''
+        transform_path = channel.Transform.FullPath
+        # Stamp before reading the transform, so a transform changed while baking is rebaked next time
+        stamp = list(FileStamp(transform_path))
+        (mosaic, tile_index) = volume.TransformCache.GetTileIndex(transform_path)
+        if len(tile_index) == 0:
+            logging.getLogger(__name__).info("Not baking section %d channel %s, its mosaic has no tiles" % (sectionNumber, channel.Name))
+            self._data['entries'].pop(_EntryKey(sectionNumber, channel.Name), None)
+            return False
+
+        tile_bounds = tile_index.Bounds
+        bounds = [float(tile_bounds[:, 0].min()), float(tile_bounds[:, 1].min()),
+                  float(tile_bounds[:, 2].max()), float(tile_bounds[:, 3].max())]
+
+        entry = {'section': sectionNumber,
+                 'channel': channel.Name,
+                 'transform': os.path.abspath(transform_path),
+                 'stamp': stamp,
+                 'units_per_pixel': float(channel.Scale.X.UnitsPerPixel),
+                 'bounds': bounds,
+                 'levels': {}}
+
+        old_entry = self._Entry(sectionNumber, channel.Name)
+        if old_entry is not None and old_entry['stamp'] == stamp:
+            # Keep levels baked previously from the same transform
+            entry['levels'] = dict(old_entry['levels'])
+
+        for level in levels:
+            relpath = os.path.join(str(sectionNumber), channel.Name, '%g.npy' % level)
+            pixel_region = spatial.PixelRegion(bounds, level)
+            empty_chunks = self._RenderLevel(volume, channel, tile_index, level_paths[level], level, pixel_region, self._FullPath(relpath))
+            entry['levels'][_LevelKey(level)] = {'path': relpath,
+                                                 'origin': [pixel_region[0], pixel_region[1]],
+                                                 'shape': [pixel_region[2] - pixel_region[0], pixel_region[3] - pixel_region[1]],
+                                                 'empty_chunks': empty_chunks}
+
+            with self._lock:
+                self._arrays.pop(relpath, None)
+
+        self._data['entries'][_EntryKey(sectionNumber, channel.Name)] = entry
+        return True
+
+    def _RenderLevel(self, volume, channel, tile_index, tilesPath, level, pixel_region, fullpath):
+        '''Assemble a level chunk by chunk into a new .npy file, replacing any existing file once complete.
+           Chunks no tile covers are not assembled and, like chunks whose pixels are all zero, never written, so
+           file systems supporting sparse files do not allocate them.
+           :returns: [row, column] indices of the chunks that were not written
+        '''
+        os.makedirs(os.path.dirname(fullpath), exist_ok=True)
+        temp_path = fullpath + '.%d.tmp.npy' % os.getpid()
+        shape = (pixel_region[2] - pixel_region[0], pixel_region[3] - pixel_region[1])
+        chunk_shape = self.ChunkShape
+
+        empty_chunks = []
+        image = numpy.lib.format.open_memmap(temp_path, mode='w+', dtype=BakedDType, shape=shape)
+        try:
+            for chunk_index in spatial.ChunksInRegion(pixel_region, chunk_shape):
+                chunk_region = spatial.ChunkRegion(chunk_index, chunk_shape, level)
+                if len(tile_index.Intersecting(chunk_region)) == 0:
+                    empty_chunks.append(list(chunk_index))
+                    continue
+
+                chunk = volume._AssembleRegion(channel, tilesPath, chunk_region, level)
+                if not numpy.any(chunk):
+                    empty_chunks.append(list(chunk_index))
+                    continue
+
+                chunk = assemble.FitToShape(chunk, chunk_shape)
+                assemble.CopyOverlap(image, pixel_region, chunk, spatial.ChunkPixelRegion(chunk_index, chunk_shape))
+
+            image.flush()
+        finally:
+            del image
+
+        os.replace(temp_path, fullpath)
+        return empty_chunks
+
+    def _Array(self, relpath):
+        with self._lock:
+            array = self._arrays.get(relpath, None)
+            if array is None:
+                array = numpy.load(self._FullPath(relpath), mmap_mode='r')
+                self._arrays[relpath] = array
+
+            return array
+
+    def LevelPath(self, sectionNumber, channel_name, level):
+        '''Full path of the file holding a baked level'''
+        return self._FullPath(self._Entry(sectionNumber, channel_name)['levels'][_LevelKey(level)]['path'])
+
+    def Read(self, sectionNumber, channel_name, level, pixel_region):
+        '''Return the pixels of a region on the pixel grid of a baked level.
+           Regions inside the baked extent are returned as read-only views of the memory mapped file.
+           Pixels outside the extent are zero.
+        :param tuple pixel_region: (minY, minX, maxY, maxX) at the level, max values are exclusive
+        :rtype: ndarray
+        '''
+        level_entry = self._Entry(sectionNumber, channel_name)['levels'][_LevelKey(level)]
+        array = self._Array(level_entry['path'])
+
+        (originY, originX) = level_entry['origin']
+        stored_region = (originY, originX, originY + array.shape[0], originX + array.shape[1])
+
+        if pixel_region[0] >= stored_region[0] and pixel_region[1] >= stored_region[1] and \
+           pixel_region[2] <= stored_region[2] and pixel_region[3] <= stored_region[3]:
+            return array[pixel_region[0] - originY:pixel_region[2] - originY,
+                         pixel_region[1] - originX:pixel_region[3] - originX]
+
+        image = numpy.zeros((pixel_region[2] - pixel_region[0], pixel_region[3] - pixel_region[1]), dtype=array.dtype)
+        assemble.CopyOverlap(image, pixel_region, array, stored_region)
+        return image
+
+    def ReadRegion(self, sectionNumber, channel_name, region, downsample):
+        '''Read a volume space region from the coarsest baked level meeting the requested downsample
+        :param ndarray region: (minY, minX, maxY, maxX) in volume space
+        :param float downsample: Requested downsample relative to the channel's full resolution
+        :returns: (level, image)
+        :rtype: tuple
+        '''
+        levels = dict([(level, None) for level in self.Levels(sectionNumber, channel_name)])
+        (level, _) = assemble.SelectLevel(levels, downsample)
+        return (level, self.Read(sectionNumber, channel_name, level, spatial.PixelRegion(region, level)))
+
+    def UnitsPerPixel(self, sectionNumber, channel_name):
+        return self._Entry(sectionNumber, channel_name)['units_per_pixel']
+
+    def Close(self):
+        '''Release the memory mapped files'''
+        with self._lock:
+            self._arrays = {}
+
+
+class BakedVolume(VolumeInterface):
+    """Serves :meth:`GetData` from a :class:`BakedStore` alone, without the volume model, transforms or tiles.
+
+    Sections are read as memory mapped views and resampled directly into the output.  Every baked
+    entry is served, whether or not its transform has changed since it was baked.
+    """
+
+    @property
+    def Store(self):
+        return self._store
+
+    @property
+    def Name(self):
+        return self._store.Name
+
+    @property
+    def Bounds(self):
+        '''Bounding box of the entire volume
+        :return: (minZ, minY, minX, maxZ, maxY, maxX)'''
+        return self._store.Bounds
+
+    @property
+    def Channels(self):
+        '''Set of all channels in the volume'''
+        return self._store.Channels
+
+    def __init__(self, store):
+        '''
+        :param BakedStore store: Store to serve, or the path of one
+        '''
+        if isinstance(store, str):
+            path = store
+            store = BakedStore.Open(path)
+            if store is None:
+                raise ValueError("No baked store at " + path)
+
+        self._store = store
+
+    @property
+    def Levels(self):
+        '''Sorted list of every level baked for any section/channel'''
+        levels = set()
+        for entry in self._store._data['entries'].values():
+            levels.update([float(level) for level in entry['levels'].keys()])
+
+        return sorted(levels)
+
+    def SourceFiles(self, region, resolution, channel_names=None):
+        '''Paths of the baked images the data of a request is read from'''
+        boundingbox = nornir_imageregistration.BoundingBox.CreateFromBounds(region)
+
+        paths = []
+        for sectionNumber in spatial.SectionsInBoundingBox(boundingbox):
+            for channel_name in self._OrderedChannelNames(channel_names):
+                levels = self._store.Levels(sectionNumber, channel_name)
+                if len(levels) == 0:
+                    continue
+
+                downsample = resolution / self._store.UnitsPerPixel(sectionNumber, channel_name)
+                (level, _) = assemble.SelectLevel(dict([(level, None) for level in levels]), downsample)
+                paths.append(self._store.LevelPath(sectionNumber, channel_name, level))
+
+        return paths
+
+    def UnitsPerPixel(self, channel_names=None):
+        '''Smallest units per pixel of the channels, the size of a volume space pixel'''
+        return self._HighestResolution(self._OrderedChannelNames(channel_names))
+
+    def _HighestResolution(self, channel_names):
+        entries = [entry for entry in self._store._data['entries'].values() if entry['channel'] in channel_names]
+        if len(entries) == 0:
+            raise ValueError("No baked data for channels " + str(channel_names))
+
+        return min([entry['units_per_pixel'] for entry in entries])
+
+    def GetOutputShape(self, region, resolution, channel_names=None):
+        '''Shape of the array :meth:`GetData` returns for a request
+           :returns: (Channel, Z, Y, X) shape
+           :rtype: tuple
+        '''
+        channel_names = self._OrderedChannelNames(channel_names)
+        return assemble.OutputShape(region, self._OutputDownsample(resolution, channel_names), len(channel_names))
+
+    def _OutputDownsample(self, resolution, channel_names):
+        return resolution / self._HighestResolution(channel_names)
+
+    def GetData(self, region, resolution, channel_names, out=None, dtype=None):
+        '''Return data for the specified region, see :meth:`Volume.GetData`
+           :returns: 4D Matrix with Channel,Z,Y,X axes. Sections or channels without data are zero.
+           :rtype: ndarray
+        '''
+        channel_names = self._OrderedChannelNames(channel_names)
+        boundingbox = nornir_imageregistration.BoundingBox.CreateFromBounds(region)
+        rect = self._OutputRect(boundingbox, resolution, channel_names)
+        bbox = boundingbox.BoundingBox
+        minZ = int(bbox[nornir_imageregistration.iBox.MinZ])
+
+        output = assemble.OutputBuffer(self.GetOutputShape(region, resolution, channel_names), channel_names, minZ, out=out,
+                                       dtype=assemble.OutputDType(dtype) if dtype is not None else None)
+        for sectionNumber in spatial.SectionsInBoundingBox(boundingbox):
+            for channel_name in channel_names:
+                if len(self._store.Levels(sectionNumber, channel_name)) == 0:
+                    continue
+
+                downsample = resolution / self._store.UnitsPerPixel(sectionNumber, channel_name)
+                (level, image) = self._store.ReadRegion(sectionNumber, channel_name, rect, downsample)
+                output.Write(sectionNumber, channel_name, assemble.ResampleToShape(image, output.SliceShape, rect, level))
+
+        return output.Finish()
@@ -1,9 +1,24 @@
+import collections
+import concurrent.futures
+import os
+import threading
+import time
+
+import numpy
+
 import nornir_volumecontroller
 import nornir_volumemodel
 import nornir_imageregistration
 import scipy.misc
 
+from . import assemble
 from . import spatial
+from .cache import TransformCache, RequestCoalescer, FileStamp, EmptyChunk, DefaultChunkShape
+from .manifest import ManifestSectionMap, UnionBounds
+from .metrics import VolumeMetrics, HitRate
+from .prefetch import PrefetchKey
+from .resolution import ResolutionIndex
+from .sparse import SparseVolumeData
 
 
 class VolumeInterface(object):
@@ -23,43 +38,183 @@ class VolumeInterface(object):
         '''List of all channels available in the volume'''
         raise NotImplemented("Abstract base class")
 
-    def GetData(self, region, resolution, channels):
+    def GetData(self, region, resolution, channels, out=None, dtype=None):
         '''Get the raw data inside the boundaries
         :param box region: Data within the region is returned
         :param ndarray resolution: The resolution to return data in
         :param list channels: List of channels to assign to the output array
+        :param ndarray out: Optional preallocated array the data is written into
+        :param dtype: Type of the output, one of uint8, uint16, float16 or float32.  Defaults to the type of out or float32.
         :returns: 4D Matrix with Channel,Z,Y,X axes 
         :rtype: ndarray
         '''
         raise NotImplemented("Abstract base class")
 
+    def IterData(self, region, resolution, channels, slab_depth=1, prefetch=True, dtype=None):
+        '''Yield the data inside the boundaries as slabs of consecutive sections.
+           Peak memory is bounded by the slab size rather than the depth of the region.
+        :param box region: Data within the region is returned
+        :param ndarray resolution: The resolution to return data in
+        :param list channels: List of channels to assign to the output array
+        :param int slab_depth: Number of sections in each slab
+        :param bool prefetch: Assemble the next slab in the background while the current slab is consumed
+        :param dtype: Type of the output, see :meth:`GetData`
+        :returns: ((minZ, maxZ), 4D Matrix with Channel,Z,Y,X axes) tuples in Z order, maxZ is inclusive
+        '''
+        if slab_depth < 1:
+            raise ValueError("slab_depth must be at least 1")
+
+        bounds = list(nornir_imageregistration.BoundingBox.CreateFromBounds(region).BoundingBox)
+        minZ = int(bounds[nornir_imageregistration.iBox.MinZ])
+        maxZ = int(bounds[nornir_imageregistration.iBox.MaxZ])
+
+        slabs = []
+        for slabMinZ in range(minZ, maxZ + 1, slab_depth):
+            slab_bounds = list(bounds)
+            slab_bounds[nornir_imageregistration.iBox.MinZ] = slabMinZ
+            slab_bounds[nornir_imageregistration.iBox.MaxZ] = min(slabMinZ + slab_depth - 1, maxZ)
+            slabs.append(slab_bounds)
+
+        if not prefetch:
+            for slab_bounds in slabs:
+                yield (VolumeInterface._SlabZRange(slab_bounds), self.GetData(slab_bounds, resolution, channels, dtype=dtype))
+
+            return
+
+        reader = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        future = None
+        try:
+            future = reader.submit(self.GetData, slabs[0], resolution, channels, dtype=dtype)
+            for (iSlab, slab_bounds) in enumerate(slabs):
+                data = future.result()
+                future = None
+                if iSlab + 1 < len(slabs):
+                    future = reader.submit(self.GetData, slabs[iSlab + 1], resolution, channels, dtype=dtype)
+
+                yield (VolumeInterface._SlabZRange(slab_bounds), data)
+                data = None
+        finally:
+            if future is not None:
+                future.cancel()
+
+            reader.shutdown(wait=False)
+
+        return
+
+    def GetReslice(self, plane, position, region, resolution, channels, thickness=1, dtype=None):
+        '''Get an orthogonal view through the sections of a region, such as a side view of the stack.
+           Only the strip of each section that intersects the plane is assembled, so the cost grows with the
+           number of pixels in the plane rather than the area of the sections.
+        :param str plane: 'XZ' for the plane of constant Y at position, 'YZ' for the plane of constant X
+        :param float position: Volume space Y ('XZ') or X ('YZ') coordinate of the plane
+        :param box region: The Z range and the extent along the plane are read from the region, the extent across
+                           the plane is replaced by the strip at position
+        :param ndarray resolution: The resolution to return data in
+        :param list channels: List of channels to assign to the output array
+        :param int thickness: Number of output pixels across the plane, more than one returns a thin slab starting at position
+        :param dtype: Type of the output, see :meth:`GetData`
+        :returns: 4D Matrix with Channel,Z,Across,Along axes.  Along is X for 'XZ' and Y for 'YZ'.
+        :rtype: ndarray
+        '''
+        plane = plane.upper()
+        if plane not in ('XZ', 'YZ'):
+            raise ValueError("Reslice plane must be 'XZ' or 'YZ', not %s" % plane)
+
+        if thickness < 1:
+            raise ValueError("thickness must be at least 1")
+
+        channels = self._OrderedChannelNames(channels)
+        downsample = self._OutputDownsample(resolution, channels)
+
+        (iMin, iMax) = (nornir_imageregistration.iBox.MinY, nornir_imageregistration.iBox.MaxY) if plane == 'XZ' else \
+                       (nornir_imageregistration.iBox.MinX, nornir_imageregistration.iBox.MaxX)
+        strip = [float(v) for v in region]
+        strip[iMin] = float(position)
+        strip[iMax] = float(position) + thickness * downsample
+
+        data = self.GetData(strip, resolution, channels, dtype=dtype)
+
+        # Rounding the strip to output pixels can add a pixel across the plane
+        if plane == 'XZ':
+            return numpy.ascontiguousarray(data[:, :, :thickness, :])
+
+        return numpy.ascontiguousarray(data[:, :, :, :thickness].transpose(0, 1, 3, 2))
+
+    def _OutputDownsample(self, resolution, channel_names):
+        '''Size of an output pixel in volume space pixels'''
+        raise NotImplemented("Abstract base class")
+
+    def _OutputRect(self, boundingbox, resolution, channel_names):
+        '''Volume space (minY, minX, maxY, maxX) sampled by the output pixels of a request, see :func:`assemble.OutputRect`'''
+        return assemble.OutputRect(boundingbox.BoundingBox, self._OutputDownsample(resolution, channel_names))
+
+    @classmethod
+    def _SlabZRange(cls, slab_bounds):
+        return (slab_bounds[nornir_imageregistration.iBox.MinZ], slab_bounds[nornir_imageregistration.iBox.MaxZ])
+
+    def _OrderedChannelNames(self, channel_names):
+        if channel_names is None:
+            channel_names = self.Channels
+
+        if isinstance(channel_names, (set, frozenset)):
+            return sorted(channel_names)
+
+        return list(channel_names)
+
 
 class Volume(VolumeInterface):
     """Concrete volume controller wrapping a :class:`~nornir_volumemodel.model.volume.Volume` model.
 
     Lazily builds per-section transform maps and channel lists on first access so
-    loading a large volume does not incur upfront I/O costs.
+    loading a large volume does not incur upfront I/O costs.  :meth:`Refresh` picks up
+    sections added, removed or re-registered on disk since then.  The controller may be
+    shared by many threads.  Each lazy value is built once, threads that need it while
+    it is being built wait for the builder, and reads of built values do not lock.
     """
 
     @property
     def Bounds(self):
         '''Bounding box of the entire volume
         :return: (minZ, minY, minX, maxZ, maxY, maxX)'''
-        if self._bounds is None:
-            boundsXY = self.Calculate2DBoundingBox()
-            minZ = min(self.transform_path_map.keys())
-            maxZ = max(self.transform_path_map.keys())
-
-            self._bounds = [minZ,
-                            boundsXY[nornir_imageregistration.iRect.MinY],
-                            boundsXY[nornir_imageregistration.iRect.MinX],
-                            maxZ,
-                            boundsXY[nornir_imageregistration.iRect.MaxY],
-                            boundsXY[nornir_imageregistration.iRect.MaxX]]
-        return self._bounds
+        return self._LazyValue('_bounds', self._BuildBounds)
+
+    def _BuildBounds(self):
+        if self._manifest is not None and len(self._stale_manifest_sections) == 0:
+            bounds = self._manifest.Bounds
+            if bounds is not None:
+                return bounds
+
+        boundsXY = self.Calculate2DBoundingBox()
+        minZ = min(self.transform_path_map.keys())
+        maxZ = max(self.transform_path_map.keys())
+
+        return [minZ,
+                boundsXY[nornir_imageregistration.iRect.MinY],
+                boundsXY[nornir_imageregistration.iRect.MinX],
+                maxZ,
+                boundsXY[nornir_imageregistration.iRect.MaxY],
+                boundsXY[nornir_imageregistration.iRect.MaxX]]
+
+    def _LazyValue(self, attribute, build):
+        '''Return the value of a lazily built attribute, building it once even when many threads ask at the same time'''
+        value = getattr(self, attribute)
+        if value is not None:
+            return value
+
+        # Reentrant, since building one value may need another
+        with self._init_lock:
+            value = getattr(self, attribute)
+            if value is None:
+                value = build()
+                setattr(self, attribute, value)
+
+        return value
 
     @property
     def Name(self):
+        if self._volume is None and self._manifest is not None:
+            return self._manifest.Name
+
         return self._volume.Name
 
     @Name.setter
@@ -69,27 +224,296 @@ class Volume(VolumeInterface):
     @property
     def Channels(self):
         '''List of all channels in the volume'''
-        if self._channels is None:
-            self._channels = self._BuildVolumeChannelList()
+        if self._manifest is not None:
+            return self._LazyValue('_channels', lambda: self._manifest.Channels)
+
+        return self._LazyValue('_channels', self._BuildVolumeChannelList)
 
-        return self._channels
+    @property
+    def TransformCache(self):
+        '''Cache of parsed channel to volume mosaics shared by all requests on this volume'''
+        return self._transform_cache
 
     @property
     def transform_path_map(self):
-        if self._transform_path_map is None:
-            self._transform_path_map = nornir_volumecontroller.spatial.BuildVolumeTransformMap(self._volume)
+        if self._manifest is not None:
+            return self._LazyValue('_transform_path_map', lambda: self._RecordStamps(self._manifest.BuildTransformMap()))
+
+        return self._LazyValue('_transform_path_map', lambda: self._RecordStamps(nornir_volumecontroller.spatial.BuildVolumeTransformMap(self._volume)))
+
+    @property
+    def VolumeXmlPath(self):
+        '''VolumeData.xml the model was loaded from, None if unknown.  Only volumes with a known XML see sections added or removed by :meth:`Refresh`'''
+        return self._volume_xml_path
+
+    @property
+    def ResolutionIndex(self):
+        '''Columnar index of the units per pixel and pyramid levels of every section/channel, built on first use'''
+        return self._LazyValue('_resolution_index', lambda: ResolutionIndex.Build(self.transform_path_map))
+
+    @property
+    def ChunkCache(self):
+        '''Cache of assembled chunks, None if every request is assembled from tiles'''
+        return self._chunk_cache
+
+    @property
+    def Metrics(self):
+        '''Stage timings and counters recorded by this controller'''
+        return self._metrics
+
+    def MetricsSnapshot(self):
+        '''Return the stage timings, counters and cache statistics of the controller as a dictionary'''
+        snapshot = self._metrics.Snapshot()
+        snapshot['caches'] = {}
+
+        caches = [('transform', self._transform_cache), ('chunk', self._chunk_cache)]
+        for (name, cache) in caches:
+            if cache is None:
+                continue
+
+            stats = cache.Stats()
+            stats['hit_rate'] = HitRate(stats)
+            snapshot['caches'][name] = stats
+
+        if self._prefetcher is not None:
+            snapshot['prefetch'] = self._prefetcher.Stats()
 
-        return self._transform_path_map
+        snapshot['coalescing'] = self._coalescer.Stats()
 
-    def __init__(self, volumeModel=None):
+        return snapshot
+
+    @property
+    def Prefetcher(self):
+        '''Read-ahead of sections for sequential requests, None if disabled'''
+        return self._prefetcher
+
+    @property
+    def Executor(self):
+        '''Executor used to assemble sections in parallel, None if sections are assembled serially'''
+        return self._executor
+
+    @property
+    def BakedStore(self):
+        '''Store of pre-rendered sections read instead of assembling tiles, None if every request is assembled from tiles'''
+        return self._baked_store
+
+    @property
+    def Coalescer(self):
+        '''Shares the assembly of a chunk, or of an identical region when there is no chunk cache, between concurrent requests'''
+        return self._coalescer
+
+    @property
+    def Manifest(self):
+        '''Manifest the controller was constructed from, None if it was built from the volume model'''
+        return self._manifest
+
+    def __init__(self, volumeModel=None, transform_cache=None, executor=None, max_inflight_sections=None, manifest=None,
+                 chunk_cache=None, metrics=None, prefetcher=None, baked_store=None, coalescer=None, volume_xml_path=None):
+        '''
+        :param volumeModel: Volume model to serve data from, may be None if a manifest is provided
+        :param TransformCache transform_cache: Cache of parsed mosaics, a private cache is created if None
+        :param Executor executor: Thread or process pool used to assemble sections in parallel, None to assemble serially
+        :param int max_inflight_sections: Maximum number of sections submitted to the executor at once, defaults to twice the worker count
+        :param VolumeManifest manifest: Precomputed description of the volume used instead of the volume model
+        :param ChunkCache chunk_cache: Cache of assembled chunks used to compose requests. Not used for sections
+                                       assembled by a process pool.
+        :param VolumeMetrics metrics: Receives stage timings and counters, a private instance is created if None
+        :param ZPrefetcher prefetcher: Optional read-ahead of the next sections for requests stepping through Z
+        :param BakedStore baked_store: Pre-rendered sections read instead of assembling tiles wherever
+                                       the baked entry is current
+        :param RequestCoalescer coalescer: Single-flight layer shared by concurrent requests, a private instance is
+                                           created if None.  Pass the same instance to controllers of the same volume
+                                           to coalesce work between them.
+        :param str volume_xml_path: VolumeData.xml the model was loaded from, reloaded by :meth:`Refresh` when it changes
+        '''
 
         self._volume = volumeModel
+        self._manifest = manifest
         self._channels = None
+        self._init_lock = threading.RLock()
+
+        if transform_cache is None:
+            transform_cache = TransformCache()
+
+        self._transform_cache = transform_cache
+        self._chunk_cache = chunk_cache
+        self._baked_store = baked_store
+
+        if coalescer is None:
+            coalescer = RequestCoalescer()
+
+        self._coalescer = coalescer
+
+        self._volume_xml_path = volume_xml_path
+        self._xml_stamp = FileStamp(volume_xml_path) if volume_xml_path is not None else None
+        self._section_stamps = None  # {section number: [(transform path, stamp), ...]} when the transform map was built
+        self._section_bounds = {}  # XY bounds of sections calculated since the last change
+        self._stale_manifest_sections = set()  # Sections changed since the manifest was built
+
+        if metrics is None:
+            metrics = VolumeMetrics()
+
+        self._metrics = metrics
+
+        self._prefetcher = prefetcher
+        if prefetcher is not None:
+            prefetcher.Attach(self)
+
+        self._executor = executor
+        if max_inflight_sections is None and executor is not None:
+            max_inflight_sections = 2 * getattr(executor, '_max_workers', 1)
+
+        self._max_inflight_sections = max_inflight_sections
 
         self._transform_path_map = None
+        self._resolution_index = None
         self._transform_map = None
         self._bounds = None
 
+    def _RecordStamps(self, transform_path_map):
+        '''Remember the stamps of every transform of a newly built transform map, the baseline for :meth:`Refresh`'''
+        self._section_stamps = dict([(sectionNumber, self._TransformStamps(sectionNumber, transform_path_map))
+                                     for sectionNumber in transform_path_map.keys()])
+        return transform_path_map
+
+    def _TransformStamps(self, sectionNumber, transform_path_map):
+        if isinstance(transform_path_map, ManifestSectionMap):
+            # Read the paths from the manifest so the channels of every section are not built
+            paths = self._manifest.SectionTransformPaths(sectionNumber)
+        else:
+            paths = [channel.Transform.FullPath for channel in transform_path_map[sectionNumber].values()]
+
+        stamps = []
+        for path in sorted([os.path.normpath(os.path.abspath(path)) for path in paths]):
+            try:
+                stamps.append((path, FileStamp(path)))
+            except OSError:
+                stamps.append((path, None))
+
+        return stamps
+
+    def Refresh(self):
+        '''Bring the controller up to date with sections added, removed or re-registered on disk.
+
+        The VolumeData.xml, when known, and the transform of every channel are compared to the
+        versions the controller last saw.  Only section entries that changed are replaced, Bounds
+        is updated from the bounds of each section, and cached data is discarded only for the
+        affected sections.  Requests running concurrently see either the old or the new map.
+        :returns: Sorted list of the section numbers that were added, removed or changed
+        '''
+        with self._init_lock, self._metrics.Stage('Refresh'):
+            old_map = self.transform_path_map
+            new_map = old_map
+            changed = set()
+            reloaded = False
+
+            if self._volume_xml_path is not None:
+                xml_stamp = FileStamp(self._volume_xml_path)
+                if xml_stamp != self._xml_stamp:
+                    volumeModel = nornir_volumemodel.Load_Xml(self._volume_xml_path)
+                    new_map = self._MergeTransformMap(old_map, nornir_volumecontroller.spatial.BuildVolumeTransformMap(volumeModel), changed)
+                    self._SeedSectionBounds(old_map, changed)
+                    self._volume = volumeModel
+                    self._manifest = None
+                    self._stale_manifest_sections = set()
+                    self._xml_stamp = xml_stamp
+                    reloaded = True
+
+            section_stamps = {}
+            for sectionNumber in new_map.keys():
+                stamps = self._TransformStamps(sectionNumber, new_map)
+                if stamps != self._section_stamps.get(sectionNumber, None):
+                    changed.add(sectionNumber)
+
+                section_stamps[sectionNumber] = stamps
+
+            if len(changed) == 0 and not reloaded:
+                return []
+
+            added_only = all([sectionNumber not in old_map for sectionNumber in changed])
+            if self._manifest is not None:
+                self._stale_manifest_sections.update(changed)
+
+            for sectionNumber in changed:
+                self._section_bounds.pop(sectionNumber, None)
+                if self._chunk_cache is not None:
+                    self._chunk_cache.Invalidate(sectionNumber)
+
+            if self._prefetcher is not None:
+                self._prefetcher.Cancel()
+
+            if self._bounds is not None and len(changed) > 0:
+                self._bounds = self._UpdatedBounds(new_map, changed if added_only else None)
+
+            self._transform_path_map = new_map
+            self._section_stamps = section_stamps
+            self._resolution_index = None
+            if reloaded:
+                self._channels = None
+
+            self._metrics.Increment('refreshed_sections', len(changed))
+            return sorted(changed)
+
+    def _MergeTransformMap(self, old_map, rebuilt_map, changed):
+        '''Return a map of the rebuilt sections that keeps the existing entry of every section whose channels did not change.
+           Sections added, removed or changed are added to the changed set.'''
+        new_map = {}
+        for (sectionNumber, channelmap) in rebuilt_map.items():
+            if sectionNumber in old_map and \
+               spatial.ChannelMapSignature(old_map[sectionNumber]) == spatial.ChannelMapSignature(channelmap):
+                new_map[sectionNumber] = old_map[sectionNumber]
+            else:
+                new_map[sectionNumber] = channelmap
+                changed.add(sectionNumber)
+
+        changed.update([sectionNumber for sectionNumber in old_map.keys() if sectionNumber not in rebuilt_map])
+        return new_map
+
+    def _SeedSectionBounds(self, old_map, changed):
+        '''Keep the section bounds recorded in a manifest that is about to be dropped'''
+        if self._manifest is None:
+            return
+
+        for sectionNumber in old_map.keys():
+            if sectionNumber not in changed and sectionNumber not in self._section_bounds and \
+               sectionNumber not in self._stale_manifest_sections:
+                self._section_bounds[sectionNumber] = self._manifest.SectionBounds(sectionNumber)
+
+    def _SectionBounds(self, sectionNumber, transform_path_map):
+        '''XY bounds of a section as a (minY, minX, maxY, maxX) list, remembered until the section changes'''
+        bounds = self._section_bounds.get(sectionNumber, None)
+        if bounds is None:
+            if self._manifest is not None and sectionNumber not in self._stale_manifest_sections:
+                bounds = self._manifest.SectionBounds(sectionNumber)
+            else:
+                transforms = [self.TransformCache.Get(channel.Transform.FullPath) for channel in transform_path_map[sectionNumber].values()]
+                bounds = spatial.RectToArray(nornir_imageregistration.transforms.utils.FixedBoundingBox(transforms)).tolist()
+
+            self._section_bounds[sectionNumber] = bounds
+
+        return bounds
+
+    def _UpdatedBounds(self, transform_path_map, added=None):
+        '''Bounds of the volume after the transform map changed
+        :param set added: Sections added to a map whose other sections are unchanged, so the current bounds only need to grow
+        '''
+        if len(transform_path_map) == 0:
+            return None
+
+        if added is not None:
+            boundsXY = UnionBounds([[self._bounds[nornir_imageregistration.iBox.MinY], self._bounds[nornir_imageregistration.iBox.MinX],
+                                     self._bounds[nornir_imageregistration.iBox.MaxY], self._bounds[nornir_imageregistration.iBox.MaxX]]] +
+                                   [self._SectionBounds(sectionNumber, transform_path_map) for sectionNumber in added])
+        else:
+            boundsXY = UnionBounds([self._SectionBounds(sectionNumber, transform_path_map) for sectionNumber in transform_path_map.keys()])
+
+        return [min(transform_path_map.keys()),
+                boundsXY[nornir_imageregistration.iRect.MinY],
+                boundsXY[nornir_imageregistration.iRect.MinX],
+                max(transform_path_map.keys()),
+                boundsXY[nornir_imageregistration.iRect.MaxY],
+                boundsXY[nornir_imageregistration.iRect.MaxX]]
+
     def _BuildVolumeChannelList(self):
 
         channelList = []
@@ -113,47 +537,733 @@ class Volume(VolumeInterface):
     def GetHighestResolution(self, region=None, channel_names=None):
         '''Return the highest resolution of data within the bounding box'''
 
-        ScaleObj = nornir_volumemodel.model.Scale()
         if region is None:
-            region = self.Bounds
+            # Every section is in the volume bounds, so avoid calculating them
+            return Scale(self.ResolutionIndex.HighestResolution(channel_names=channel_names))
+
+        bbox = nornir_imageregistration.BoundingBox.CreateFromBounds(region).BoundingBox
+        return Scale(self.ResolutionIndex.HighestResolution(int(bbox[nornir_imageregistration.iBox.MinZ]),
+                                                            int(bbox[nornir_imageregistration.iBox.MaxZ]),
+                                                            channel_names))
 
+    def GetData(self, region, resolution, channel_names, out=None, dtype=None):
+        '''Return data for the specified region
+           :param ndarray region: (minZ, minY, minX, maxZ, maxY, maxX)
+           :param float resolution: resolution of output data
+           :param list channels: channels to include in output, in the order of the channel axis.
+                                 Unordered collections are sorted.  None includes every channel.
+           :param ndarray out: Optional array with the shape returned by :meth:`GetOutputShape` to write the data into.
+                               Reusing a buffer across requests avoids allocating the output each time.
+           :param dtype: Type of the output, one of uint8, uint16, float16 or float32.  Defaults to the type of out or
+                         float32.  Integer outputs hold intensities scaled to the full range of the type, rounded to the
+                         nearest integer and clipped, see :func:`assemble.CopyConverted`.  Images are resampled in
+                         float32 and converted as they are written, so no full size float64 temporaries are created.
+           :returns: 4D Matrix with Channel,Z,Y,X axes. Sections or channels without data are zero.
+           :rtype: ndarray
+        '''
+        request = self.PlanRequest(region, resolution, channel_names, out, dtype)
+        for (sectionNumber, channel_name, image) in self._IterSectionImages(request.BoundingBox, request.Rect, resolution, request.ChannelNames, request.SliceShape):
+            request.Write(sectionNumber, channel_name, image)
+
+        return self.FinishRequest(request)
+
+    def PlanRequest(self, region, resolution, channel_names, out=None, dtype=None):
+        '''Plan a :meth:`GetData` request, allocating its output and listing the known sections it covers.
+           Front ends that schedule sections themselves, such as :class:`~nornir_volumecontroller.asyncio_volume.AsyncVolume`,
+           assemble each section with :meth:`AssembleSection` and complete the request with :meth:`FinishRequest`, so
+           they produce the same data and metrics as :meth:`GetData`.  Parameters are those of :meth:`GetData`.
+           :rtype: DataRequest
+        '''
+        channel_names = self._OrderedChannelNames(channel_names)
         boundingbox = nornir_imageregistration.BoundingBox.CreateFromBounds(region)
-        for sectionNumber in self._KnownSectionNumbersInBoundingBox(boundingbox):
-            channelmap = self.transform_path_map[sectionNumber]
-            vol_registered_channel = GetChannels(channelmap, channel_names)
-            for channel in vol_registered_channel:
-                ScaleObj = Scale.MinAxisScales(ScaleObj, channel.Scale)
+        output = self._CreateOutputBuffer(region, resolution, channel_names, out, dtype)
+        return DataRequest(resolution, channel_names, boundingbox, self._OutputRect(boundingbox, resolution, channel_names), output,
+                           list(self._KnownSectionNumbersInBoundingBox(boundingbox)))
+
+    def AssembleSection(self, request, sectionNumber):
+        '''Assemble every channel of one section of a planned request and write the images into the request.
+           Like :meth:`GetData` this uses prefetched images, assembles channels sharing a transform together,
+           coalesces with concurrent requests and runs on the volume's executor.  Blocks until the section is
+           written, so it must not be called from a worker of the volume's executor.
+           :param DataRequest request: Request returned by :meth:`PlanRequest`
+           :param int sectionNumber: One of the request's SectionNumbers
+        '''
+        if self._executor is None:
+            results = self._AssembleSectionSerially(sectionNumber, request.Rect, request.Resolution, request.ChannelNames, request.SliceShape)
+        else:
+            results = Volume._SectionResults(sectionNumber, self._SubmitSection(sectionNumber, request.Rect, request.Resolution,
+                                                                                request.ChannelNames, request.SliceShape))
 
-        return Scale(ScaleObj)
+        for (sectionNumber, channel_name, image) in results:
+            request.Write(sectionNumber, channel_name, image)
 
-    def GetData(self, region, resolution, channel_names):
-        '''Return data for the specified region
+    def FinishRequest(self, request):
+        '''Complete a planned request, zeroing the slices no image was written to, recording the request's metrics
+           and letting the prefetcher observe it
+           :returns: 4D Matrix with Channel,Z,Y,X axes
+           :rtype: ndarray
+        '''
+        result = request.Output.Finish()
+
+        attributes = {'sections': len(request.WrittenSections), 'section_channels': request.NumImages, 'output_bytes': result.nbytes}
+        self._metrics.Increment('requests')
+        self._metrics.Increment('sections', attributes['sections'])
+        self._metrics.Increment('section_channels', attributes['section_channels'])
+        self._metrics.Increment('output_bytes', result.nbytes)
+        self._metrics.RecordStage('GetData', time.perf_counter() - request.StartTime, attributes)
+
+        if self._prefetcher is not None:
+            bbox = request.BoundingBox.BoundingBox
+            self._prefetcher.Observe(request.Rect, request.Resolution, request.ChannelNames, request.SliceShape,
+                                     int(bbox[nornir_imageregistration.iBox.MinZ]), int(bbox[nornir_imageregistration.iBox.MaxZ]))
+
+        return result
+
+    def GetDataBatch(self, regions, resolution, channel_names, stats=None, dtype=None):
+        '''Return data for many regions, such as cutouts around points of interest, planned together.
+           For each section and channel, regions whose images overlap are assembled once as their union and
+           cropped, so tiles shared by overlapping regions are read and decoded once.
+           :param list regions: (minZ, minY, minX, maxZ, maxY, maxX) regions
+           :param float resolution: resolution of output data
+           :param list channel_names: channels to include in output, see :meth:`GetData`
+           :param dict stats: Optional dictionary updated with the number of section/channel images requested and
+                              assembled, and the number of tiles requested by the regions and actually read
+           :param dtype: Type of the outputs, see :meth:`GetData`
+           :returns: list of 4D Matrices with Channel,Z,Y,X axes, one per region
+           :rtype: list
+        '''
+        with self._metrics.Stage('GetDataBatch') as attributes:
+            channel_names = self._OrderedChannelNames(channel_names)
+            outputs = [self._CreateOutputBuffer(region, resolution, channel_names, dtype=dtype) for region in regions]
+            boundingboxes = [nornir_imageregistration.BoundingBox.CreateFromBounds(region) for region in regions]
+            rects = [self._OutputRect(boundingbox, resolution, channel_names) for boundingbox in boundingboxes]
+
+            section_regions = collections.OrderedDict()
+            for (iRegion, boundingbox) in enumerate(boundingboxes):
+                for sectionNumber in self._KnownSectionNumbersInBoundingBox(boundingbox):
+                    section_regions.setdefault(sectionNumber, []).append(iRegion)
+
+            batch_stats = {'regions': len(regions), 'section_channels': 0, 'assemblies': 0, 'tiles_requested': 0, 'tiles_read': 0}
+            work = []
+            for (sectionNumber, members) in section_regions.items():
+                for channel in GetChannels(self.transform_path_map[sectionNumber], channel_names):
+                    (level, tilesPath) = channel.GetLevel('Leveled', resolution / channel.Scale.X.UnitsPerPixel)
+                    tile_index = None
+                    if self._chunk_cache is None and not self._IsBaked(sectionNumber, channel, level):
+                        (mosaic, tile_index) = self.TransformCache.GetTileIndex(channel.Transform.FullPath)
+
+                    for cluster in spatial.ClusterOverlappingRegions([rects[iRegion] for iRegion in members], level):
+                        cluster = [members[i] for i in cluster]
+                        # A region alone is its own union, so every region is sampled from the pixel grid of the level
+                        assembled_rect = spatial.UnionPixelRegion([spatial.PixelRegion(rects[iRegion], level) for iRegion in cluster], level)
+
+                        work.append((sectionNumber, channel, tilesPath, level, assembled_rect, cluster))
+
+                        batch_stats['section_channels'] += len(cluster)
+                        batch_stats['assemblies'] += 1
+                        if tile_index is not None:
+                            batch_stats['tiles_requested'] += sum([len(tile_index.Intersecting(rects[iRegion])) for iRegion in cluster])
+                            batch_stats['tiles_read'] += len(tile_index.Intersecting(assembled_rect))
+
+            def AssembleCluster(sectionNumber, channel, tilesPath, level, union_rect, cluster):
+                union_pixel_region = spatial.PixelRegion(union_rect, level)
+                image = self._AssembleLevelRegion(sectionNumber, channel, tilesPath, union_rect, level)
+                image = assemble.FitToShape(image, (union_pixel_region[2] - union_pixel_region[0], union_pixel_region[3] - union_pixel_region[1]))
+
+                results = []
+                for iRegion in cluster:
+                    pixel_region = spatial.PixelRegion(rects[iRegion], level)
+                    crop = image[pixel_region[0] - union_pixel_region[0]:pixel_region[2] - union_pixel_region[0],
+                                 pixel_region[1] - union_pixel_region[1]:pixel_region[3] - union_pixel_region[1]]
+                    with self._metrics.Stage('Resample'):
+                        results.append((iRegion, assemble.ResampleToShape(crop, outputs[iRegion].SliceShape, rects[iRegion], level)))
+
+                return results
+
+            if self._executor is None or isinstance(self._executor, concurrent.futures.ProcessPoolExecutor):
+                cluster_results = (AssembleCluster(*item) for item in work)
+            else:
+                cluster_results = self._executor.map(lambda item: AssembleCluster(*item), work)
+
+            for ((sectionNumber, channel, tilesPath, level, union_rect, cluster), results) in zip(work, cluster_results):
+                for (iRegion, image) in results:
+                    outputs[iRegion].Write(sectionNumber, channel.Name, image)
+
+            batch_stats['assemblies_saved'] = batch_stats['section_channels'] - batch_stats['assemblies']
+            self._metrics.Increment('batch_requests')
+            self._metrics.Increment('batch_regions', len(regions))
+            self._metrics.Increment('batch_assemblies_saved', batch_stats['assemblies_saved'])
+            attributes.update(batch_stats)
+
+            if stats is not None:
+                stats.update(batch_stats)
+
+            return [output.Finish() for output in outputs]
+
+    def GetDataProgressive(self, region, resolution, channel_names, time_budget=None, dtype=None):
+        '''Yield the data of a region from the coarsest pyramid level first, then successively finer levels until the
+           requested resolution is reached or the time budget runs out.
+           Every result has the shape :meth:`GetData` returns, coarse levels are upsampled to it.  The tiles of each
+           section/channel intersecting the region are selected once and reused by every refinement.
            :param ndarray region: (minZ, minY, minX, maxZ, maxY, maxX)
            :param float resolution: resolution of output data
-           :param list channels: channels to include in output
-           :returns: list of ndarray images
+           :param list channel_names: channels to include in output, see :meth:`GetData`
+           :param float time_budget: Seconds after which no further refinement is started, None to always reach the
+                                     requested resolution.  A refinement is also skipped when the previous pass
+                                     suggests it would not finish within the budget.  The coarsest pass always runs.
+           :param dtype: Type of the outputs, see :meth:`GetData`
+           :returns: (level, 4D Matrix with Channel,Z,Y,X axes, complete) tuples.  Level is the pyramid level
+                     downsample the data was assembled from, complete is True for data at the requested resolution.
         '''
+        start = time.perf_counter()
+        channel_names = self._OrderedChannelNames(channel_names)
         boundingbox = nornir_imageregistration.BoundingBox.CreateFromBounds(region)
-        rect = boundingbox.RectangleXY
-        images = {}
-        if channel_names is None:
-            channel_names = GetChannels(channelmap, channel_names)
+        rect = self._OutputRect(boundingbox, resolution, channel_names)
+        pass_levels = self._ProgressiveLevels(boundingbox, resolution, channel_names)
+
+        # (section number, transform path) -> tiles of the mosaic intersecting the region
+        placements = {}
+        previous = None
+        for (iPass, level) in enumerate(pass_levels):
+            complete = iPass + 1 == len(pass_levels)
+            if previous is not None and time_budget is not None:
+                (previous_level, previous_seconds) = previous
+                elapsed = time.perf_counter() - start
+                # Assembly time grows with the number of pixels, the square of the change in level
+                estimate = previous_seconds * (previous_level / level) ** 2
+                if elapsed + estimate > time_budget:
+                    self._metrics.Increment('progressive_refinements_skipped', len(pass_levels) - iPass)
+                    return
+
+            pass_start = time.perf_counter()
+            with self._metrics.Stage('ProgressivePass', level=level, complete=complete):
+                output = self._CreateOutputBuffer(region, resolution, channel_names, dtype=dtype)
+                for sectionNumber in self._KnownSectionNumbersInBoundingBox(boundingbox):
+                    for channel in GetChannels(self.transform_path_map[sectionNumber], channel_names):
+                        image = self._AssembleProgressiveChannel(sectionNumber, channel, rect, resolution, level, output.SliceShape, placements)
+                        output.Write(sectionNumber, channel.Name, image)
+
+                result = output.Finish()
+
+            previous = (level, time.perf_counter() - pass_start)
+            self._metrics.Increment('progressive_passes')
+            yield (level, result, complete)
+
+        return
+
+    def _ProgressiveLevels(self, boundingbox, resolution, channel_names):
+        '''Pyramid levels of the passes of :meth:`GetDataProgressive`, coarsest first, ending with the level
+           :meth:`GetData` would use for the highest resolution channel'''
+        bbox = boundingbox.BoundingBox
+        index = self.ResolutionIndex
+        levels = index.AvailableLevels(bbox[nornir_imageregistration.iBox.MinZ], bbox[nornir_imageregistration.iBox.MaxZ], channel_names)
+        if len(levels) == 0:
+            levels = index.Levels
+
+        if len(levels) == 0:
+            return [1.0]
+
+        downsample = resolution / self.GetHighestResolution(None, channel_names).X
+        (target, tilesPath) = assemble.SelectLevel(dict([(float(level), None) for level in levels]), downsample)
+        return sorted([float(level) for level in levels if level > target], reverse=True) + [float(target)]
+
+    def _AssembleProgressiveChannel(self, sectionNumber, channel, rect, resolution, pass_level, output_shape, placements):
+        '''Assemble a channel of a section from a pyramid level no finer than the requested resolution needs and no
+           coarser than the pass level, reusing the tile selection of earlier passes'''
+        (level, tilesPath) = channel.GetLevel('Leveled', max(pass_level, resolution / channel.Scale.X.UnitsPerPixel))
+        if self._chunk_cache is not None or self._IsBaked(sectionNumber, channel, level):
+            image = self._AssembleLevelRegion(sectionNumber, channel, tilesPath, rect, level)
+        else:
+            key = (sectionNumber, channel.Transform.FullPath)
+            if key not in placements:
+                with self._metrics.Stage('LoadTransform'):
+                    (mosaic, tile_index) = self.TransformCache.GetTileIndex(channel.Transform.FullPath)
+
+                # Passes run coarsest first, so padding by a pixel of this level covers the snapped region of every pass
+                padding = numpy.array([-level, -level, level, level], dtype=numpy.float64)
+                placements[key] = spatial.MosaicForRegion(mosaic, tile_index, rect + padding)
+
+            image = self._AssemblePlacedTiles(placements[key], [tilesPath], spatial.SnapRegion(rect, level), level)[0]
+
+        with self._metrics.Stage('Resample'):
+            return assemble.ResampleToShape(image, output_shape, rect, level)
+
+    def GetDataSparse(self, region, resolution, channel_names, chunk_shape=DefaultChunkShape, dtype=None):
+        '''Return data for the specified region as the chunks that contain data, for regions that are mostly empty
+           such as the edges of the volume or sections only partly covered by tiles.
+           Sections and channels without tiles in the region are not assembled.  The coverage mask of the assembled
+           tiles is kept, chunks no tile covers are not stored and the others carry a mask of their covered pixels.
+           Chunks of prefetched images or read from the baked store or chunk cache have no coverage mask, they are
+           stored when a tile intersects them.  Like :meth:`GetData`, concurrent requests are coalesced, channels
+           sharing a transform are assembled together and the prefetcher observes the request.
+           :param ndarray region: (minZ, minY, minX, maxZ, maxY, maxX)
+           :param float resolution: resolution of output data
+           :param list channel_names: channels to include in output, see :meth:`GetData`
+           :param tuple chunk_shape: (rows, columns) of the output chunks
+           :param dtype: Type of the output, see :meth:`GetData`
+           :returns: Chunks of the data :meth:`GetData` would return, :meth:`SparseVolumeData.ToDense` reproduces it
+           :rtype: SparseVolumeData
+        '''
+        with self._metrics.Stage('GetDataSparse') as attributes:
+            channel_names = self._OrderedChannelNames(channel_names)
+            boundingbox = nornir_imageregistration.BoundingBox.CreateFromBounds(region)
+            rect = self._OutputRect(boundingbox, resolution, channel_names)
+            shape = self.GetOutputShape(region, resolution, channel_names)
+            minZ = int(boundingbox.BoundingBox[nornir_imageregistration.iBox.MinZ])
+            result = SparseVolumeData(shape, assemble.OutputDType(dtype) if dtype is not None else assemble.DefaultOutputDType,
+                                      chunk_shape, channel_names, minZ)
+
+            sectionNumbers = list(self._KnownSectionNumbersInBoundingBox(boundingbox))
+            if self._executor is None or isinstance(self._executor, concurrent.futures.ProcessPoolExecutor):
+                section_chunks = (self._AssembleSparseSection(sectionNumber, channel_names, rect, resolution, shape[2:], result.ChunkShape) for sectionNumber in sectionNumbers)
+            else:
+                section_chunks = self._executor.map(lambda sectionNumber: self._AssembleSparseSection(sectionNumber, channel_names, rect, resolution, shape[2:], result.ChunkShape), sectionNumbers)
+
+            num_channels = 0
+            for (sectionNumber, channel_chunks) in zip(sectionNumbers, section_chunks):
+                for (channel_name, chunks) in channel_chunks:
+                    num_channels += 1
+                    iChannel = channel_names.index(channel_name)
+                    for (chunk_index, data, valid) in chunks:
+                        result.Set((iChannel, sectionNumber - minZ) + tuple(chunk_index), data, valid)
+
+            self._metrics.Increment('sparse_requests')
+            self._metrics.Increment('sparse_chunks', len(result))
+            self._metrics.Increment('sparse_chunks_empty', result.NumChunks - len(result))
+            attributes.update({'section_channels': num_channels, 'chunks': len(result), 'empty_chunks': result.NumChunks - len(result),
+                               'output_bytes': result.nbytes})
+
+        if self._prefetcher is not None:
+            bbox = boundingbox.BoundingBox
+            self._prefetcher.Observe(rect, resolution, channel_names, shape[2:],
+                                     int(bbox[nornir_imageregistration.iBox.MinZ]), int(bbox[nornir_imageregistration.iBox.MaxZ]))
+
+        return result
+
+    def _AssembleSparseSection(self, sectionNumber, channel_names, rect, resolution, output_shape, chunk_shape):
+        '''Assemble the channels of a section with their coverage masks and split them into output chunks.
+           Like :meth:`_AssembleChannels`, channels sharing a transform and pyramid level are assembled together and
+           concurrent requests for the same region are coalesced.  Prefetched, cached and baked images have no coverage mask.
+           :returns: list of (channel name, chunks) tuples for the channels with tiles in the region, see :meth:`_SparseChunks`
+        '''
+        results = []
+        groups = collections.OrderedDict()
+        for channel in GetChannels(self.transform_path_map[sectionNumber], channel_names):
+            (level, tilesPath) = channel.GetLevel('Leveled', resolution / channel.Scale.X.UnitsPerPixel)
+            with self._metrics.Stage('LoadTransform'):
+                (mosaic, tile_index) = self.TransformCache.GetTileIndex(channel.Transform.FullPath)
+
+            level_rect = spatial.SnapRegion(rect, level)
+            key = (id(mosaic), level)
+            if key not in groups:
+                groups[key] = (spatial.MosaicForRegion(mosaic, tile_index, level_rect), tile_index, level, level_rect, [])
+
+            (region_mosaic, tile_index, level, level_rect, members) = groups[key]
+            if region_mosaic is None:
+                self._metrics.Increment('sparse_section_channels_skipped')
+                continue
+
+            future = self._TakePrefetched(sectionNumber, channel, rect, resolution, output_shape)
+            if future is not None:
+                image = future.result()
+            elif self._chunk_cache is not None or self._IsBaked(sectionNumber, channel, level):
+                image = self._AssembleChannel(sectionNumber, channel, rect, resolution, output_shape)
+            else:
+                members.append((channel.Name, tilesPath))
+                continue
+
+            results.append((channel.Name, self._SparseChunks(image, None, tile_index, rect, output_shape, chunk_shape)))
+
+        for (region_mosaic, tile_index, level, level_rect, members) in groups.values():
+            if len(members) == 0:
+                continue
+
+            if len(members) > 1:
+                self._metrics.Increment('fused_channels', len(members) - 1)
+
+            key = (sectionNumber, tuple([name for (name, tilesPath) in members]), level, tuple([float(v) for v in level_rect]), 'coverage')
+            assembled = self._Coalesce(key, lambda: self._AssemblePlacedTiles(region_mosaic, [tilesPath for (name, tilesPath) in members],
+                                                                              level_rect, level, return_masks=True))
+            with self._metrics.Stage('Resample', channels=len(assembled)):
+                images = assemble.ResampleStackToShape([image for (image, mask) in assembled], output_shape, rect, level)
+                masks = [assemble.ResampleMaskToShape(mask, output_shape, rect, level) for (image, mask) in assembled]
+
+            for ((name, tilesPath), image, mask) in zip(members, images, masks):
+                results.append((name, self._SparseChunks(image, mask, tile_index, rect, output_shape, chunk_shape)))
+
+        # Report channels in the order they were requested
+        order = [channel.Name for channel in GetChannels(self.transform_path_map[sectionNumber], channel_names)]
+        return sorted(results, key=lambda result: order.index(result[0]))
+
+    def _SparseChunks(self, image, mask, tile_index, rect, output_shape, chunk_shape):
+        '''Split an image of output_shape into output chunks
+           :param ndarray mask: Pixels of the image covered by tiles, None if coverage is not known
+           :returns: list of (chunk index, data, valid mask) tuples for the chunks with data.  The mask is None when
+                     every pixel of the chunk is covered or coverage is not known.
+        '''
+        chunks = []
+        for chunk_index in spatial.ChunksInRegion((0, 0, output_shape[0], output_shape[1]), chunk_shape):
+            pixel_region = spatial.ChunkPixelRegion(chunk_index, chunk_shape)
+            (ySlice, xSlice) = (slice(pixel_region[0], pixel_region[2]), slice(pixel_region[1], pixel_region[3]))
+            data = image[ySlice, xSlice]
+            if mask is None:
+                # Without a mask, coverage is known only as far as which tiles intersect the chunk
+                if len(tile_index.Intersecting(self._OutputPixelRect(rect, output_shape, pixel_region))) > 0:
+                    chunks.append((chunk_index, data, None))
+
+                continue
+
+            valid = mask[ySlice, xSlice]
+            if not numpy.any(valid):
+                continue
+
+            chunks.append((chunk_index, data, None if numpy.all(valid) else valid))
+
+        return chunks
+
+    @classmethod
+    def _OutputPixelRect(cls, rect, output_shape, pixel_region):
+        '''Volume space (minY, minX, maxY, maxX) of a region of output pixels covering rect'''
+        scaleY = (rect[2] - rect[0]) / output_shape[0]
+        scaleX = (rect[3] - rect[1]) / output_shape[1]
+        return numpy.array((rect[0] + pixel_region[0] * scaleY, rect[1] + pixel_region[1] * scaleX,
+                            rect[0] + min(pixel_region[2], output_shape[0]) * scaleY, rect[1] + min(pixel_region[3], output_shape[1]) * scaleX),
+                           dtype=numpy.float64)
+
+    def SourceFiles(self, region, resolution, channel_names=None):
+        '''Paths of the files the data of a request is read from, the transforms and tiles or the baked images.
+           Their modification times identify the version of the data, for example to validate HTTP caches.
+           :rtype: list
+        '''
+        boundingbox = nornir_imageregistration.BoundingBox.CreateFromBounds(region)
+        rect = boundingbox.RectangleXY.ToArray()
+
+        paths = []
+        for (sectionNumber, channel) in self._SectionChannelsInBoundingBox(boundingbox, self._OrderedChannelNames(channel_names)):
+            (level, tilesPath) = channel.GetLevel('Leveled', resolution / channel.Scale.X.UnitsPerPixel)
+            if self._IsBaked(sectionNumber, channel, level):
+                paths.append(self._baked_store.LevelPath(sectionNumber, channel.Name, level))
+                continue
+
+            paths.append(channel.Transform.FullPath)
+            (mosaic, tile_index) = self.TransformCache.GetTileIndex(channel.Transform.FullPath)
+            paths.extend([os.path.join(tilesPath, tile_name) for tile_name in tile_index.Intersecting(rect)])
+
+        return paths
+
+    def _CreateOutputBuffer(self, region, resolution, channel_names, out=None, dtype=None):
+        shape = self.GetOutputShape(region, resolution, channel_names)
+        minZ = int(nornir_imageregistration.BoundingBox.CreateFromBounds(region).BoundingBox[nornir_imageregistration.iBox.MinZ])
+        return assemble.OutputBuffer(shape, channel_names, minZ, out=out, dtype=assemble.OutputDType(dtype) if dtype is not None else None)
+
+    def GetOutputShape(self, region, resolution, channel_names=None):
+        '''Shape of the array :meth:`GetData` returns for a request
+           :returns: (Channel, Z, Y, X) shape
+           :rtype: tuple
+        '''
+        channel_names = self._OrderedChannelNames(channel_names)
+        return assemble.OutputShape(region, self._OutputDownsample(resolution, channel_names), len(channel_names))
+
+    def _OutputDownsample(self, resolution, channel_names):
+        '''Downsample of the output relative to volume space, whose pixels have the size of the highest resolution channel.
+           The whole volume is considered so requests for different regions have the same pixel size.'''
+        return resolution / self.GetHighestResolution(None, channel_names).X
 
+    def _SectionChannelsInBoundingBox(self, boundingbox, channel_names):
+        '''Yield (sectionNumber, channel) for every registered channel of every known section in the bounding box'''
         for sectionNumber in self._KnownSectionNumbersInBoundingBox(boundingbox):
-            channelmap = self.transform_path_map[sectionNumber]
-            vol_registered_channels = GetChannels(channelmap, channel_names)
+            for channel in GetChannels(self.transform_path_map[sectionNumber], channel_names):
+                yield (sectionNumber, channel)
+
+        return
+
+    def _IterSectionImages(self, boundingbox, rect, resolution, channel_names, output_shape):
+        '''Assemble every channel of every known section in the bounding box into images of output_shape.
+           Sections are assembled on the executor when one is available.
+           :param ndarray rect: Volume space (minY, minX, maxY, maxX) sampled by the output, see :meth:`_OutputRect`
+           :returns: (sectionNumber, channel name, image) tuples in section order
+        '''
+        if self._executor is None:
+            for sectionNumber in self._KnownSectionNumbersInBoundingBox(boundingbox):
+                for result in self._AssembleSectionSerially(sectionNumber, rect, resolution, channel_names, output_shape):
+                    yield result
+
+            return
+
+        inflight = collections.deque()
+        try:
+            for sectionNumber in self._KnownSectionNumbersInBoundingBox(boundingbox):
+                if len(inflight) >= self._max_inflight_sections:
+                    for result in Volume._SectionResults(*inflight.popleft()):
+                        yield result
+
+                inflight.append((sectionNumber, self._SubmitSection(sectionNumber, rect, resolution, channel_names, output_shape)))
+
+            while len(inflight) > 0:
+                for result in Volume._SectionResults(*inflight.popleft()):
+                    yield result
+        finally:
+            # Do not leave work queued for a caller that stopped listening
+            for (sectionNumber, futures) in inflight:
+                for (channel_name, future) in futures:
+                    future.cancel()
+
+        return
+
+    def _AssembleSectionSerially(self, sectionNumber, rect, resolution, channel_names, output_shape):
+        '''Assemble every channel of a section on the calling thread
+           :returns: list of (sectionNumber, channel name, image) tuples
+        '''
+        results = []
+        remaining = []
+        for channel in GetChannels(self.transform_path_map[sectionNumber], channel_names):
+            future = self._TakePrefetched(sectionNumber, channel, rect, resolution, output_shape)
+            if future is not None:
+                results.append((sectionNumber, channel.Name, future.result()))
+            else:
+                remaining.append(channel)
+
+        for (channel_name, image) in self._AssembleChannels(sectionNumber, remaining, rect, resolution, output_shape):
+            results.append((sectionNumber, channel_name, image))
+
+        return results
+
+    def _SubmitSection(self, sectionNumber, rect, resolution, channel_names, output_shape):
+        '''Submit every channel of a section to the executor
+           :returns: list of (channel name, future) tuples.  A channel name of None marks a future whose result is a
+                     list of (channel name, image) tuples for channels assembled together.
+        '''
+        use_processes = isinstance(self._executor, concurrent.futures.ProcessPoolExecutor)
+
+        futures = []
+        remaining = []
+        for channel in GetChannels(self.transform_path_map[sectionNumber], channel_names):
+            future = self._TakePrefetched(sectionNumber, channel, rect, resolution, output_shape)
+            if future is None:
+                (level, tilesPath) = channel.GetLevel('Leveled', resolution / channel.Scale.X.UnitsPerPixel)
+                if use_processes and self._IsBaked(sectionNumber, channel, level):
+                    # Reading a baked section is cheaper than sending the request to another process
+                    future = concurrent.futures.Future()
+                    future.set_result(self._AssembleChannel(sectionNumber, channel, rect, resolution, output_shape))
+                elif use_processes:
+                    future = self._executor.submit(assemble.AssembleChannelFromFile, channel.Transform.FullPath, tilesPath, rect, level, output_shape)
+                else:
+                    remaining.append(channel)
+                    continue
+
+            futures.append((channel.Name, future))
+
+        if len(remaining) > 0:
+            futures.append((None, self._executor.submit(self._AssembleChannels, sectionNumber, remaining, rect, resolution, output_shape)))
+
+        return futures
+
+    def _TakePrefetched(self, sectionNumber, channel, rect, resolution, output_shape):
+        '''Return the future of an image assembled speculatively by the prefetcher, or None'''
+        if self._prefetcher is None:
+            return None
+
+        future = self._prefetcher.Take(PrefetchKey(sectionNumber, channel.Name, rect, resolution, output_shape))
+        if future is None or future.cancelled():
+            return None
+
+        return future
+
+    @classmethod
+    def _SectionResults(cls, sectionNumber, futures):
+        for (channel_name, future) in futures:
+            if channel_name is None:
+                for (name, image) in future.result():
+                    yield (sectionNumber, name, image)
+            else:
+                yield (sectionNumber, channel_name, future.result())
+
+    def _AssembleChannels(self, sectionNumber, channels, rect, resolution, output_shape):
+        '''Assemble several channels of a section.  Channels sharing a transform, either the same file or files with
+           identical contents, and pyramid level are assembled together so the transform is loaded, the tiles in the
+           region are selected, and the results are resampled once for the group.
+           :returns: list of (channel name, image) tuples
+        '''
+        results = []
+        groups = collections.OrderedDict()
+        for channel in channels:
+            (level, tilesPath) = channel.GetLevel('Leveled', resolution / channel.Scale.X.UnitsPerPixel)
+            if self._chunk_cache is not None or self._IsBaked(sectionNumber, channel, level):
+                results.append((channel.Name, self._AssembleChannel(sectionNumber, channel, rect, resolution, output_shape)))
+                continue
+
+            with self._metrics.Stage('LoadTransform'):
+                (mosaic, tile_index) = self.TransformCache.GetTileIndex(channel.Transform.FullPath)
+
+            group = groups.setdefault((id(mosaic), level), (mosaic, tile_index, level, []))
+            group[3].append((channel.Name, tilesPath))
+
+        for (mosaic, tile_index, level, members) in groups.values():
+            if len(members) > 1:
+                self._metrics.Increment('fused_channels', len(members) - 1)
+
+            level_rect = spatial.SnapRegion(rect, level)
+            key = (sectionNumber, tuple([name for (name, tilesPath) in members]), level, tuple([float(v) for v in level_rect]))
+            images = self._Coalesce(key, lambda: self._AssembleMosaicRegion(mosaic, tile_index, [tilesPath for (name, tilesPath) in members], level_rect, level))
+            with self._metrics.Stage('Resample', channels=len(images)):
+                images = assemble.ResampleStackToShape(images, output_shape, rect, level)
+
+            results.extend(zip([name for (name, tilesPath) in members], images))
+
+        return results
+
+    def _AssembleChannel(self, sectionNumber, channel, rect, resolution, output_shape):
+        '''Assemble a channel of a section from the coarsest pyramid level that meets the requested resolution and
+           resample it once to the output shape'''
+        (level, tilesPath) = channel.GetLevel('Leveled', resolution / channel.Scale.X.UnitsPerPixel)
+        image = self._AssembleLevelRegion(sectionNumber, channel, tilesPath, rect, level)
+
+        with self._metrics.Stage('Resample'):
+            return assemble.ResampleToShape(image, output_shape, rect, level)
+
+    def _AssembleLevelRegion(self, sectionNumber, channel, tilesPath, rect, level):
+        '''Image of a region of a channel at a pyramid level, read from the baked store or chunk cache when available.
+           Every source covers the pixels of the level the region touches, see :func:`spatial.SnapRegion`, so the
+           image does not depend on which source it came from.'''
+        rect = spatial.SnapRegion(rect, level)
+        if self._IsBaked(sectionNumber, channel, level):
+            with self._metrics.Stage('ReadBaked'):
+                image = self._baked_store.Read(sectionNumber, channel.Name, level, spatial.PixelRegion(rect, level))
+
+            self._metrics.Increment('baked_reads')
+            return image
+        elif self._chunk_cache is None:
+            key = (sectionNumber, channel.Name, level, tuple([float(v) for v in rect]))
+            return self._Coalesce(key, lambda: self._AssembleRegion(channel, tilesPath, rect, level))
+        else:
+            return self._ComposeFromChunks(sectionNumber, channel, tilesPath, rect, level)
+
+    def _IsBaked(self, sectionNumber, channel, level):
+        '''True if the baked store has a current image of the channel at the pyramid level'''
+        if self._baked_store is None:
+            return False
+
+        return float(level) in self._baked_store.Levels(sectionNumber, channel.Name) and \
+            self._baked_store.IsCurrent(sectionNumber, channel.Name)
+
+    def _AssembleRegion(self, channel, tilesPath, region, level):
+        '''Assemble the tiles of a channel intersecting the region at a pyramid level'''
+        with self._metrics.Stage('LoadTransform'):
+            (mosaic, tile_index) = self.TransformCache.GetTileIndex(channel.Transform.FullPath)
+
+        return self._AssembleMosaicRegion(mosaic, tile_index, [tilesPath], region, level)[0]
+
+    def _AssembleMosaicRegion(self, mosaic, tile_index, tilesPaths, region, level):
+        '''Assemble the tiles of a mosaic intersecting the region from each of several tile directories sharing its layout
+           :returns: list of images, one per tiles path
+        '''
+        return self._AssemblePlacedTiles(spatial.MosaicForRegion(mosaic, tile_index, region), tilesPaths, region, level)
+
+    def _AssemblePlacedTiles(self, region_mosaic, tilesPaths, region, level, return_masks=False):
+        '''Assemble the tiles already selected for a region by :func:`spatial.MosaicForRegion` from each tile directory
+           :param Mosaic region_mosaic: The tiles of the mosaic intersecting the region, None if there are none
+           :param bool return_masks: Return (image, coverage mask) tuples instead of images
+           :returns: list of images, one per tiles path
+        '''
+        if region_mosaic is None:
+            images = [assemble.EmptyRegionImage(region, level) for tilesPath in tilesPaths]
+            if return_masks:
+                return [(image, numpy.zeros(image.shape, dtype=bool)) for image in images]
+
+            return images
 
-            for channel in vol_registered_channels:
-                mosaic = nornir_imageregistration.Mosaic.LoadFromMosaicFile(channel.transform.FullPath)
-                downsample = resolution / channel.Scale.X.UnitsPerPixel
-                tilesPath = channel.GetTilesPath(filtername='Leveled', level=int(downsample))
-                [image, mask] = mosaic.AssembleTiles(tilesPath, FixedRegion=rect.ToArray(), usecluster=False)
+        tile_names = list(region_mosaic.ImageToTransform.keys())
+        images = []
+        for tilesPath in tilesPaths:
+            self._metrics.Increment('tiles_touched', len(tile_names))
+            self._metrics.Increment('tile_bytes_read', assemble.TileBytes(tilesPath, tile_names))
 
-                # TODO: Scale the image to the requested size
-                images[sectionNumber] = nornir_imageregistration.ChangeImageDownsample(image, int(downsample), downsample)
+            with self._metrics.Stage('AssembleTiles', tiles=len(tile_names)):
+                result = assemble.AssembleRegion(region_mosaic, tilesPath, region, return_mask=return_masks)
+
+            # Regions are on the pixel grid of the level, so the image has exactly the pixels of the region
+            shape = spatial.PixelShape(region, level)
+            if return_masks:
+                images.append((assemble.FitToShape(result[0], shape), assemble.FitToShape(result[1], shape)))
+            else:
+                images.append(assemble.FitToShape(result, shape))
 
         return images
 
+    def _ComposeFromChunks(self, sectionNumber, channel, tilesPath, rect, level):
+        '''Build the image of a region at a pyramid level from cached chunks, assembling only the chunks that are missing.
+           Empty chunks are left as the zeros the image starts with.'''
+        chunk_shape = self._chunk_cache.ChunkShape
+        pixel_region = spatial.PixelRegion(rect, level)
+
+        image = None
+        for chunk_index in spatial.ChunksInRegion(pixel_region, chunk_shape):
+            chunk = self._GetChunk(sectionNumber, channel, tilesPath, level, chunk_index)
+            if chunk is EmptyChunk:
+                continue
+
+            if image is None:
+                image = numpy.zeros((pixel_region[2] - pixel_region[0], pixel_region[3] - pixel_region[1]), dtype=chunk.dtype)
+
+            assemble.CopyOverlap(image, pixel_region, chunk, spatial.ChunkPixelRegion(chunk_index, chunk_shape))
+
+        if image is None:
+            image = assemble.EmptyRegionImage(rect, level)
+
+        return image
+
+    def _GetChunk(self, sectionNumber, channel, tilesPath, level, chunk_index):
+        key = (sectionNumber, channel.Name, level) + tuple(chunk_index)
+        chunk = self._chunk_cache.Get(key)
+        if chunk is not None:
+            return chunk
+
+        return self._Coalesce(key, lambda: self._AssembleChunk(key, channel, tilesPath, level, chunk_index))
+
+    def _AssembleChunk(self, key, channel, tilesPath, level, chunk_index):
+        # Another request may have cached the chunk between our cache miss and taking the lead
+        if key in self._chunk_cache:
+            chunk = self._chunk_cache.Get(key)
+            if chunk is not None:
+                return chunk
+
+        chunk_shape = self._chunk_cache.ChunkShape
+        chunk_region = spatial.ChunkRegion(chunk_index, chunk_shape, level)
+
+        with self._metrics.Stage('LoadTransform'):
+            (mosaic, tile_index) = self.TransformCache.GetTileIndex(channel.Transform.FullPath)
+
+        region_mosaic = spatial.MosaicForRegion(mosaic, tile_index, chunk_region)
+        if region_mosaic is None:
+            # No tile covers the chunk, record that without assembling or storing any pixels
+            self._metrics.Increment('empty_chunks')
+            self._chunk_cache.PutEmpty(key)
+            return EmptyChunk
+
+        chunk = self._AssemblePlacedTiles(region_mosaic, [tilesPath], chunk_region, level)[0]
+        chunk = assemble.FitToShape(chunk, chunk_shape)
+
+        # Cached before waiting callers are released, so later requests find the chunk in the cache.
+        # Chunks whose tiles are blank in the region are kept as metadata like chunks no tile covers.
+        if not numpy.any(chunk):
+            self._metrics.Increment('empty_chunks')
+            self._chunk_cache.PutEmpty(key)
+            return EmptyChunk
+
+        self._chunk_cache.Put(key, chunk)
+        return chunk
+
+    def _Coalesce(self, key, func):
+        '''Run func once for concurrent requests with the same (section, channel, level, chunk or region) key.
+           Waiting callers receive the same object as the caller that ran it, or its exception.'''
+        start = time.perf_counter()
+        (result, coalesced) = self._coalescer.Do(key, func)
+        if coalesced:
+            self._metrics.RecordStage('WaitCoalesced', time.perf_counter() - start)
+            self._metrics.Increment('coalesced_requests')
+
+        return result
+
     ##########Non interface methods##############
 #
 #     def MatchingSectionChannels(self, section):
@@ -161,23 +1271,86 @@ class Volume(VolumeInterface):
 #
 
     def Calculate2DBoundingBox(self):
-        transforms = []
-        for vol_registered_channel in self._MatchingChannels(channelname=None):
-            transform_fullpath = vol_registered_channel.transform.FullPath
-            transform = nornir_imageregistration.Mosaic.LoadFromMosaicFile(transform_fullpath)
-            transforms.append(transform)
+        '''Return the (minY, minX, maxY, maxX) bounds of every section.  The bounds of each section are remembered,
+           so :meth:`Refresh` only recalculates the bounds of sections that changed.'''
+        transform_path_map = self.transform_path_map
+        return UnionBounds([self._SectionBounds(sectionNumber, transform_path_map) for sectionNumber in transform_path_map.keys()])
 
-        return nornir_imageregistration.transforms.utils.FixedBoundingBox(transforms)
+    def CalculateSectionBoundingBox(self, sectionNumber):
+        '''Return the (minY, minX, maxY, maxX) XY bounding box of every channel of a section'''
+        return list(self._SectionBounds(sectionNumber, self.transform_path_map))
 
-    def _MatchingChannels(self, channelname=None):
-        '''Return all transforms matching the channelname, or all transforms if channelname is None'''
 
-        transform_paths = []
-        for section, channelmap in self.transform_path_map.items():
-            for channel in GetChannels(channelmap, channelname):
-                yield channel
+class DataRequest(object):
+    """A :meth:`Volume.GetData` request planned by :meth:`Volume.PlanRequest`.
 
-        return
+    Holds the output of the request and the sections it covers.  Section images may be written
+    from several threads at once.
+    """
+
+    @property
+    def Resolution(self):
+        return self._resolution
+
+    @property
+    def ChannelNames(self):
+        '''Channels of the request, in the order of the channel axis'''
+        return self._channel_names
+
+    @property
+    def BoundingBox(self):
+        return self._boundingbox
+
+    @property
+    def Rect(self):
+        '''(minY, minX, maxY, maxX) in volume space sampled by the output pixels of the request'''
+        return self._rect
+
+    @property
+    def SectionNumbers(self):
+        '''Known sections in the request, in order'''
+        return self._section_numbers
+
+    @property
+    def Output(self):
+        '''The :class:`assemble.OutputBuffer` images are written into'''
+        return self._output
+
+    @property
+    def SliceShape(self):
+        return self._output.SliceShape
+
+    @property
+    def StartTime(self):
+        return self._start_time
+
+    @property
+    def WrittenSections(self):
+        return self._written_sections
+
+    @property
+    def NumImages(self):
+        return self._num_images
+
+    def __init__(self, resolution, channel_names, boundingbox, rect, output, section_numbers):
+        self._start_time = time.perf_counter()
+        self._resolution = resolution
+        self._channel_names = channel_names
+        self._boundingbox = boundingbox
+        self._rect = rect
+        self._output = output
+        self._section_numbers = section_numbers
+        self._written_sections = set()
+        self._num_images = 0
+        self._lock = threading.Lock()
+
+    def Write(self, sectionNumber, channel_name, image):
+        '''Write the image of a section/channel into the output'''
+        # Each section/channel has its own slice, so only the bookkeeping needs the lock
+        self._output.Write(sectionNumber, channel_name, image)
+        with self._lock:
+            self._written_sections.add(sectionNumber)
+            self._num_images += 1
 
 
 class VolumeRegisteredChannel(object):
@@ -199,6 +1372,19 @@ class VolumeRegisteredChannel(object):
     def Scale(self):
         return self._channelModel.Scale
 
+    @property
+    def FilterNames(self):
+        return list(self._channelModel.Filters.keys())
+
+    def GetLevelPaths(self, filtername):
+        '''Return a {downsample: path} dictionary of the pyramid levels of the filter'''
+        filterObj = self._channelModel.Filters[filtername]
+        return dict([(levelObj.Downsample, levelObj.FullPath) for levelObj in filterObj.TilePyramid.Levels])
+
+    def GetLevel(self, filtername, downsample):
+        '''Return (level downsample, tiles path) of the coarsest pyramid level that still meets the requested downsample'''
+        return assemble.SelectLevel(self.GetLevelPaths(filtername), downsample)
+
     def GetTilesPath(self, filtername, level):
         filterObj = self._channelModel.Filters[filtername]
         levelObj = filterObj.TilePyramid.GetMoreOrEquallyDetailedLevel(level)
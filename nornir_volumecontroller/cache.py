@@ -0,0 +1,480 @@
+'''
+Caches shared by volume controllers.
+
+Parsing a .mosaic file is expensive for sections with many tiles and the same
+transforms are needed by every request that touches a section, so
+:class:`TransformCache` keeps parsed mosaics in memory until their file
+changes on disk or the memory budget forces them out.  :class:`ChunkCache`
+keeps fixed size chunks of assembled sections so overlapping requests only
+assemble the pixels that no earlier request produced.  :class:`RequestCoalescer`
+lets concurrent requests needing the same chunk share one assembly instead of
+each producing it.
+'''
+
+import collections
+import concurrent.futures
+import hashlib
+import os
+import threading
+
+import nornir_imageregistration
+
+from . import spatial
+
+DefaultTransformCacheBytes = 256 * 1024 * 1024
+
+
+def FileStamp(path):
+    '''Return a (mtime_ns, size) tuple identifying the current contents of a file'''
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class TransformCache(object):
+    """Least-recently-used cache of parsed mosaic transforms.
+
+    Entries are keyed by file path and validated against the file's mtime and size
+    on every lookup, so a transform rewritten on disk is reloaded on its next use.
+    The memory cost of an entry is approximated by the size of the .mosaic file.
+
+    Files with identical contents share one parsed transform and tile index, so channels
+    registered with copies of the same mosaic are parsed once and can be recognized as
+    sharing a tile layout by comparing the returned objects.
+    """
+
+    @property
+    def MaxBytes(self):
+        return self._max_bytes
+
+    @MaxBytes.setter
+    def MaxBytes(self, val):
+        with self._lock:
+            self._max_bytes = val
+            self._EvictToBudget()
+
+    @property
+    def ResidentBytes(self):
+        return self._resident_bytes
+
+    @property
+    def Hits(self):
+        return self._hits
+
+    @property
+    def Misses(self):
+        return self._misses
+
+    @property
+    def Evictions(self):
+        return self._evictions
+
+    @property
+    def Shared(self):
+        '''Number of loads satisfied by the parsed transform of another file with the same contents'''
+        return self._shared
+
+    def __init__(self, max_bytes=DefaultTransformCacheBytes, loader=None):
+        '''
+        :param int max_bytes: Approximate memory budget for cached transforms, None for no limit
+        :param func loader: Function taking a path and returning a transform, defaults to Mosaic.LoadFromMosaicFile
+        '''
+        if loader is None:
+            loader = nornir_imageregistration.Mosaic.LoadFromMosaicFile
+
+        self._loader = loader
+        self._max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._digests = {}  # content digest -> key of the entry that parsed it
+        self._lock = threading.Lock()
+
+        self._resident_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._shared = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._entries
+
+    def Get(self, path):
+        '''Return the parsed transform for the file, loading it if it is not cached or has changed on disk'''
+        key = os.path.abspath(path)
+        stamp = FileStamp(key)
+
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+
+            self._misses += 1
+
+        digest = TransformCache._FileDigest(key)
+
+        with self._lock:
+            shared_entry = self._entries.get(self._digests.get(digest, None), None)
+
+        if shared_entry is not None:
+            (transform, tile_index) = (shared_entry[1], shared_entry[2])
+        else:
+            (transform, tile_index) = (self._loader(key), None)
+
+        with self._lock:
+            if shared_entry is not None:
+                self._shared += 1
+
+            self._Remove(key)
+            # [stamp, transform, tile index built on demand, content digest]
+            self._entries[key] = [stamp, transform, tile_index, digest]
+            self._digests.setdefault(digest, key)
+            self._resident_bytes += stamp[1]
+            self._EvictToBudget()
+
+        return transform
+
+    @classmethod
+    def _FileDigest(cls, path):
+        '''Digest of a file's contents, reading a mosaic costs far less than parsing it'''
+        digest = hashlib.sha1()
+        with open(path, 'rb') as hFile:
+            for block in iter(lambda: hFile.read(1 << 20), b''):
+                digest.update(block)
+
+        return digest.digest()
+
+    def GetTileIndex(self, path):
+        '''Return the transform for the file and a :class:`~nornir_volumecontroller.spatial.TileIndex` of its tiles.
+           The index is built the first time it is requested and discarded with the transform.
+           :returns: (transform, TileIndex) tuple
+        '''
+        transform = self.Get(path)
+        key = os.path.abspath(path)
+
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None and entry[1] is transform and entry[2] is not None:
+                return (transform, entry[2])
+
+        tile_index = spatial.TileIndex.CreateFromMosaic(transform)
+
+        with self._lock:
+            # Every entry sharing the transform also shares its index
+            for entry in self._entries.values():
+                if entry[1] is transform:
+                    entry[2] = tile_index
+
+        return (transform, tile_index)
+
+    def Invalidate(self, path=None):
+        '''Remove the transform for path from the cache, or every transform if path is None'''
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._digests.clear()
+                self._resident_bytes = 0
+            else:
+                self._Remove(os.path.abspath(path))
+
+    def ResetStats(self):
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._shared = 0
+
+    def Stats(self):
+        '''Return a dictionary describing the cache usage'''
+        return {'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'shared': self._shared,
+                'entries': len(self._entries),
+                'resident_bytes': self._resident_bytes,
+                'max_bytes': self._max_bytes}
+
+    def _Remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._Forget(key, entry)
+
+    def _Forget(self, key, entry):
+        '''Release the accounting of an entry removed from the cache'''
+        self._resident_bytes -= entry[0][1]
+        if self._digests.get(entry[3], None) != key:
+            return
+
+        # Another resident file with the same contents keeps sharing the transform
+        del self._digests[entry[3]]
+        for (other_key, other_entry) in self._entries.items():
+            if other_entry[3] == entry[3]:
+                self._digests[entry[3]] = other_key
+                break
+
+    def _EvictToBudget(self):
+        if self._max_bytes is None:
+            return
+
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        while self._resident_bytes > self._max_bytes and len(self._entries) > 1:
+            (key, entry) = self._entries.popitem(last=False)
+            self._Forget(key, entry)
+            self._evictions += 1
+
+
+DefaultChunkCacheBytes = 512 * 1024 * 1024
+DefaultChunkShape = (512, 512)
+
+# Approximate memory held by an empty chunk's entry, its key and the links of the LRU order, so empty chunks are evicted too
+EmptyChunkBytes = 256
+
+
+class _EmptyChunk(object):
+    '''Cached in place of a chunk whose pixels are all zero, such as a chunk no tile covers'''
+
+    nbytes = EmptyChunkBytes
+
+    def __repr__(self):
+        return 'EmptyChunk'
+
+
+EmptyChunk = _EmptyChunk()
+
+
+class ChunkCache(object):
+    """Least-recently-used cache of assembled image chunks bounded by their total size in bytes.
+
+    Chunks are fixed size tiles of an assembled section on a grid aligned to the origin of
+    volume space.  Keys are (section number, channel name, level, chunk row, chunk column)
+    tuples.  Cached arrays are marked read-only since they are shared between requests.
+    Chunks without pixel data are cached as :data:`EmptyChunk`, which costs :data:`EmptyChunkBytes` of the budget.
+    """
+
+    @property
+    def ChunkShape(self):
+        '''(rows, columns) of every chunk, in pixels of the pyramid level the chunk was assembled from'''
+        return self._chunk_shape
+
+    @property
+    def MaxBytes(self):
+        return self._max_bytes
+
+    @MaxBytes.setter
+    def MaxBytes(self, val):
+        with self._lock:
+            self._max_bytes = val
+            self._EvictToBudget()
+
+    @property
+    def ResidentBytes(self):
+        return self._resident_bytes
+
+    @property
+    def Hits(self):
+        return self._hits
+
+    @property
+    def Misses(self):
+        return self._misses
+
+    @property
+    def Evictions(self):
+        return self._evictions
+
+    @property
+    def EmptyEntries(self):
+        '''Number of cached chunks stored as :data:`EmptyChunk`'''
+        return self._empty_entries
+
+    def __init__(self, max_bytes=DefaultChunkCacheBytes, chunk_shape=DefaultChunkShape):
+        '''
+        :param int max_bytes: Memory budget for cached chunks, None for no limit
+        :param tuple chunk_shape: (rows, columns) of each chunk
+        '''
+        self._max_bytes = max_bytes
+        self._chunk_shape = tuple([int(v) for v in chunk_shape])
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self._resident_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._empty_entries = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def Get(self, key):
+        '''Return the cached chunk for the key, :data:`EmptyChunk` if the chunk has no pixel data, or None if it is not cached'''
+        with self._lock:
+            chunk = self._entries.get(key, None)
+            if chunk is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return chunk
+
+    def Put(self, key, chunk):
+        '''Add a chunk to the cache, evicting the least recently used chunks if the budget is exceeded'''
+        chunk.flags.writeable = False
+
+        with self._lock:
+            self._Remove(key)
+            self._entries[key] = chunk
+            self._resident_bytes += chunk.nbytes
+            self._EvictToBudget()
+
+    def PutEmpty(self, key):
+        '''Record that every pixel of a chunk is zero without storing its pixels'''
+        with self._lock:
+            self._Remove(key)
+            self._entries[key] = EmptyChunk
+            self._resident_bytes += EmptyChunk.nbytes
+            self._empty_entries += 1
+            self._EvictToBudget()
+
+    def Invalidate(self, sectionNumber=None, channel_name=None):
+        '''Remove cached chunks matching the section and channel, None matches any value'''
+        with self._lock:
+            if sectionNumber is None and channel_name is None:
+                self._entries.clear()
+                self._resident_bytes = 0
+                self._empty_entries = 0
+                return
+
+            for key in list(self._entries.keys()):
+                if sectionNumber is not None and key[0] != sectionNumber:
+                    continue
+                if channel_name is not None and key[1] != channel_name:
+                    continue
+
+                self._Remove(key)
+
+    def ResetStats(self):
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    def Stats(self):
+        '''Return a dictionary describing the cache usage'''
+        return {'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'entries': len(self._entries),
+                'empty_entries': self._empty_entries,
+                'resident_bytes': self._resident_bytes,
+                'max_bytes': self._max_bytes}
+
+    def _Remove(self, key):
+        chunk = self._entries.pop(key, None)
+        if chunk is not None:
+            self._Forget(chunk)
+
+    def _Forget(self, chunk):
+        self._resident_bytes -= chunk.nbytes
+        if chunk is EmptyChunk:
+            self._empty_entries -= 1
+
+    def _EvictToBudget(self):
+        if self._max_bytes is None:
+            return
+
+        while self._resident_bytes > self._max_bytes and len(self._entries) > 1:
+            (key, chunk) = self._entries.popitem(last=False)
+            self._Forget(chunk)
+            self._evictions += 1
+
+
+class RequestCoalescer(object):
+    """Single-flight execution of work identified by a key.
+
+    The first caller of :meth:`Do` for a key runs the work, callers asking for the same key
+    while it is running wait for and receive the same result, or the same exception.  Nothing
+    is retained once the work completes, caching results is left to the caller.
+    """
+
+    @property
+    def Executed(self):
+        '''Number of times the work of a key was run'''
+        return self._executed
+
+    @property
+    def Coalesced(self):
+        '''Number of calls that waited for work already running instead of running it again'''
+        return self._coalesced
+
+    @property
+    def Failed(self):
+        '''Number of times the work raised an exception, which was passed to every waiting caller'''
+        return self._failed
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> future of the running work
+
+        self._executed = 0
+        self._coalesced = 0
+        self._failed = 0
+
+    def __len__(self):
+        return len(self._inflight)
+
+    def __contains__(self, key):
+        return key in self._inflight
+
+    def Do(self, key, func):
+        '''Return func(), or the result of the call already running for the key
+        :returns: (result, coalesced) where coalesced is True if this caller waited for another caller's work
+        '''
+        with self._lock:
+            future = self._inflight.get(key, None)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                future.set_running_or_notify_cancel()
+                self._inflight[key] = future
+                self._executed += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            return (future.result(), True)
+
+        try:
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                self._failed += 1
+                del self._inflight[key]
+
+            future.set_exception(e)
+            raise
+        else:
+            with self._lock:
+                del self._inflight[key]
+
+            future.set_result(result)
+            return (result, False)
+
+    def ResetStats(self):
+        with self._lock:
+            self._executed = 0
+            self._coalesced = 0
+            self._failed = 0
+
+    def Stats(self):
+        '''Return a dictionary describing how much work was shared'''
+        return {'executed': self._executed,
+                'coalesced': self._coalesced,
+                'failed': self._failed,
+                'inflight': len(self._inflight)}
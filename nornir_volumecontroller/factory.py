@@ -4,14 +4,101 @@ Created on Apr 10, 2014
 @author: u0490822
 '''
 
+import logging
+
 import nornir_volumecontroller
 import nornir_volumemodel
 
+from .baked import BakedStore, BakedStorePathForVolumeXml
+from .manifest import VolumeManifest, ManifestPathForVolumeXml
+from .snapshot import VolumeSnapshot, SnapshotPathForVolumeXml
+
 
-def CreateVolumeController(vol_model):
-    '''Given a volume model create a controller for the model'''
+def CreateVolumeController(vol_model, manifest_path=None, use_manifest=True, use_snapshot=False, use_baked_store=True, **kwargs):
+    '''Given a volume model create a controller for the model
+    :param vol_model: Volume model or path to a VolumeData.xml file
+    :param str manifest_path: Location of the volume manifest, defaults to a file beside VolumeData.xml
+    :param bool use_manifest: When vol_model is a path, construct the controller from a valid manifest
+                              instead of parsing the volume, and write a new manifest if none is valid
+    :param bool use_snapshot: When vol_model is a path, start from a binary snapshot beside VolumeData.xml and load the
+                              volume model only when it is first used.  The snapshot is written if none is valid.
+                              Takes precedence over use_manifest.
+    :param bool use_baked_store: When vol_model is a path and baked_store is not specified, read current sections
+                                 from the baked store beside VolumeData.xml if a valid one exists.  Sections whose
+                                 sources changed since they were baked are assembled from their tiles, pass False
+                                 to always assemble from tiles.
+    :param kwargs: Additional options passed to the :class:`~nornir_volumecontroller.base_objects.Volume`
+                   constructor, such as executor, max_inflight_sections, chunk_cache or baked_store.
+    '''
 
     if(isinstance(vol_model, str)):
-        vol_model = nornir_volumemodel.Load_Xml(vol_model)
+        # Lets Refresh reload the XML when sections are added or removed
+        kwargs.setdefault('volume_xml_path', vol_model)
+
+        if use_baked_store and kwargs.get('baked_store', None) is None:
+            kwargs['baked_store'] = BakedStore.Open(BakedStorePathForVolumeXml(vol_model))
+
+        if use_snapshot:
+            return _CreateVolumeControllerWithSnapshot(vol_model, **kwargs)
+        elif not use_manifest:
+            vol_model = nornir_volumemodel.Load_Xml(vol_model)
+        else:
+            return _CreateVolumeControllerWithManifest(vol_model, manifest_path, **kwargs)
+
+    return nornir_volumecontroller.Volume(vol_model, **kwargs)
+
+
+def _CreateVolumeControllerWithManifest(volume_xml_path, manifest_path, transform_cache=None, **kwargs):
+    if manifest_path is None:
+        manifest_path = ManifestPathForVolumeXml(volume_xml_path)
+
+    manifest = VolumeManifest.Load(manifest_path)
+    if manifest is not None and manifest.IsValid():
+        return nornir_volumecontroller.Volume(None, transform_cache=transform_cache, manifest=manifest, **kwargs)
+
+    vol_model = nornir_volumemodel.Load_Xml(volume_xml_path)
+    model_controller = nornir_volumecontroller.Volume(vol_model, transform_cache=transform_cache, **kwargs)
+
+    manifest = VolumeManifest.Build(model_controller, manifest_path, source_paths=[volume_xml_path])
+    try:
+        manifest.Save(manifest_path)
+    except OSError as e:
+        logging.getLogger(__name__).warning("Could not write volume manifest %s: %s" % (manifest_path, str(e)))
+
+    # Share the transforms loaded while building the manifest with the new controller
+    return nornir_volumecontroller.Volume(vol_model,
+                                          transform_cache=model_controller.TransformCache,
+                                          manifest=manifest,
+                                          **kwargs)
+
+
+def _CreateVolumeControllerWithSnapshot(volume_xml_path, transform_cache=None, **kwargs):
+    snapshot_path = SnapshotPathForVolumeXml(volume_xml_path)
+
+    snapshot = VolumeSnapshot.Load(snapshot_path)
+    if snapshot is not None and snapshot.IsValid(volume_xml_path):
+        if snapshot.Modified:
+            _SaveSnapshot(snapshot, snapshot_path)
+
+        return nornir_volumecontroller.Volume(snapshot.CreateModel(volume_xml_path),
+                                              transform_cache=transform_cache,
+                                              manifest=snapshot.Manifest,
+                                              **kwargs)
+
+    vol_model = nornir_volumemodel.Load_Xml(volume_xml_path)
+    model_controller = nornir_volumecontroller.Volume(vol_model, transform_cache=transform_cache, **kwargs)
+
+    snapshot = VolumeSnapshot.Build(model_controller, volume_xml_path, snapshot_path)
+    _SaveSnapshot(snapshot, snapshot_path)
+
+    return nornir_volumecontroller.Volume(vol_model,
+                                          transform_cache=model_controller.TransformCache,
+                                          manifest=snapshot.Manifest,
+                                          **kwargs)
+
 
-    return nornir_volumecontroller.Volume(vol_model)
\ No newline at end of file
+def _SaveSnapshot(snapshot, snapshot_path):
+    try:
+        snapshot.Save(snapshot_path)
+    except OSError as e:
+        logging.getLogger(__name__).warning("Could not write volume snapshot %s: %s" % (snapshot_path, str(e)))
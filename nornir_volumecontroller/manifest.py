@@ -0,0 +1,309 @@
+'''
+On-disk manifest of the information a volume controller needs to serve data.
+
+Building a controller from VolumeData.xml parses the entire volume model and
+every channel to volume mosaic before the first request can be answered.  The
+manifest records the result of that work, the section to channel to transform
+map, the XY bounds of each section, channel scales and pyramid levels, in a
+small JSON file.  It remains valid until the volume XML or one of the
+transforms it was built from changes on disk.
+'''
+
+import collections.abc
+import json
+import os
+
+import nornir_imageregistration
+import nornir_volumemodel
+
+from .assemble import SelectLevel
+from .cache import FileStamp
+
+ManifestVersion = 1
+DefaultManifestFilename = 'VolumeController.manifest.json'
+
+
+def ManifestPathForVolumeXml(volume_xml_path):
+    '''Default location of the manifest for a VolumeData.xml file'''
+    return os.path.join(os.path.dirname(os.path.abspath(volume_xml_path)), DefaultManifestFilename)
+
+
+def RectToList(rect):
+    '''Convert a rectangle or bounds array to a (minY, minX, maxY, maxX) list'''
+    if hasattr(rect, 'ToArray'):
+        rect = rect.ToArray()
+
+    return [float(v) for v in rect]
+
+
+def UnionBounds(bounds_list):
+    '''Return the (minY, minX, maxY, maxX) bounds containing every bounds in the list'''
+    bounds_list = list(bounds_list)
+    if len(bounds_list) == 0:
+        return None
+
+    return [min([b[nornir_imageregistration.iRect.MinY] for b in bounds_list]),
+            min([b[nornir_imageregistration.iRect.MinX] for b in bounds_list]),
+            max([b[nornir_imageregistration.iRect.MaxY] for b in bounds_list]),
+            max([b[nornir_imageregistration.iRect.MaxX] for b in bounds_list])]
+
+
+class ManifestTransform(object):
+    '''Location of a channel to volume transform recorded in a manifest'''
+
+    @property
+    def Name(self):
+        return self._name
+
+    @property
+    def FullPath(self):
+        return self._fullpath
+
+    def __init__(self, name, fullpath):
+        self._name = name
+        self._fullpath = fullpath
+
+
+class ManifestChannel(object):
+    """Stand-in for :class:`~nornir_volumecontroller.base_objects.VolumeRegisteredChannel` built from a manifest.
+
+    Exposes the same ``Name``, ``Transform``, ``Scale``, :meth:`GetTilesPath` and :meth:`GetLevel` members
+    without requiring the volume model to be loaded.
+    """
+
+    @property
+    def Name(self):
+        return self._name
+
+    @property
+    def Transform(self):
+        return self._transform
+
+    @property
+    def Scale(self):
+        if self._scale is None:
+            self._scale = nornir_volumemodel.Scale()
+            for (axis_name, (units_per_pixel, units_of_measure)) in self._scale_axes.items():
+                self._scale.SetAxis(axis_name, units_per_pixel, units_of_measure)
+
+        return self._scale
+
+    @property
+    def FilterNames(self):
+        return list(self._filters.keys())
+
+    def GetLevelPaths(self, filtername):
+        '''Return a {downsample: path} dictionary of the pyramid levels of the filter'''
+        return self._filters[filtername]
+
+    def GetTilesPath(self, filtername, level):
+        levels = self._filters[filtername]
+        candidates = [downsample for downsample in levels.keys() if downsample <= level]
+        if len(candidates) == 0:
+            raise ValueError("Missing level " + str(level))
+
+        return levels[max(candidates)]
+
+    def GetLevel(self, filtername, downsample):
+        '''Return (level downsample, tiles path) of the coarsest level meeting the requested downsample'''
+        return SelectLevel(self._filters[filtername], downsample)
+
+    def __init__(self, name, transform, scale_axes, filters):
+        '''
+        :param str name: Channel name
+        :param ManifestTransform transform: Channel to volume transform
+        :param dict scale_axes: {axis name: (units per pixel, units of measure)}
+        :param dict filters: {filter name: {downsample: tiles path}}
+        '''
+        self._name = name
+        self._transform = transform
+        self._scale_axes = scale_axes
+        self._filters = filters
+        self._scale = None
+
+
+class ManifestSectionMap(collections.abc.Mapping):
+    """Read-only {section_number: {channel_name: ManifestChannel}} map that builds the channels of a
+    section on first access, so volumes with thousands of sections are not expanded up front.
+    """
+
+    def __init__(self, manifest):
+        self._manifest = manifest
+        self._sections = dict([(int(number), section) for (number, section) in manifest._data['sections'].items()])
+        self._channelmaps = {}
+
+    def __getitem__(self, sectionNumber):
+        channelmap = self._channelmaps.get(sectionNumber, None)
+        if channelmap is None:
+            # Raises KeyError for unknown sections, as a dict would
+            channelmap = self._manifest._BuildChannelMap(self._sections[sectionNumber])
+            self._channelmaps[sectionNumber] = channelmap
+
+        return channelmap
+
+    def __contains__(self, sectionNumber):
+        return sectionNumber in self._sections
+
+    def __iter__(self):
+        return iter(self._sections)
+
+    def __len__(self):
+        return len(self._sections)
+
+    def keys(self):
+        return self._sections.keys()
+
+
+class VolumeManifest(object):
+    """Compact description of a volume sufficient to construct a controller without parsing the volume model.
+
+    Paths are stored relative to the directory containing the manifest so a volume can be
+    moved without invalidating it.
+    """
+
+    @property
+    def Name(self):
+        return self._data['name']
+
+    @property
+    def Channels(self):
+        return set(self._data['channels'])
+
+    @property
+    def SectionNumbers(self):
+        return sorted([int(number) for number in self._data['sections'].keys()])
+
+    @property
+    def Bounds(self):
+        '''Bounding box of the volume as (minZ, minY, minX, maxZ, maxY, maxX), None if there are no sections'''
+        section_numbers = self.SectionNumbers
+        boundsXY = UnionBounds([self.SectionBounds(number) for number in section_numbers])
+        if boundsXY is None:
+            return None
+
+        return [section_numbers[0],
+                boundsXY[nornir_imageregistration.iRect.MinY],
+                boundsXY[nornir_imageregistration.iRect.MinX],
+                section_numbers[-1],
+                boundsXY[nornir_imageregistration.iRect.MaxY],
+                boundsXY[nornir_imageregistration.iRect.MaxX]]
+
+    def SectionBounds(self, sectionNumber):
+        '''XY bounds of a section as (minY, minX, maxY, maxX)'''
+        return self._data['sections'][str(sectionNumber)]['bounds']
+
+    def SectionTransformPaths(self, sectionNumber):
+        '''Full paths of the transforms of every channel of a section, without building its channels'''
+        channels = self._data['sections'][str(sectionNumber)]['channels']
+        return [self._FullPath(channel['transform']['path']) for channel in channels.values()]
+
+    def __init__(self, data, root):
+        '''
+        :param dict data: Decoded manifest contents
+        :param str root: Directory relative paths in the manifest are resolved against
+        '''
+        self._data = data
+        self._root = root
+
+    def _FullPath(self, relpath):
+        return os.path.normpath(os.path.join(self._root, relpath))
+
+    def IsValid(self):
+        '''True if none of the files the manifest was built from have changed'''
+        if self._data.get('version', None) != ManifestVersion:
+            return False
+
+        for (relpath, stamp) in self._data['sources'].items():
+            try:
+                if list(FileStamp(self._FullPath(relpath))) != stamp:
+                    return False
+            except OSError:
+                return False
+
+        return True
+
+    def BuildTransformMap(self):
+        '''Build the {section_number: {channel_name: ManifestChannel}} map described by the manifest.
+           The channels of each section are created when the section is first accessed.'''
+        return ManifestSectionMap(self)
+
+    def _BuildChannelMap(self, section):
+        channelmap = {}
+        for (channel_name, channel) in section['channels'].items():
+            transform = ManifestTransform(channel['transform']['name'], self._FullPath(channel['transform']['path']))
+            scale_axes = dict([(axis_name, tuple(axis)) for (axis_name, axis) in channel['scale'].items()])
+            filters = {}
+            for (filter_name, levels) in channel['filters'].items():
+                filters[filter_name] = dict([(float(downsample), self._FullPath(path)) for (downsample, path) in levels.items()])
+
+            channelmap[channel_name] = ManifestChannel(channel_name, transform, scale_axes, filters)
+
+        return channelmap
+
+    def Save(self, path):
+        '''Write the manifest atomically, so concurrent readers never see a partial file'''
+        temp_path = path + '.%d.tmp' % os.getpid()
+        with open(temp_path, 'w') as hFile:
+            json.dump(self._data, hFile, separators=(',', ':'))
+
+        os.replace(temp_path, path)
+
+    @classmethod
+    def Load(cls, path):
+        '''Load a manifest, returning None if it does not exist or cannot be read'''
+        try:
+            with open(path, 'r') as hFile:
+                data = json.load(hFile)
+        except (OSError, ValueError):
+            return None
+
+        return VolumeManifest(data, os.path.dirname(os.path.abspath(path)))
+
+    @classmethod
+    def Build(cls, volumeController, path, source_paths=None):
+        '''Create a manifest describing a volume controller built from the volume model
+        :param Volume volumeController: Controller to describe, transforms are loaded through its cache
+        :param str path: Path the manifest will be saved to, relative paths are computed from its directory
+        :param list source_paths: Additional files, such as VolumeData.xml, whose modification invalidates the manifest
+        '''
+        root = os.path.dirname(os.path.abspath(path))
+
+        def relpath(fullpath):
+            return os.path.relpath(os.path.abspath(fullpath), root)
+
+        sources = {}
+        if source_paths is not None:
+            for source_path in source_paths:
+                sources[relpath(source_path)] = list(FileStamp(source_path))
+
+        sections = {}
+        for (sectionNumber, channelmap) in volumeController.transform_path_map.items():
+            channels = {}
+            for (channel_name, channel) in channelmap.items():
+                transform_path = channel.Transform.FullPath
+                sources[relpath(transform_path)] = list(FileStamp(transform_path))
+
+                scale = {}
+                for axis_name in channel.Scale.AxisNames:
+                    axis = channel.Scale.GetAxis(axis_name)
+                    scale[axis_name] = [axis.UnitsPerPixel, axis.UnitsOfMeasure]
+
+                filters = {}
+                for filter_name in channel.FilterNames:
+                    levels = channel.GetLevelPaths(filter_name)
+                    filters[filter_name] = dict([(repr(float(downsample)), relpath(level_path)) for (downsample, level_path) in levels.items()])
+
+                channels[channel_name] = {'transform': {'name': channel.Transform.Name, 'path': relpath(transform_path)},
+                                          'scale': scale,
+                                          'filters': filters}
+
+            sections[str(sectionNumber)] = {'bounds': RectToList(volumeController.CalculateSectionBoundingBox(sectionNumber)),
+                                            'channels': channels}
+
+        data = {'version': ManifestVersion,
+                'name': volumeController.Name,
+                'channels': sorted(volumeController.Channels),
+                'sources': sources,
+                'sections': sections}
+
+        return VolumeManifest(data, root)
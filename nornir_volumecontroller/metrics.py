@@ -0,0 +1,101 @@
+'''
+Lightweight instrumentation for volume controllers.
+
+:class:`VolumeMetrics` accumulates the time spent in each stage of a request
+and named counters.  Recording a stage costs two ``perf_counter`` calls and a
+short critical section, so it is intended to remain enabled in production.
+'''
+
+import contextlib
+import threading
+import time
+
+
+class StageStats(object):
+    '''Accumulated durations of one stage'''
+
+    __slots__ = ['count', 'total_seconds', 'max_seconds']
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def Add(self, seconds):
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def ToDict(self):
+        return {'count': self.count,
+                'total_seconds': self.total_seconds,
+                'max_seconds': self.max_seconds,
+                'mean_seconds': self.total_seconds / self.count if self.count > 0 else 0.0}
+
+
+class VolumeMetrics(object):
+    """Per-stage timings and counters of a volume controller.
+
+    Hooks added with :meth:`AddHook` are called as ``hook(stage_name, seconds, attributes)``
+    each time a stage completes, for example to forward timings to a tracing system.
+    Hooks run on the thread that completed the stage and must be thread safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._hooks = []
+
+    def AddHook(self, hook):
+        self._hooks = self._hooks + [hook]
+
+    def RemoveHook(self, hook):
+        self._hooks = [h for h in self._hooks if h is not hook]
+
+    @contextlib.contextmanager
+    def Stage(self, name, **attributes):
+        '''Context manager recording the duration of the enclosed block as the named stage.
+           The attributes dictionary is passed to hooks and may be updated inside the block.'''
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.RecordStage(name, time.perf_counter() - start, attributes)
+
+    def RecordStage(self, name, seconds, attributes=None):
+        with self._lock:
+            stats = self._stages.get(name, None)
+            if stats is None:
+                stats = StageStats()
+                self._stages[name] = stats
+
+            stats.Add(seconds)
+
+        for hook in self._hooks:
+            hook(name, seconds, attributes if attributes is not None else {})
+
+    def Increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def Counter(self, name):
+        return self._counters.get(name, 0)
+
+    def Reset(self):
+        with self._lock:
+            self._stages = {}
+            self._counters = {}
+
+    def Snapshot(self):
+        '''Return the current stage timings and counters as a dictionary'''
+        with self._lock:
+            return {'stages': dict([(name, stats.ToDict()) for (name, stats) in self._stages.items()]),
+                    'counters': dict(self._counters)}
+
+
+def HitRate(stats):
+    '''Fraction of cache lookups that hit, from a cache Stats() dictionary'''
+    lookups = stats['hits'] + stats['misses']
+    return float(stats['hits']) / lookups if lookups > 0 else 0.0
@@ -0,0 +1,250 @@
+'''
+Speculative read-ahead for sequential section browsing.
+
+Viewers commonly step through a volume one section at a time with the same
+XY region and resolution.  :class:`ZPrefetcher` recognizes that pattern from
+the requests a :class:`~nornir_volumecontroller.base_objects.Volume` serves and
+assembles the next sections in the scrolling direction in the background.
+'''
+
+import collections
+import concurrent.futures
+import threading
+
+DefaultPrefetchDepth = 2
+DefaultMaxPending = 4
+DefaultPrefetchBytes = 256 * 1024 * 1024
+
+
+def PrefetchKey(sectionNumber, channel_name, rect, resolution, output_shape):
+    '''Identifies the image of one channel of one section for a request'''
+    return (sectionNumber, channel_name, tuple([float(v) for v in rect]), float(resolution), tuple(output_shape))
+
+
+class ZPrefetcher(object):
+    """Assembles the sections following a run of requests that move through Z in one direction.
+
+    A request continues the pattern when it has the same XY region, resolution, channels and
+    output shape as the previous request, and its Z range immediately follows or precedes the
+    previous one.  Any other request cancels the speculative work.  Prefetched images are held
+    until a request takes them, or they are discarded as wasted when the pattern breaks or the
+    memory budget is exceeded.  Over budget, the sections farthest ahead are discarded first
+    and no further read-ahead is scheduled until images are taken.
+    """
+
+    @property
+    def Depth(self):
+        '''Number of sections assembled ahead of the most recent request'''
+        return self._depth
+
+    def __init__(self, depth=DefaultPrefetchDepth, max_pending=DefaultMaxPending, max_bytes=DefaultPrefetchBytes, executor=None):
+        '''
+        :param int depth: Number of sections to assemble ahead of the most recent request
+        :param int max_pending: Maximum number of section/channel images being assembled at once
+        :param int max_bytes: Memory budget for assembled images waiting to be taken
+        :param Executor executor: Thread pool for speculative work, a single worker pool is created if None
+        '''
+        self._depth = depth
+        self._max_pending = max_pending
+        self._max_bytes = max_bytes
+
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+        self._executor = executor
+        self._volume = None
+
+        # Reentrant since a done callback runs immediately when added to a future that already finished
+        self._lock = threading.RLock()
+        self._entries = collections.OrderedDict()  # key -> future
+        self._resident = {}  # key -> bytes of completed images
+        self._resident_bytes = 0
+        self._last_request = None
+        self._direction = None
+
+        self._issued = 0
+        self._hits = 0
+        self._wasted = 0
+        self._cancelled = 0
+
+    def Attach(self, volume):
+        '''Called by the volume the prefetcher is attached to'''
+        self._volume = volume
+
+    def Take(self, key):
+        '''Return the future of a prefetched image and stop tracking it, or None if the image was not prefetched'''
+        with self._lock:
+            future = self._entries.pop(key, None)
+            if future is None:
+                return None
+
+            self._hits += 1
+            self._resident_bytes -= self._resident.pop(key, 0)
+
+        self._volume.Metrics.Increment('prefetch_hits')
+        return future
+
+    def Observe(self, rect, resolution, channel_names, output_shape, minZ, maxZ):
+        '''Record a completed request and schedule or cancel speculative work accordingly'''
+        signature = (tuple([float(v) for v in rect]), float(resolution), tuple(channel_names), tuple(output_shape))
+
+        with self._lock:
+            last = self._last_request
+            self._last_request = (signature, minZ, maxZ)
+
+            if last is None:
+                return
+
+            (last_signature, lastMinZ, lastMaxZ) = last
+            if last_signature != signature:
+                self._CancelAll()
+                self._direction = None
+                return
+
+            if minZ == lastMinZ and maxZ == lastMaxZ:
+                return
+
+            if minZ == lastMaxZ + 1:
+                direction = 1
+            elif maxZ == lastMinZ - 1:
+                direction = -1
+            else:
+                self._CancelAll()
+                self._direction = None
+                return
+
+            if self._direction is not None and direction != self._direction:
+                self._CancelAll()
+
+            self._direction = direction
+            self._DiscardBehind(minZ, maxZ)
+
+            if direction > 0:
+                sections = range(maxZ + 1, maxZ + 1 + self._depth)
+            else:
+                sections = range(minZ - 1, minZ - 1 - self._depth, -1)
+
+            self._Schedule(sections, signature)
+
+    def _Schedule(self, sections, signature):
+        (rect, resolution, channel_names, output_shape) = signature
+        transform_path_map = self._volume.transform_path_map
+
+        for sectionNumber in sections:
+            if sectionNumber not in transform_path_map:
+                continue
+
+            for channel_name in channel_names:
+                channel = transform_path_map[sectionNumber].get(channel_name, None)
+                if channel is None:
+                    continue
+
+                key = PrefetchKey(sectionNumber, channel_name, rect, resolution, output_shape)
+                if key in self._entries:
+                    continue
+
+                if self._PendingCount() >= self._max_pending:
+                    return
+
+                # Images assembled now would only be discarded again
+                if self._OverBudget():
+                    self._volume.Metrics.Increment('prefetch_skipped_over_budget')
+                    return
+
+                future = self._executor.submit(self._volume._AssembleChannel, sectionNumber, channel, rect, resolution, output_shape)
+                self._entries[key] = future
+                future.add_done_callback(lambda f, key=key: self._OnComplete(key, f))
+                self._issued += 1
+                self._volume.Metrics.Increment('prefetch_issued')
+
+    def _PendingCount(self):
+        return len([future for future in self._entries.values() if not future.done()])
+
+    def _OnComplete(self, key, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        with self._lock:
+            if self._entries.get(key, None) is not future:
+                # Already taken or discarded
+                return
+
+            nbytes = future.result().nbytes
+            self._resident[key] = nbytes
+            self._resident_bytes += nbytes
+            self._EvictToBudget()
+
+    def _Distance(self, key):
+        '''Number of sections between a prefetched section and the most recent request, in the scroll direction'''
+        if self._last_request is None:
+            return 0
+
+        (signature, minZ, maxZ) = self._last_request
+        if self._direction is not None and self._direction < 0:
+            return minZ - key[0]
+
+        return key[0] - maxZ
+
+    def _OverBudget(self):
+        return self._max_bytes is not None and self._resident_bytes > self._max_bytes
+
+    def _EvictToBudget(self):
+        '''Discard completed images from the far end of the read-ahead window until the budget is met.
+           The nearest sections are needed next, so they are always kept.'''
+        if not self._OverBudget() or len(self._resident) == 0:
+            return
+
+        resident = sorted(self._resident.keys(), key=self._Distance, reverse=True)
+        nearest = self._Distance(resident[-1])
+        for key in resident:
+            if not self._OverBudget() or self._Distance(key) <= nearest:
+                return
+
+            self._Discard(key)
+
+    def _Discard(self, key):
+        '''Stop tracking speculative work that will not be used'''
+        future = self._entries.pop(key)
+        if future.cancel():
+            self._cancelled += 1
+            self._volume.Metrics.Increment('prefetch_cancelled')
+            return
+
+        self._resident_bytes -= self._resident.pop(key, 0)
+        self._wasted += 1
+        self._volume.Metrics.Increment('prefetch_wasted')
+
+    def _DiscardBehind(self, minZ, maxZ):
+        '''Discard prefetched sections the scroll direction has passed'''
+        for key in list(self._entries.keys()):
+            sectionNumber = key[0]
+            if (self._direction > 0 and sectionNumber < minZ) or (self._direction < 0 and sectionNumber > maxZ):
+                self._Discard(key)
+
+    def _CancelAll(self):
+        for key in list(self._entries.keys()):
+            self._Discard(key)
+
+    def Cancel(self):
+        '''Cancel all speculative work and forget the request pattern'''
+        with self._lock:
+            self._CancelAll()
+            self._last_request = None
+            self._direction = None
+
+    def Close(self):
+        self.Cancel()
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    def Stats(self):
+        '''Return a dictionary describing the prefetch effectiveness'''
+        return {'issued': self._issued,
+                'hits': self._hits,
+                'wasted': self._wasted,
+                'cancelled': self._cancelled,
+                'pending': self._PendingCount(),
+                'entries': len(self._entries),
+                'resident_bytes': self._resident_bytes,
+                'hit_rate': float(self._hits) / self._issued if self._issued > 0 else 0.0}
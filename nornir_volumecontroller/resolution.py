@@ -0,0 +1,176 @@
+'''
+Columnar index of the resolution and pyramid levels of every section/channel.
+
+Answering resolution queries from the volume model means visiting every
+section and channel in a Z range and comparing model ``Scale`` objects.
+:class:`ResolutionIndex` collects the same information once into NumPy
+arrays, so the highest resolution, available levels and channel coverage of
+any Z range are vectorized reductions over a slice of sections.
+'''
+
+import numpy
+
+import nornir_volumemodel
+
+DefaultIndexFilter = 'Leveled'
+
+
+class ResolutionIndex(object):
+    """Per-section, per-channel units per pixel and pyramid level availability of a volume.
+
+    Arrays are indexed by (section, channel[, axis or level]) in the order of :attr:`SectionNumbers`,
+    :attr:`ChannelNames`, :attr:`AxisNames` and :attr:`Levels`.  Missing section/channel pairs have
+    NaN units per pixel and no levels.  Z ranges are inclusive, None leaves that end unbounded.
+    """
+
+    @property
+    def SectionNumbers(self):
+        '''Sorted array of the section numbers in the volume'''
+        return self._sections
+
+    @property
+    def ChannelNames(self):
+        return self._channel_names
+
+    @property
+    def AxisNames(self):
+        return self._axis_names
+
+    @property
+    def Levels(self):
+        '''Sorted array of every pyramid level downsample present in the volume'''
+        return self._levels
+
+    @property
+    def UnitsPerPixel(self):
+        '''(sections, channels, axes) array of units per pixel'''
+        return self._units_per_pixel
+
+    @property
+    def LevelAvailable(self):
+        '''(sections, channels, levels) boolean array, True where a pyramid level exists'''
+        return self._level_available
+
+    @property
+    def Present(self):
+        '''(sections, channels) boolean array, True where a section has the channel'''
+        return self._present
+
+    def __init__(self, sections, channel_names, axis_names, units_of_measure, units_per_pixel, levels, level_available):
+        '''
+        :param ndarray sections: Sorted section numbers
+        :param list channel_names: Channel names
+        :param list axis_names: Scale axis names
+        :param dict units_of_measure: {axis name: units of measure}
+        :param ndarray units_per_pixel: (sections, channels, axes) units per pixel, NaN where unknown
+        :param ndarray levels: Sorted level downsamples
+        :param ndarray level_available: (sections, channels, levels) boolean array
+        '''
+        self._sections = sections
+        self._channel_names = list(channel_names)
+        self._channel_columns = dict([(name, iCol) for (iCol, name) in enumerate(self._channel_names)])
+        self._axis_names = list(axis_names)
+        self._units_of_measure = units_of_measure
+        self._units_per_pixel = units_per_pixel
+        self._levels = levels
+        self._level_available = level_available
+        self._present = numpy.any(~numpy.isnan(units_per_pixel), axis=2) if units_per_pixel.size > 0 else numpy.zeros(units_per_pixel.shape[0:2], dtype=bool)
+
+    @classmethod
+    def Build(cls, transform_path_map, filtername=DefaultIndexFilter):
+        '''Index a {section_number: {channel_name: channel}} map
+        :param dict transform_path_map: Section to channel map of a volume controller
+        :param str filtername: Filter whose tile pyramid levels are recorded
+        '''
+        sections = numpy.array(sorted(transform_path_map.keys()), dtype=numpy.int64)
+
+        channel_names = set()
+        axis_names = set()
+        levels = set()
+        units_of_measure = {}
+        records = []
+        for (iSection, sectionNumber) in enumerate(sections):
+            for (channel_name, channel) in transform_path_map[int(sectionNumber)].items():
+                scale = {}
+                for axis_name in channel.Scale.AxisNames:
+                    axis = channel.Scale.GetAxis(axis_name)
+                    if axis_name in units_of_measure and units_of_measure[axis_name] != axis.UnitsOfMeasure:
+                        raise Exception("No support for different units of measure in scales yet")
+
+                    units_of_measure[axis_name] = axis.UnitsOfMeasure
+                    scale[axis_name] = axis.UnitsPerPixel
+
+                channel_levels = []
+                if filtername in channel.FilterNames:
+                    channel_levels = [float(level) for level in channel.GetLevelPaths(filtername).keys()]
+
+                channel_names.add(channel_name)
+                axis_names.update(scale.keys())
+                levels.update(channel_levels)
+                records.append((iSection, channel_name, scale, channel_levels))
+
+        channel_names = sorted(channel_names)
+        axis_names = sorted(axis_names)
+        levels = numpy.array(sorted(levels), dtype=numpy.float64)
+
+        channel_columns = dict([(name, iCol) for (iCol, name) in enumerate(channel_names)])
+        axis_columns = dict([(name, iCol) for (iCol, name) in enumerate(axis_names)])
+
+        units_per_pixel = numpy.full((len(sections), len(channel_names), len(axis_names)), numpy.nan, dtype=numpy.float64)
+        level_available = numpy.zeros((len(sections), len(channel_names), len(levels)), dtype=bool)
+        for (iSection, channel_name, scale, channel_levels) in records:
+            iChannel = channel_columns[channel_name]
+            for (axis_name, value) in scale.items():
+                units_per_pixel[iSection, iChannel, axis_columns[axis_name]] = value
+
+            level_available[iSection, iChannel, numpy.searchsorted(levels, channel_levels)] = True
+
+        return ResolutionIndex(sections, channel_names, axis_names, units_of_measure, units_per_pixel, levels, level_available)
+
+    def SectionRange(self, minZ=None, maxZ=None):
+        '''Return the slice of the section axis covering an inclusive Z range'''
+        start = 0 if minZ is None else int(numpy.searchsorted(self._sections, minZ, side='left'))
+        stop = len(self._sections) if maxZ is None else int(numpy.searchsorted(self._sections, maxZ, side='right'))
+        return slice(start, stop)
+
+    def ChannelColumns(self, channel_names=None):
+        '''Return the channel axis indices of the named channels, all channels if None.  Unknown names are ignored.'''
+        if not channel_names:
+            return numpy.arange(len(self._channel_names))
+
+        return numpy.array([self._channel_columns[name] for name in channel_names if name in self._channel_columns], dtype=numpy.int64)
+
+    def HighestResolution(self, minZ=None, maxZ=None, channel_names=None):
+        '''Return a scale model with the smallest units per pixel of each axis over the selected sections and channels.
+           Axes without data are omitted.'''
+        units_per_pixel = self._units_per_pixel[self.SectionRange(minZ, maxZ)][:, self.ChannelColumns(channel_names)]
+
+        scale_model = nornir_volumemodel.Scale()
+        for (iAxis, axis_name) in enumerate(self._axis_names):
+            values = units_per_pixel[:, :, iAxis]
+            values = values[~numpy.isnan(values)]
+            if values.size > 0:
+                scale_model.SetAxis(axis_name, float(values.min()), self._units_of_measure[axis_name])
+
+        return scale_model
+
+    def AvailableLevels(self, minZ=None, maxZ=None, channel_names=None):
+        '''Return the pyramid levels available for every selected section/channel pair that has data
+        :rtype: ndarray
+        '''
+        section_range = self.SectionRange(minZ, maxZ)
+        columns = self.ChannelColumns(channel_names)
+        present = self._present[section_range][:, columns]
+        available = self._level_available[section_range][:, columns]
+
+        if not numpy.any(present):
+            return numpy.zeros((0,), dtype=numpy.float64)
+
+        return self._levels[numpy.all(available[present], axis=0)]
+
+    def ChannelCoverage(self, minZ=None, maxZ=None, channel_names=None):
+        '''Return {channel name: number of sections in the Z range that have the channel}'''
+        section_range = self.SectionRange(minZ, maxZ)
+        columns = self.ChannelColumns(channel_names)
+        counts = numpy.count_nonzero(self._present[section_range][:, columns], axis=0)
+        return dict([(self._channel_names[iCol], int(count)) for (iCol, count) in zip(columns, counts)])
@@ -0,0 +1,403 @@
+'''
+Local HTTP server for the data of a volume.
+
+Serves fixed size chunks of any :class:`~nornir_volumecontroller.base_objects.VolumeInterface`
+so viewers and analysis tools do not each wrap :meth:`GetData` in their own
+web framework.  Only the standard library is used.
+
+Routes::
+
+    GET /metadata                                  Volume name, bounds, channels, resolution and levels as JSON
+    GET /chunk/<section>/<level>/<x>/<y>[?channels=A,B]
+                                                   Chunk (x, y) of the chunk grid of a level as a .npy
+                                                   array with Channel,Y,X axes, or 204 No Content if
+                                                   no tile covers the chunk
+
+Chunks of sections or channels the volume does not have are 404 Not Found and
+malformed paths or levels are 400 Bad Request.
+A level is a downsample relative to the volume's highest resolution.  Chunk
+responses carry an ETag and Last-Modified derived from the modification times
+of the transforms and tiles, or baked images, the chunk is read from, and
+honor If-None-Match and If-Modified-Since.  The files of each chunk are
+remembered while the transforms of its section are unchanged, so revalidating
+a chunk costs a stat of each of its files.  Empty chunks, such as those outside
+the tiles of a section, are sent without a body; clients fill them with zeros
+of the chunk shape from the metadata.  Connections are kept alive.
+
+Run from the command line with::
+
+    python -m nornir_volumecontroller.server VolumeData.xml --port 8080
+'''
+
+import argparse
+import collections
+import email.utils
+import hashlib
+import http.server
+import io
+import json
+import logging
+import math
+import os
+import threading
+import time
+import urllib.parse
+
+import numpy
+
+import nornir_imageregistration
+import nornir_volumecontroller
+
+from . import spatial
+from .cache import DefaultChunkShape, FileStamp
+
+DefaultMaxWorkers = 4
+NpyContentType = 'application/x-npy'
+MaxCachedSourceFiles = 65536
+
+
+class NotFoundError(LookupError):
+    '''A request names a section or channel the volume does not have'''
+    pass
+
+
+class BadRequestError(ValueError):
+    '''A request's path or parameters cannot be parsed or are out of range'''
+    pass
+
+
+def VolumeUnitsPerPixel(volume):
+    '''Size of a volume space pixel, the highest resolution of the volume'''
+    if hasattr(volume, 'GetHighestResolution'):
+        return volume.GetHighestResolution(None).X
+
+    return volume.UnitsPerPixel()
+
+
+def VolumeLevels(volume):
+    '''Sorted list of the pyramid levels of a volume'''
+    if hasattr(volume, 'ResolutionIndex'):
+        return [float(level) for level in volume.ResolutionIndex.Levels]
+
+    return list(volume.Levels)
+
+
+def ParseChunkPath(parts):
+    '''Return (section, level, x, y) of the parts of a /chunk/<section>/<level>/<x>/<y> path'''
+    try:
+        return (int(parts[1]), float(parts[2]), int(parts[3]), int(parts[4]))
+    except ValueError:
+        raise BadRequestError("Malformed chunk path /%s" % '/'.join(parts))
+
+
+def VolumeSectionNumbers(volume):
+    '''Sorted list of the section numbers of a volume'''
+    if hasattr(volume, 'transform_path_map'):
+        return sorted(volume.transform_path_map.keys())
+
+    if hasattr(volume, 'Store'):
+        return volume.Store.SectionNumbers
+
+    bounds = volume.Bounds
+    return list(range(int(bounds[nornir_imageregistration.iBox.MinZ]), int(bounds[nornir_imageregistration.iBox.MaxZ]) + 1))
+
+
+class VolumeHTTPServer(http.server.ThreadingHTTPServer):
+    """Threaded HTTP server for the chunks and metadata of a volume.
+
+    Each connection is handled on its own thread, at most ``max_workers`` chunks are
+    produced at once so a burst of requests cannot oversubscribe the machine.
+    """
+
+    daemon_threads = True
+
+    @property
+    def Volume(self):
+        return self._volume
+
+    @property
+    def ChunkShape(self):
+        return self._chunk_shape
+
+    @property
+    def URL(self):
+        (host, port) = self.server_address[0:2]
+        return 'http://%s:%d' % (host, port)
+
+    @property
+    def UnitsPerPixel(self):
+        '''Size of a pixel of level 1'''
+        if self._units_per_pixel is None:
+            self._units_per_pixel = VolumeUnitsPerPixel(self._volume)
+
+        return self._units_per_pixel
+
+    def __init__(self, server_address, volume, chunk_shape=DefaultChunkShape, max_workers=DefaultMaxWorkers):
+        '''
+        :param tuple server_address: (host, port) to listen on, port 0 picks a free port
+        :param VolumeInterface volume: Volume to serve
+        :param tuple chunk_shape: (rows, columns) of every chunk
+        :param int max_workers: Maximum number of chunks produced concurrently
+        '''
+        self._volume = volume
+        self._chunk_shape = tuple([int(v) for v in chunk_shape])
+        self._workers = threading.BoundedSemaphore(max_workers)
+        self._start_time = time.time()
+        self._units_per_pixel = None
+        self._lock = threading.Lock()
+        self._source_files = collections.OrderedDict()  # request key -> (transform stamps, source file paths)
+
+        super(VolumeHTTPServer, self).__init__(server_address, VolumeRequestHandler)
+
+    def Metadata(self):
+        return {'name': getattr(self._volume, 'Name', None),
+                'bounds': [float(v) for v in self._volume.Bounds],
+                'channels': sorted(self._volume.Channels),
+                'units_per_pixel': self.UnitsPerPixel,
+                'levels': VolumeLevels(self._volume),
+                'chunk_shape': list(self._chunk_shape)}
+
+    def ChunkRequest(self, sectionNumber, level, x, y):
+        '''Return (region, resolution) of a chunk of the grid of a level'''
+        if not math.isfinite(level) or level <= 0:
+            raise BadRequestError("Level must be positive")
+
+        if sectionNumber not in VolumeSectionNumbers(self._volume):
+            raise NotFoundError("Unknown section %d" % sectionNumber)
+
+        rect = spatial.ChunkRegion((y, x), self._chunk_shape, level)
+        region = [sectionNumber,
+                  rect[nornir_imageregistration.iRect.MinY],
+                  rect[nornir_imageregistration.iRect.MinX],
+                  sectionNumber,
+                  rect[nornir_imageregistration.iRect.MaxY],
+                  rect[nornir_imageregistration.iRect.MaxX]]
+        return (region, level * self.UnitsPerPixel)
+
+    def CheckChannels(self, channel_names):
+        '''Raise NotFoundError if the volume does not have every channel'''
+        unknown = sorted(set(channel_names) - set(self._volume.Channels))
+        if len(unknown) > 0:
+            raise NotFoundError("Unknown channels %s" % ', '.join(unknown))
+
+    def SourceStamp(self, sectionNumber, channel_names):
+        '''Stamps of the transforms the channels of a section are assembled with.
+           :returns: Tuple of stamps, None if the volume has no transforms, such as a baked volume
+        '''
+        if not hasattr(self._volume, 'transform_path_map'):
+            return None
+
+        channels = self._volume.transform_path_map.get(sectionNumber, {})
+        stamps = []
+        for channel_name in channel_names:
+            channel = channels.get(channel_name, None)
+            if channel is None:
+                continue
+
+            try:
+                stamps.append((channel_name, FileStamp(channel.Transform.FullPath)))
+            except OSError:
+                stamps.append((channel_name, None))
+
+        return tuple(stamps)
+
+    def Validators(self, request_key, region, resolution, channel_names):
+        '''Return (ETag, Last-Modified timestamp) of a chunk from the stamps of the files it is read from, the
+           transforms and tiles or the baked images.  Listing the files loads the transforms and looks up the tiles of
+           the chunk, so the list is remembered per chunk until a transform of its section changes.  The files are
+           stamped on every request, so rewriting a tile or baked image changes the validators.'''
+        stamp = self.SourceStamp(int(region[nornir_imageregistration.iBox.MinZ]), channel_names)
+        paths = None
+        if stamp is not None:
+            with self._lock:
+                cached = self._source_files.get(request_key, None)
+                if cached is not None and cached[0] == stamp:
+                    self._source_files.move_to_end(request_key)
+                    paths = cached[1]
+
+        if paths is None:
+            paths = self._volume.SourceFiles(region, resolution, channel_names) if hasattr(self._volume, 'SourceFiles') else []
+            if stamp is not None:
+                with self._lock:
+                    self._source_files[request_key] = (stamp, paths)
+                    self._source_files.move_to_end(request_key)
+                    while len(self._source_files) > MaxCachedSourceFiles:
+                        self._source_files.popitem(last=False)
+
+        stamps = []
+        last_modified = self._start_time
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            stamps.append((path, stat.st_mtime_ns, stat.st_size))
+            last_modified = max(last_modified, stat.st_mtime)
+
+        digest = hashlib.sha1(repr((request_key, stamps)).encode('utf-8')).hexdigest()
+        return ('"%s"' % digest, last_modified)
+
+    def GetChunk(self, region, resolution, channel_names):
+        '''Return (Channel,Y,X data, covered) of a chunk.  covered is False if no tile covers the chunk, so a chunk of
+           black pixels inside a section is not mistaken for one without tiles.  Volumes without
+           GetDataSparse report no coverage, for them a chunk is covered unless every pixel is zero.
+        '''
+        with self._workers:
+            if hasattr(self._volume, 'GetDataSparse'):
+                sparse = self._volume.GetDataSparse(region, resolution, channel_names, chunk_shape=self._chunk_shape)
+                data = sparse.ToDense()
+                # Rounding can add pixels past the chunk, only the first chunk of the result is served
+                covered = any([key[2] == 0 and key[3] == 0 for key in sparse])
+            else:
+                data = self._volume.GetData(region, resolution, channel_names)
+                covered = bool(numpy.any(data[:, 0, :self._chunk_shape[0], :self._chunk_shape[1]]))
+
+        # A single section is requested, drop the Z axis
+        return (data[:, 0, :self._chunk_shape[0], :self._chunk_shape[1]], covered)
+
+
+class VolumeRequestHandler(http.server.BaseHTTPRequestHandler):
+    '''Handles the routes of :class:`VolumeHTTPServer`'''
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if len(part) > 0]
+        query = urllib.parse.parse_qs(url.query)
+
+        try:
+            if parts == ['metadata']:
+                self._SendMetadata()
+            elif len(parts) == 5 and parts[0] == 'chunk':
+                self._SendChunk(*(ParseChunkPath(parts) + (query,)))
+            else:
+                self.send_error(404, "Unknown path")
+        except NotFoundError as e:
+            self.send_error(404, str(e))
+        except BadRequestError as e:
+            self.send_error(400, str(e))
+        except ConnectionError:
+            # The client closed the connection while the response was written
+            self.close_connection = True
+        except Exception:
+            logging.getLogger(__name__).exception("Error serving %s" % self.path)
+            self.send_error(500, "Internal error")
+
+    def log_message(self, format, *args):
+        # Keep servers embedded in other applications quiet, errors are still reported by send_error
+        pass
+
+    def _ChannelNames(self, query):
+        if 'channels' not in query:
+            return sorted(self.server.Volume.Channels)
+
+        channel_names = [name for name in query['channels'][0].split(',') if len(name) > 0]
+        self.server.CheckChannels(channel_names)
+        return channel_names
+
+    def _NotModified(self, etag, last_modified):
+        if_none_match = self.headers.get('If-None-Match', None)
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+        if_modified_since = self.headers.get('If-Modified-Since', None)
+        if if_modified_since is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+
+            # HTTP dates have a resolution of one second
+            return int(last_modified) <= since
+
+        return False
+
+    def _SendNotModified(self, etag, last_modified):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(last_modified, usegmt=True))
+        self.end_headers()
+
+    def _SendBody(self, body, content_type, etag, last_modified):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(last_modified, usegmt=True))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _SendEmpty(self, etag, last_modified):
+        self.send_response(204)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(last_modified, usegmt=True))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+    def _SendMetadata(self):
+        body = json.dumps(self.server.Metadata()).encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        last_modified = self.server._start_time
+        if self._NotModified(etag, last_modified):
+            self._SendNotModified(etag, last_modified)
+            return
+
+        self._SendBody(body, 'application/json', etag, last_modified)
+
+    def _SendChunk(self, sectionNumber, level, x, y, query):
+        channel_names = self._ChannelNames(query)
+        (region, resolution) = self.server.ChunkRequest(sectionNumber, level, x, y)
+        (etag, last_modified) = self.server.Validators((sectionNumber, level, x, y, tuple(channel_names)), region, resolution, channel_names)
+        if self._NotModified(etag, last_modified):
+            self._SendNotModified(etag, last_modified)
+            return
+
+        (data, covered) = self.server.GetChunk(region, resolution, channel_names)
+        if not covered:
+            self._SendEmpty(etag, last_modified)
+            return
+
+        buffer = io.BytesIO()
+        numpy.save(buffer, numpy.ascontiguousarray(data), allow_pickle=False)
+        self._SendBody(buffer.getvalue(), NpyContentType, etag, last_modified)
+
+
+def Serve(volume, host='127.0.0.1', port=0, chunk_shape=DefaultChunkShape, max_workers=DefaultMaxWorkers):
+    '''Start serving a volume on a background thread
+    :returns: The running :class:`VolumeHTTPServer`, call shutdown() and server_close() to stop it
+    '''
+    server = VolumeHTTPServer((host, port), volume, chunk_shape=chunk_shape, max_workers=max_workers)
+    thread = threading.Thread(target=server.serve_forever, name='VolumeHTTPServer', daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the chunks of a nornir volume over HTTP')
+    parser.add_argument('volume', help='Path to VolumeData.xml, or a baked store directory')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--chunk', type=int, nargs=2, default=list(DefaultChunkShape), help='Rows and columns of each chunk')
+    parser.add_argument('--workers', type=int, default=DefaultMaxWorkers, help='Maximum number of chunks produced concurrently')
+    parser.add_argument('--no-baked', dest='baked', action='store_false', help='Ignore the baked store beside VolumeData.xml and assemble every section from its tiles')
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.volume):
+        volume = nornir_volumecontroller.BakedVolume(args.volume)
+    else:
+        volume = nornir_volumecontroller.CreateVolumeController(args.volume, use_baked_store=args.baked)
+
+    server = VolumeHTTPServer((args.host, args.port), volume, chunk_shape=args.chunk, max_workers=args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+'''
+Binary snapshot of a parsed volume for fast controller construction.
+
+Parsing VolumeData.xml and walking every block and section dominates the time
+to create a controller for a large volume.  A :class:`VolumeSnapshot` stores,
+beside the XML, a pickle of the volume model and the manifest describing the
+section to channel to transform map.  It is keyed by the size, modification
+time and SHA-1 of the XML, so touching the XML without changing it does not
+invalidate the snapshot.
+
+Loading a snapshot only decodes the manifest.  The pickled model is kept as
+bytes and unpickled by :class:`LazyVolumeModel` the first time the model is
+used, and the channels of a section are built the first time the section is
+accessed.  Snapshots are pickles, so only volumes from trusted locations
+should be opened this way.
+'''
+
+import hashlib
+import logging
+import os
+import pickle
+
+import nornir_volumemodel
+
+from .cache import FileStamp
+from .manifest import VolumeManifest
+
+SnapshotVersion = 1
+DefaultSnapshotFilename = 'VolumeController.snapshot.pickle'
+
+
+def SnapshotPathForVolumeXml(volume_xml_path):
+    '''Default location of the snapshot for a VolumeData.xml file'''
+    return os.path.join(os.path.dirname(os.path.abspath(volume_xml_path)), DefaultSnapshotFilename)
+
+
+def FileSHA1(path, block_size=1 << 20):
+    '''Hex SHA-1 digest of a file's contents'''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as hFile:
+        for block in iter(lambda: hFile.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class LazyVolumeModel(object):
+    """Stand-in for a :class:`~nornir_volumemodel.model.volume.Volume` that loads the model on first attribute access.
+
+    The model is unpickled from the snapshot, or parsed from the XML if the snapshot does not contain it.
+    """
+
+    def __init__(self, volume_xml_path, model_bytes=None, name=None):
+        '''
+        :param str volume_xml_path: XML to parse if the model cannot be unpickled
+        :param bytes model_bytes: Pickled volume model
+        :param str name: Name of the volume, returned without loading the model
+        '''
+        self._volume_xml_path = volume_xml_path
+        self._model_bytes = model_bytes
+        self._name = name
+        self._model = None
+
+    @property
+    def IsLoaded(self):
+        return self._model is not None
+
+    @property
+    def Name(self):
+        if self._model is None and self._name is not None:
+            return self._name
+
+        return self._Load().Name
+
+    @Name.setter
+    def Name(self, val):
+        self._Load().Name = val
+
+    def _Load(self):
+        if self._model is None:
+            model = None
+            if self._model_bytes is not None:
+                try:
+                    model = pickle.loads(self._model_bytes)
+                except Exception as e:
+                    logging.getLogger(__name__).warning("Could not unpickle volume model snapshot, parsing %s: %s" % (self._volume_xml_path, str(e)))
+
+            if model is None:
+                model = nornir_volumemodel.Load_Xml(self._volume_xml_path)
+
+            self._model = model
+            self._model_bytes = None
+
+        return self._model
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the proxy itself
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return getattr(self._Load(), name)
+
+
+class VolumeSnapshot(object):
+    '''Pickled volume model and manifest of a VolumeData.xml file'''
+
+    @property
+    def Manifest(self):
+        return self._manifest
+
+    @property
+    def Modified(self):
+        '''True if :meth:`IsValid` updated the stored stamp of an XML whose contents are unchanged.
+           Save the snapshot so later starts do not hash the XML again.'''
+        return self._modified
+
+    def __init__(self, xml_key, manifest, model_bytes=None):
+        '''
+        :param dict xml_key: {'stamp': [mtime_ns, size], 'sha1': digest} of the XML the snapshot was built from
+        :param VolumeManifest manifest: Description of the volume's sections, channels and transforms
+        :param bytes model_bytes: Pickled volume model, None if the model could not be pickled
+        '''
+        self._xml_key = xml_key
+        self._manifest = manifest
+        self._model_bytes = model_bytes
+        self._modified = False
+
+    def IsValid(self, volume_xml_path):
+        '''True if the XML is unchanged and none of the transforms in the manifest have changed.
+           An XML that was only touched is recognized by its contents and its new stamp is remembered, see :attr:`Modified`.'''
+        try:
+            stamp = list(FileStamp(volume_xml_path))
+            if stamp != self._xml_key['stamp']:
+                if FileSHA1(volume_xml_path) != self._xml_key['sha1']:
+                    return False
+
+                self._xml_key['stamp'] = stamp
+                self._modified = True
+        except OSError:
+            return False
+
+        return self._manifest.IsValid()
+
+    def CreateModel(self, volume_xml_path):
+        '''Return a volume model proxy that is only loaded when used'''
+        return LazyVolumeModel(volume_xml_path, self._model_bytes, name=self._manifest.Name)
+
+    def Save(self, path):
+        '''Write the snapshot atomically, so concurrent readers never see a partial file'''
+        data = {'version': SnapshotVersion,
+                'xml': self._xml_key,
+                'manifest': self._manifest._data,
+                'model': self._model_bytes}
+
+        temp_path = path + '.%d.tmp' % os.getpid()
+        with open(temp_path, 'wb') as hFile:
+            pickle.dump(data, hFile, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temp_path, path)
+        self._modified = False
+
+    @classmethod
+    def Load(cls, path):
+        '''Load a snapshot, returning None if it does not exist or cannot be read'''
+        try:
+            with open(path, 'rb') as hFile:
+                data = pickle.load(hFile)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+        if not isinstance(data, dict) or data.get('version', None) != SnapshotVersion:
+            return None
+
+        manifest = VolumeManifest(data['manifest'], os.path.dirname(os.path.abspath(path)))
+        return VolumeSnapshot(data['xml'], manifest, data['model'])
+
+    @classmethod
+    def Build(cls, volumeController, volume_xml_path, path):
+        '''Create a snapshot of a controller built from the volume model of an XML file
+        :param Volume volumeController: Controller to snapshot, transforms are loaded through its cache
+        :param str volume_xml_path: XML the controller's model was loaded from
+        :param str path: Path the snapshot will be saved to
+        '''
+        xml_key = {'stamp': list(FileStamp(volume_xml_path)),
+                   'sha1': FileSHA1(volume_xml_path)}
+
+        # The XML is validated by its key, so only the transforms are sources of the manifest
+        manifest = VolumeManifest.Build(volumeController, path)
+
+        try:
+            model_bytes = pickle.dumps(volumeController._volume, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logging.getLogger(__name__).info("Volume model could not be pickled and will be parsed when needed: %s" % str(e))
+            model_bytes = None
+
+        return VolumeSnapshot(xml_key, manifest, model_bytes)
@@ -0,0 +1,169 @@
+'''
+Sparse results for regions that are mostly empty.
+
+Regions at the edge of a volume, or in sections only partly covered by tiles,
+are mostly zero.  :class:`SparseVolumeData` holds the output of
+:meth:`~nornir_volumecontroller.base_objects.Volume.GetDataSparse` as a grid
+of fixed size chunks and stores only the chunks that contain data, each with
+an optional mask of the pixels tiles actually covered.
+'''
+
+import numpy
+
+from . import assemble
+from . import spatial
+from .cache import DefaultChunkShape
+
+
+class SparseVolumeData(object):
+    """Channel,Z,Y,X data stored as the chunks of a grid that contain data.
+
+    The grid has chunks of ``chunk_shape`` output pixels aligned to the first pixel of the
+    output, so edge chunks may be smaller.  Chunks are keyed by (channel index, Z index, chunk
+    row, chunk column).  Each stored chunk has a validity mask, True where a tile covered the
+    pixel, or None when every pixel of the chunk is valid.  Chunks that are not stored are zero
+    and have no valid pixels.
+    """
+
+    @property
+    def Shape(self):
+        '''(Channel, Z, Y, X) shape of the dense data'''
+        return self._shape
+
+    @property
+    def DType(self):
+        return self._dtype
+
+    @property
+    def ChunkShape(self):
+        return self._chunk_shape
+
+    @property
+    def ChannelNames(self):
+        return self._channel_names
+
+    @property
+    def MinZ(self):
+        '''Section number of the first Z index'''
+        return self._minZ
+
+    @property
+    def GridShape(self):
+        '''(rows, columns) of the chunk grid of each slice'''
+        return (-(-self._shape[2] // self._chunk_shape[0]), -(-self._shape[3] // self._chunk_shape[1]))
+
+    @property
+    def NumChunks(self):
+        '''Number of chunks in the grid, stored or not'''
+        (rows, cols) = self.GridShape
+        return self._shape[0] * self._shape[1] * rows * cols
+
+    @property
+    def nbytes(self):
+        '''Bytes of the stored chunks and masks'''
+        total = 0
+        for (data, valid) in self._chunks.values():
+            total += data.nbytes
+            if valid is not None:
+                total += valid.nbytes
+
+        return total
+
+    def __init__(self, shape, dtype=numpy.float32, chunk_shape=DefaultChunkShape, channel_names=None, minZ=0):
+        '''
+        :param tuple shape: (Channel, Z, Y, X) shape of the dense data
+        :param dtype: Type of the data
+        :param tuple chunk_shape: (rows, columns) of each chunk in output pixels
+        :param list channel_names: Names of the channels, in the order of the channel axis
+        :param int minZ: Section number of the first Z index
+        '''
+        self._shape = tuple([int(v) for v in shape])
+        self._dtype = numpy.dtype(dtype)
+        self._chunk_shape = tuple([int(v) for v in chunk_shape])
+        self._channel_names = list(channel_names) if channel_names is not None else None
+        self._minZ = int(minZ)
+        self._chunks = {}
+
+        if len(self._shape) != 4:
+            raise ValueError("Shape must have Channel, Z, Y and X axes")
+        if min(self._chunk_shape) <= 0:
+            raise ValueError("Chunk shape must be positive")
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def __contains__(self, key):
+        return tuple(key) in self._chunks
+
+    def __iter__(self):
+        return iter(sorted(self._chunks.keys()))
+
+    def ChunkSlices(self, key):
+        '''(Y slice, X slice) of a chunk within a slice of the dense data'''
+        (iChannel, iZ, iRow, iCol) = key
+        pixel_region = spatial.ChunkPixelRegion((iRow, iCol), self._chunk_shape)
+        return (slice(pixel_region[0], min(pixel_region[2], self._shape[2])),
+                slice(pixel_region[1], min(pixel_region[3], self._shape[3])))
+
+    def ChunkPixelShape(self, key):
+        '''(rows, columns) of a chunk, smaller than the chunk shape at the edges of the grid'''
+        (ySlice, xSlice) = self.ChunkSlices(key)
+        return (ySlice.stop - ySlice.start, xSlice.stop - xSlice.start)
+
+    def Set(self, key, data, valid=None):
+        '''Store the data of a chunk
+        :param tuple key: (channel index, Z index, chunk row, chunk column)
+        :param ndarray data: Pixels of the chunk, copied and converted to the type of the result
+        :param ndarray valid: Mask that is True where the pixel is covered, None if every pixel is
+        '''
+        key = tuple([int(v) for v in key])
+        shape = self.ChunkPixelShape(key)
+        if data.shape != shape:
+            raise ValueError("Chunk %s has shape %s, expected %s" % (str(key), str(data.shape), str(shape)))
+        if valid is not None and valid.shape != shape:
+            raise ValueError("Mask of chunk %s has shape %s, expected %s" % (str(key), str(valid.shape), str(shape)))
+
+        # Chunks are often views of a larger image, copy them so the image can be released
+        converted = numpy.empty(shape, dtype=self._dtype)
+        assemble.CopyConverted(converted, data)
+        self._chunks[key] = (converted, numpy.array(valid, dtype=bool) if valid is not None else None)
+
+    def Get(self, key):
+        '''Return (data, valid mask) of a stored chunk, or None for a chunk without data'''
+        return self._chunks.get(tuple(key), None)
+
+    def Items(self):
+        '''Yield (key, data, valid mask) of every stored chunk in key order'''
+        for key in sorted(self._chunks.keys()):
+            (data, valid) = self._chunks[key]
+            yield (key, data, valid)
+
+    def ToDense(self, out=None):
+        '''Return the data as the array :meth:`GetData` would
+        :param ndarray out: Optional array of the result's shape and type to write into
+        :rtype: ndarray
+        '''
+        if out is None:
+            out = numpy.zeros(self._shape, dtype=self._dtype)
+        else:
+            if tuple(out.shape) != self._shape:
+                raise ValueError("Output buffer has shape %s, expected %s" % (str(out.shape), str(self._shape)))
+            if out.dtype != self._dtype:
+                raise ValueError("Output buffer has type %s, expected %s" % (str(out.dtype), str(self._dtype)))
+
+            out.fill(0)
+
+        for (key, (data, valid)) in self._chunks.items():
+            (ySlice, xSlice) = self.ChunkSlices(key)
+            out[key[0], key[1], ySlice, xSlice] = data
+
+        return out
+
+    def ValidMask(self):
+        '''Return a boolean array of the dense shape, True for covered pixels'''
+        mask = numpy.zeros(self._shape, dtype=bool)
+        for (key, (data, valid)) in self._chunks.items():
+            (ySlice, xSlice) = self.ChunkSlices(key)
+            mask[key[0], key[1], ySlice, xSlice] = True if valid is None else valid
+
+        return mask
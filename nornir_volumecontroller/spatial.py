@@ -1,3 +1,8 @@
+import math
+import os
+
+import numpy
+
 import nornir_imageregistration
 import nornir_volumecontroller
 
@@ -43,6 +48,25 @@ def BuildVolumeTransformMap(volume):
     return Sections
 
 
+def ChannelMapSignature(channelmap):
+    """Describe the channels of a section so section channel maps built at different times can be compared.
+
+    Channels built from the volume model and from a manifest produce the same signature when they
+    refer to the same transforms, scales and tile pyramids.
+
+    :param dict channelmap: ``{channel_name: channel}`` map of one section
+    :rtype: tuple
+    """
+    channels = []
+    for (channel_name, channel) in sorted(channelmap.items()):
+        scale = tuple([(axis_name, float(channel.Scale.GetAxis(axis_name).UnitsPerPixel)) for axis_name in sorted(channel.Scale.AxisNames)])
+        filters = tuple([(filter_name, tuple(sorted([(float(downsample), os.path.normpath(path)) for (downsample, path) in channel.GetLevelPaths(filter_name).items()])))
+                         for filter_name in sorted(channel.FilterNames)])
+        channels.append((channel_name, os.path.normpath(channel.Transform.FullPath), scale, filters))
+
+    return tuple(channels)
+
+
 def SectionsInBoundingBox(boundingbox):
     """Yield every integer section number whose Z-coordinate falls within *boundingbox*.
 
@@ -55,3 +79,224 @@ def SectionsInBoundingBox(boundingbox):
 
     for sectionNumber in range(int(StartSection), int(EndSection) + 1):
         yield sectionNumber
+
+
+# Tolerance, in pixels, so a coordinate a rounding error away from a pixel edge is treated as on the edge
+PixelTolerance = 1e-6
+
+
+def PixelRegion(region, level):
+    """Convert a volume space region to the pixel grid of a pyramid level.
+
+    :param ndarray region: (minY, minX, maxY, maxX) in volume space
+    :param float level: Downsample of the pyramid level
+    :returns: (minY, minX, maxY, maxX) integer pixel bounds at the level, max values are exclusive
+    :rtype: tuple
+    """
+    return (int(math.floor(region[nornir_imageregistration.iRect.MinY] / level + PixelTolerance)),
+            int(math.floor(region[nornir_imageregistration.iRect.MinX] / level + PixelTolerance)),
+            int(math.ceil(region[nornir_imageregistration.iRect.MaxY] / level - PixelTolerance)),
+            int(math.ceil(region[nornir_imageregistration.iRect.MaxX] / level - PixelTolerance)))
+
+
+def SnapRegion(region, level):
+    """Volume space region of the pixels of a pyramid level that a region touches, see :func:`PixelRegion`.
+
+    Every image of a level is assembled on this grid, whether it comes from the tiles, the chunk
+    cache or a baked store, so each source produces the same pixels for a request.
+
+    :returns: (minY, minX, maxY, maxX) in volume space
+    :rtype: ndarray
+    """
+    return numpy.array(PixelRegion(region, level), dtype=numpy.float64) * level
+
+
+def PixelShape(region, level):
+    """(rows, columns) of the image of a region on the pixel grid of a pyramid level"""
+    pixel_region = PixelRegion(region, level)
+    return (pixel_region[2] - pixel_region[0], pixel_region[3] - pixel_region[1])
+
+
+def ChunksInRegion(pixel_region, chunk_shape):
+    """Yield the (row, column) index of every chunk of the grid that overlaps a pixel region.
+
+    :param tuple pixel_region: (minY, minX, maxY, maxX) pixel bounds, max values are exclusive
+    :param tuple chunk_shape: (rows, columns) of each chunk
+    :yields: (row, column) chunk indices in row-major order
+    """
+    (minY, minX, maxY, maxX) = pixel_region
+    for iRow in range(minY // chunk_shape[0], (maxY - 1) // chunk_shape[0] + 1):
+        for iCol in range(minX // chunk_shape[1], (maxX - 1) // chunk_shape[1] + 1):
+            yield (iRow, iCol)
+
+
+def ChunkPixelRegion(chunk_index, chunk_shape):
+    """Pixel bounds of a chunk as (minY, minX, maxY, maxX), max values are exclusive"""
+    (iRow, iCol) = chunk_index
+    return (iRow * chunk_shape[0],
+            iCol * chunk_shape[1],
+            (iRow + 1) * chunk_shape[0],
+            (iCol + 1) * chunk_shape[1])
+
+
+def ChunkRegion(chunk_index, chunk_shape, level):
+    """Volume space region covered by a chunk assembled at a pyramid level
+
+    :returns: (minY, minX, maxY, maxX) in volume space
+    :rtype: ndarray
+    """
+    return numpy.array(ChunkPixelRegion(chunk_index, chunk_shape), dtype=numpy.float64) * level
+
+
+def UnionPixelRegion(pixel_regions, level):
+    """Volume space region covering every pixel region of a pyramid level
+
+    :returns: (minY, minX, maxY, maxX) in volume space, on the pixel grid of the level
+    :rtype: ndarray
+    """
+    pixel_regions = numpy.asarray(pixel_regions, dtype=numpy.int64).reshape((-1, 4))
+    union = (pixel_regions[:, 0].min(), pixel_regions[:, 1].min(), pixel_regions[:, 2].max(), pixel_regions[:, 3].max())
+    return numpy.array(union, dtype=numpy.float64) * level
+
+
+def ClusterOverlappingRegions(regions, level):
+    """Group regions whose pixels overlap at a pyramid level so each group can be assembled once.
+
+    A region joins a group when it overlaps the group's extent and the pixels of the enlarged
+    extent do not exceed the pixels of the group's regions counted separately, so assembling a
+    group never costs more than assembling its regions one by one.
+
+    :param list regions: (minY, minX, maxY, maxX) regions in volume space
+    :param float level: Downsample of the pyramid level
+    :returns: list of lists of indices into regions
+    :rtype: list
+    """
+    def Area(pixel_region):
+        return max(pixel_region[2] - pixel_region[0], 0) * max(pixel_region[3] - pixel_region[1], 0)
+
+    pixel_regions = [PixelRegion(region, level) for region in regions]
+    order = sorted(range(0, len(regions)), key=lambda i: (pixel_regions[i][0], pixel_regions[i][1]))
+
+    clusters = []  # [extent, separate pixel count, member indices]
+    for i in order:
+        pixel_region = pixel_regions[i]
+        for cluster in clusters:
+            extent = cluster[0]
+            if extent[0] >= pixel_region[2] or extent[2] <= pixel_region[0] or \
+               extent[1] >= pixel_region[3] or extent[3] <= pixel_region[1]:
+                continue
+
+            union = (min(extent[0], pixel_region[0]), min(extent[1], pixel_region[1]),
+                     max(extent[2], pixel_region[2]), max(extent[3], pixel_region[3]))
+            if Area(union) <= cluster[1] + Area(pixel_region):
+                cluster[0] = union
+                cluster[1] += Area(pixel_region)
+                cluster[2].append(i)
+                break
+        else:
+            clusters.append([pixel_region, Area(pixel_region), [i]])
+
+    return [sorted(cluster[2]) for cluster in clusters]
+
+
+def RectToArray(rect):
+    """Convert a rectangle, or anything indexable as (minY, minX, maxY, maxX), to a float array"""
+    if hasattr(rect, 'ToArray'):
+        rect = rect.ToArray()
+
+    return numpy.asarray(rect, dtype=numpy.float64)
+
+
+class TileIndex(object):
+    """Grid bucket index of the volume space extent of every tile in a mosaic.
+
+    Each tile is recorded in every grid cell its mapped bounding box overlaps, so a query
+    only examines tiles in the cells the query region covers.  The cell size defaults to the
+    median tile size, which keeps the number of tiles per cell small.
+    """
+
+    @property
+    def TileNames(self):
+        return self._names
+
+    @property
+    def Bounds(self):
+        '''(N, 4) array of (minY, minX, maxY, maxX) tile bounds in volume space'''
+        return self._bounds
+
+    def __init__(self, tile_bounds, cell_size=None):
+        '''
+        :param dict tile_bounds: {tile name: (minY, minX, maxY, maxX)} in volume space
+        :param float cell_size: Edge length of a grid cell, defaults to the median tile size
+        '''
+        self._names = list(tile_bounds.keys())
+        self._bounds = numpy.array([RectToArray(tile_bounds[name]) for name in self._names], dtype=numpy.float64).reshape((-1, 4))
+
+        if cell_size is None:
+            if len(self._names) > 0:
+                extents = numpy.maximum(self._bounds[:, 2] - self._bounds[:, 0], self._bounds[:, 3] - self._bounds[:, 1])
+                cell_size = float(numpy.median(extents))
+
+            if cell_size is None or cell_size <= 0:
+                cell_size = 1.0
+
+        self._cell_size = cell_size
+
+        self._cells = {}
+        for (iTile, bounds) in enumerate(self._bounds):
+            for cell in self._CellsInRegion(bounds):
+                self._cells.setdefault(cell, []).append(iTile)
+
+    def __len__(self):
+        return len(self._names)
+
+    def _CellsInRegion(self, region):
+        (minRow, minCol) = numpy.floor(region[0:2] / self._cell_size).astype(numpy.int64)
+        (maxRow, maxCol) = numpy.floor(region[2:4] / self._cell_size).astype(numpy.int64)
+        for iRow in range(minRow, maxRow + 1):
+            for iCol in range(minCol, maxCol + 1):
+                yield (iRow, iCol)
+
+    def Intersecting(self, region):
+        '''Return the names of the tiles whose mapped extent intersects the region
+        :param ndarray region: (minY, minX, maxY, maxX) in volume space
+        :rtype: list
+        '''
+        region = RectToArray(region)
+
+        candidates = set()
+        for cell in self._CellsInRegion(region):
+            candidates.update(self._cells.get(cell, ()))
+
+        if len(candidates) == 0:
+            return []
+
+        candidates = numpy.fromiter(sorted(candidates), dtype=numpy.int64, count=len(candidates))
+        bounds = self._bounds[candidates]
+        overlaps = (bounds[:, 0] < region[2]) & (bounds[:, 2] > region[0]) & \
+                   (bounds[:, 1] < region[3]) & (bounds[:, 3] > region[1])
+
+        return [self._names[iTile] for iTile in candidates[overlaps]]
+
+    @classmethod
+    def CreateFromMosaic(cls, mosaic, cell_size=None):
+        '''Index the fixed space bounding box of every tile transform in a mosaic'''
+        tile_bounds = {}
+        for (tile_name, transform) in mosaic.ImageToTransform.items():
+            tile_bounds[tile_name] = transform.FixedBoundingBox
+
+        return TileIndex(tile_bounds, cell_size)
+
+
+def MosaicForRegion(mosaic, tile_index, region):
+    """Return a mosaic containing only the tiles that intersect the region.
+
+    :returns: The original mosaic if every tile intersects, None if no tile does
+    """
+    names = tile_index.Intersecting(region)
+    if len(names) == 0:
+        return None
+    if len(names) == len(tile_index):
+        return mosaic
+
+    return nornir_imageregistration.Mosaic(dict([(name, mosaic.ImageToTransform[name]) for name in names]))
@@ -0,0 +1,94 @@
+'''
+Polling watcher that keeps a volume controller current while the volume is being built.
+
+The pipeline adds sections and re-registers channels while viewers are open.
+:class:`VolumeWatcher` calls :meth:`~nornir_volumecontroller.base_objects.Volume.Refresh`
+on a background thread at a fixed interval, so the controller picks up those
+changes without being rebuilt and without dropping the caches of sections that
+did not change.
+'''
+
+import logging
+import threading
+
+DefaultPollInterval = 5.0
+
+
+class VolumeWatcher(object):
+    """Refreshes a volume controller periodically on a background thread.
+
+    Errors raised by a refresh, for example while VolumeData.xml is only partially written,
+    are logged and the refresh is retried at the next poll.
+    """
+
+    @property
+    def Volume(self):
+        return self._volume
+
+    @property
+    def Interval(self):
+        '''Seconds between polls'''
+        return self._interval
+
+    @property
+    def IsRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __init__(self, volume, interval=DefaultPollInterval, on_change=None):
+        '''
+        :param Volume volume: Controller to refresh
+        :param float interval: Seconds between polls
+        :param func on_change: Called as on_change(section_numbers) on the watcher thread after a refresh found changes
+        '''
+        self._volume = volume
+        self._interval = interval
+        self._on_change = on_change
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._polls = 0
+        self._changes = 0
+        self._errors = 0
+
+    def Start(self):
+        '''Begin polling, does nothing if the watcher is already running'''
+        if self.IsRunning:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._Run, name='VolumeWatcher', daemon=True)
+        self._thread.start()
+
+    def Stop(self, timeout=None):
+        '''Stop polling and wait for a refresh in progress to finish'''
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def Poll(self):
+        '''Refresh the volume now
+        :returns: Sorted list of the section numbers that changed
+        '''
+        self._polls += 1
+        changed = self._volume.Refresh()
+        if len(changed) > 0:
+            self._changes += 1
+            if self._on_change is not None:
+                self._on_change(changed)
+
+        return changed
+
+    def _Run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.Poll()
+            except Exception as e:
+                self._errors += 1
+                logging.getLogger(__name__).warning("Could not refresh volume, retrying in %g seconds: %s" % (self._interval, str(e)))
+
+    def Stats(self):
+        '''Return a dictionary describing the polls made'''
+        return {'polls': self._polls,
+                'changes': self._changes,
+                'errors': self._errors}
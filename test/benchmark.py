@@ -0,0 +1,228 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+
+Benchmarks the main volume controller entry points against a synthetic volume.
+
+Run as a script to write the results as JSON so runs can be compared:
+
+    python -m test.benchmark --sections 16 --grid 4 4 --output bench.json
+
+Cold measurements use a new controller with empty caches for every repetition.
+Warm measurements repeat the call on a controller that already served it.
+Calls are timed without tracemalloc, which slows every allocation, and
+peak_traced_bytes comes from one further call traced on its own.  Process RSS
+is not reported since ru_maxrss is a lifetime maximum that cannot be
+attributed to a single entry point.
+'''
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy
+
+import nornir_volumecontroller
+import nornir_volumemodel
+import nornir_volumecontroller.spatial
+from nornir_volumecontroller import assemble
+
+from nornir_imageregistration import iBox
+
+import test.synthetic
+
+
+def Measure(func, setup=None, repeat=3, pixels=None):
+    '''Time a function, then trace its memory in a separate call so tracing does not slow the timed calls
+    :param func func: Function to time, called with the value returned by setup
+    :param func setup: Untimed function called before each call, its result is passed to func
+    :param int repeat: Number of timed repetitions
+    :param int pixels: Number of output pixels per call, used to report throughput
+    :returns: Dictionary of timing and memory statistics
+    '''
+    def Call():
+        if setup is not None:
+            arg = setup()
+            return lambda: func(arg)
+
+        return func
+
+    timings = []
+    for i in range(0, repeat):
+        call = Call()
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+
+    call = Call()
+    tracemalloc.start()
+    try:
+        call()
+        peak_traced = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    result = {'seconds': timings,
+              'min_seconds': min(timings),
+              'median_seconds': statistics.median(timings),
+              'peak_traced_bytes': peak_traced}
+
+    if pixels is not None:
+        result['pixels'] = pixels
+        result['megapixels_per_second'] = pixels / result['median_seconds'] / 1.0e6
+
+    return result
+
+
+def SmallRegion(bounds, size=512):
+    '''A region of size x size pixels at the center of the first section'''
+    region = list(bounds)
+    centerY = (bounds[iBox.MinY] + bounds[iBox.MaxY]) / 2.0
+    centerX = (bounds[iBox.MinX] + bounds[iBox.MaxX]) / 2.0
+    region[iBox.MinY] = centerY - size / 2.0
+    region[iBox.MinX] = centerX - size / 2.0
+    region[iBox.MaxY] = centerY + size / 2.0
+    region[iBox.MaxX] = centerX + size / 2.0
+    region[iBox.MaxZ] = region[iBox.MinZ]
+    return region
+
+
+def Cutouts(bounds, count=32, size=128, spacing=32):
+    '''Square cutouts along a diagonal of the first section, each overlapping the next when spacing < size'''
+    regions = []
+    originY = float(int(bounds[iBox.MinY]))
+    originX = float(int(bounds[iBox.MinX]))
+    for i in range(0, count):
+        region = list(bounds)
+        region[iBox.MinY] = originY + i * spacing
+        region[iBox.MinX] = originX + i * spacing
+        region[iBox.MaxY] = region[iBox.MinY] + size
+        region[iBox.MaxX] = region[iBox.MinX] + size
+        region[iBox.MaxZ] = region[iBox.MinZ]
+        regions.append(region)
+
+    return regions
+
+
+def RunBenchmarks(volume_xml_path, repeat=3, downsample=2.0):
+    '''Benchmark the controller entry points on a volume
+    :returns: {benchmark name: {'cold': stats, 'warm': stats}}
+    '''
+    results = {}
+
+    def NewController():
+        return nornir_volumecontroller.CreateVolumeController(nornir_volumemodel.Load_Xml(volume_xml_path))
+
+    results['Load_Xml'] = {'cold': Measure(lambda: nornir_volumemodel.Load_Xml(volume_xml_path), repeat=repeat)}
+
+    volumeModel = nornir_volumemodel.Load_Xml(volume_xml_path)
+    results['BuildVolumeTransformMap'] = {'cold': Measure(lambda: nornir_volumecontroller.spatial.BuildVolumeTransformMap(volumeModel), repeat=repeat)}
+
+    results['Bounds'] = {'cold': Measure(lambda controller: controller.Bounds, setup=NewController, repeat=repeat)}
+
+    warm_controller = NewController()
+    bounds = warm_controller.Bounds
+
+    def NewControllerSharingTransforms():
+        return nornir_volumecontroller.Volume(volumeModel, transform_cache=warm_controller.TransformCache)
+
+    results['Bounds']['warm'] = Measure(lambda controller: controller.Bounds, setup=NewControllerSharingTransforms, repeat=repeat)
+
+    results['GetHighestResolution'] = {'cold': Measure(lambda controller: controller.GetHighestResolution(bounds), setup=NewController, repeat=repeat),
+                                       'warm': Measure(lambda: warm_controller.GetHighestResolution(bounds), repeat=repeat)}
+
+    resolution = warm_controller.GetHighestResolution(bounds).X * downsample
+    channels = warm_controller.Channels
+
+    for (name, region) in [('GetData_Small', SmallRegion(bounds)), ('GetData_Volume', bounds)]:
+        shape = warm_controller.GetOutputShape(region, resolution, channels)
+        pixels = shape[0] * shape[1] * shape[2] * shape[3]
+        warm_controller.GetData(region, resolution, channels)
+
+        results[name] = {'cold': Measure(lambda controller: controller.GetData(region, resolution, channels), setup=NewController, repeat=repeat, pixels=pixels),
+                         'warm': Measure(lambda: warm_controller.GetData(region, resolution, channels), repeat=repeat, pixels=pixels)}
+
+    # Peak traced memory shows the temporaries each output type needs, output_bytes the size of the result itself
+    shape = warm_controller.GetOutputShape(bounds, resolution, channels)
+    pixels = shape[0] * shape[1] * shape[2] * shape[3]
+    results['GetData_DType'] = {}
+    for dtype in assemble.SupportedOutputDTypes:
+        dtype = numpy.dtype(dtype)
+        stats = Measure(lambda controller: controller.GetData(bounds, resolution, channels, dtype=dtype), setup=NewController, repeat=repeat, pixels=pixels)
+        stats['output_bytes'] = pixels * dtype.itemsize
+        results['GetData_DType'][dtype.name] = stats
+
+    cutouts = Cutouts(bounds)
+    batch_stats = {}
+    warm_controller.GetDataBatch(cutouts, resolution, channels, stats=batch_stats)
+    results['GetDataBatch'] = {'cold': Measure(lambda controller: controller.GetDataBatch(cutouts, resolution, channels), setup=NewController, repeat=repeat),
+                               'cold_sequential': Measure(lambda controller: [controller.GetData(region, resolution, channels) for region in cutouts],
+                                                          setup=NewController, repeat=repeat),
+                               'sharing': batch_stats}
+
+    return results
+
+
+def Environment():
+    return {'python': sys.version,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': datetime.datetime.now().isoformat()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark nornir_volumecontroller on a synthetic volume')
+    parser.add_argument('--volume', default=None, help='Existing VolumeData.xml to benchmark instead of generating a synthetic volume')
+    parser.add_argument('--sections', type=int, default=8)
+    parser.add_argument('--grid', type=int, nargs=2, default=[4, 4], help='Rows and columns of tiles per section')
+    parser.add_argument('--tile', type=int, nargs=2, default=[512, 512], help='Rows and columns of each tile')
+    parser.add_argument('--channels', nargs='+', default=['TEM'])
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--downsample', type=float, default=2.0, help='Downsample of GetData requests')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None, help='Path to write the JSON results to, printed if omitted')
+    args = parser.parse_args(argv)
+
+    temp_dir = None
+    volume_xml_path = args.volume
+    config = {'volume': args.volume, 'downsample': args.downsample, 'repeat': args.repeat}
+    if volume_xml_path is None:
+        temp_dir = tempfile.mkdtemp()
+        volume_xml_path = test.synthetic.CreateSyntheticVolume(os.path.join(temp_dir, 'SyntheticVolume'),
+                                                               num_sections=args.sections,
+                                                               grid_shape=args.grid,
+                                                               tile_shape=args.tile,
+                                                               channels=args.channels,
+                                                               levels=args.levels)
+        config.update({'sections': args.sections, 'grid': args.grid, 'tile': args.tile,
+                       'channels': args.channels, 'levels': args.levels})
+
+    try:
+        report = {'config': config,
+                  'environment': Environment(),
+                  'results': RunBenchmarks(volume_xml_path, repeat=args.repeat, downsample=args.downsample)}
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, 'w') as hFile:
+            json.dump(report, hFile, indent=2)
+
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+
+Load test of the chunk server on localhost.
+
+Each client thread holds one keep-alive connection and requests random chunks
+of the first level, revalidating chunks it has already received with
+If-None-Match as a caching viewer would:
+
+    python -m test.loadtest --clients 8 --requests 200 --output load.json
+
+Without --volume a synthetic volume is generated and served.
+'''
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+import nornir_volumecontroller
+import nornir_volumecontroller.server
+
+from nornir_imageregistration import iBox
+
+import test.benchmark
+import test.synthetic
+
+
+def ChunkPaths(metadata, level=1.0):
+    '''URL paths of every chunk of a level in the volume bounds'''
+    bounds = metadata['bounds']
+    chunk_shape = metadata['chunk_shape']
+    rows = int(bounds[iBox.MaxY] // (chunk_shape[0] * level)) + 1
+    cols = int(bounds[iBox.MaxX] // (chunk_shape[1] * level)) + 1
+    paths = []
+    for sectionNumber in range(int(bounds[iBox.MinZ]), int(bounds[iBox.MaxZ]) + 1):
+        for y in range(max(int(bounds[iBox.MinY] // (chunk_shape[0] * level)), 0), rows):
+            for x in range(max(int(bounds[iBox.MinX] // (chunk_shape[1] * level)), 0), cols):
+                paths.append('/chunk/%d/%g/%d/%d' % (sectionNumber, level, x, y))
+
+    return paths
+
+
+def RunClient(host, port, paths, num_requests, seed, results):
+    '''Issue requests on one keep-alive connection, appending (status, seconds) tuples to results'''
+    rng = random.Random(seed)
+    etags = {}
+    connection = http.client.HTTPConnection(host, port)
+    try:
+        for i in range(0, num_requests):
+            path = rng.choice(paths)
+            headers = {}
+            if path in etags:
+                headers['If-None-Match'] = etags[path]
+
+            start = time.perf_counter()
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            results.append((response.status, time.perf_counter() - start))
+
+            # 204 is an empty chunk, which has validators like any other
+            if response.status in (200, 204):
+                etags[path] = response.getheader('ETag')
+    finally:
+        connection.close()
+
+
+def RunLoadTest(server, num_clients=4, num_requests=50, level=1.0, seed=0):
+    '''Run concurrent clients against a running server
+    :returns: Dictionary of throughput, latency and status statistics
+    '''
+    (host, port) = server.server_address[0:2]
+
+    connection = http.client.HTTPConnection(host, port)
+    connection.request('GET', '/metadata')
+    metadata = json.loads(connection.getresponse().read())
+    connection.close()
+
+    paths = ChunkPaths(metadata, level)
+
+    per_client = [[] for i in range(0, num_clients)]
+    threads = [threading.Thread(target=RunClient, args=(host, port, paths, num_requests, seed + i, per_client[i])) for i in range(0, num_clients)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+
+    results = [result for client in per_client for result in client]
+    latencies = sorted([seconds for (status, seconds) in results])
+    statuses = {}
+    for (status, seconds) in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {'clients': num_clients,
+            'requests': len(results),
+            'chunks': len(paths),
+            'seconds': elapsed,
+            'requests_per_second': len(results) / elapsed if elapsed > 0 else 0.0,
+            'median_latency_seconds': statistics.median(latencies),
+            'p95_latency_seconds': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+            'statuses': statuses}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the nornir_volumecontroller chunk server on localhost')
+    parser.add_argument('--volume', default=None, help='Existing VolumeData.xml to serve instead of generating a synthetic volume')
+    parser.add_argument('--sections', type=int, default=4)
+    parser.add_argument('--grid', type=int, nargs=2, default=[4, 4], help='Rows and columns of tiles per section')
+    parser.add_argument('--tile', type=int, nargs=2, default=[512, 512], help='Rows and columns of each tile')
+    parser.add_argument('--chunk', type=int, nargs=2, default=[256, 256], help='Rows and columns of each served chunk')
+    parser.add_argument('--workers', type=int, default=nornir_volumecontroller.server.DefaultMaxWorkers)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100, help='Requests issued by each client')
+    parser.add_argument('--level', type=float, default=1.0)
+    parser.add_argument('--output', default=None, help='Path to write the JSON results to, printed if omitted')
+    args = parser.parse_args(argv)
+
+    temp_dir = None
+    volume_xml_path = args.volume
+    if volume_xml_path is None:
+        temp_dir = tempfile.mkdtemp()
+        volume_xml_path = test.synthetic.CreateSyntheticVolume(os.path.join(temp_dir, 'SyntheticVolume'),
+                                                               num_sections=args.sections,
+                                                               grid_shape=args.grid,
+                                                               tile_shape=args.tile)
+
+    server = None
+    try:
+        volume = nornir_volumecontroller.CreateVolumeController(volume_xml_path)
+        server = nornir_volumecontroller.server.Serve(volume, chunk_shape=args.chunk, max_workers=args.workers)
+        report = {'config': vars(args),
+                  'environment': test.benchmark.Environment(),
+                  'results': RunLoadTest(server, num_clients=args.clients, num_requests=args.requests, level=args.level)}
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, 'w') as hFile:
+            json.dump(report, hFile, indent=2)
+
+    return report
+
+
+if __name__ == '__main__':
+    main()
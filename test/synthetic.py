@@ -0,0 +1,203 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+
+Writes small synthetic nornir volumes so the controller can be tested and
+benchmarked without the IDOC data referenced by TESTINPUTPATH.
+
+The layout follows the nornir-buildmanager conventions:
+
+    VolumeData.xml
+    <Block>/<Section>/<Channel>/ChannelToVolume.mosaic
+    <Block>/<Section>/<Channel>/Leveled/TilePyramid/<Level>/<Tile>.png
+'''
+
+import math
+import os
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+import numpy
+
+import nornir_imageregistration
+import nornir_volumecontroller
+import nornir_volumemodel
+
+DefaultBlockName = 'TEM'
+DefaultUnitsPerPixel = 2.18
+DefaultSectionThickness = 90.0
+
+
+def TileImage(rng, tile_shape):
+    '''Random tile with smooth structure so downsampled levels are not pure noise'''
+    coarse = rng.random_sample((max(tile_shape[0] // 16, 1), max(tile_shape[1] // 16, 1)))
+    image = numpy.kron(coarse, numpy.ones((16, 16)))[:tile_shape[0], :tile_shape[1]]
+    image = numpy.pad(image, ((0, tile_shape[0] - image.shape[0]), (0, tile_shape[1] - image.shape[1])), mode='edge')
+    return (0.75 * image + 0.25 * rng.random_sample(tile_shape)).astype(numpy.float32)
+
+
+def DownsampleImage(image, level):
+    '''Box filter an image by an integer factor'''
+    if level == 1:
+        return image
+
+    rows = image.shape[0] // level
+    cols = image.shape[1] // level
+    return image[:rows * level, :cols * level].reshape(rows, level, cols, level).mean(axis=(1, 3)).astype(image.dtype)
+
+
+def _ScaleElement(parent, units_per_pixel, section_thickness):
+    scale = ElementTree.SubElement(parent, 'Scale')
+    ElementTree.SubElement(scale, 'X', {'UnitsOfMeasure': 'nm', 'UnitsPerPixel': repr(units_per_pixel)})
+    ElementTree.SubElement(scale, 'Y', {'UnitsOfMeasure': 'nm', 'UnitsPerPixel': repr(units_per_pixel)})
+    ElementTree.SubElement(scale, 'Z', {'UnitsOfMeasure': 'nm', 'UnitsPerPixel': repr(section_thickness)})
+    return scale
+
+
+def CreateSyntheticVolume(path,
+                          num_sections=4,
+                          grid_shape=(3, 3),
+                          tile_shape=(256, 256),
+                          channels=('TEM',),
+                          levels=(1, 2, 4),
+                          overlap=0.1,
+                          first_section=1,
+                          units_per_pixel=DefaultUnitsPerPixel,
+                          seed=0):
+    '''Write a synthetic volume and return the path to its VolumeData.xml
+    :param str path: Directory to create the volume in
+    :param int num_sections: Number of sections
+    :param tuple grid_shape: (rows, columns) of tiles in each section
+    :param tuple tile_shape: (rows, columns) of each full resolution tile
+    :param list channels: Names of the channels present in every section
+    :param list levels: Downsample levels of the tile pyramid
+    :param float overlap: Fraction of a tile that overlaps its neighbors
+    :param int first_section: Number of the first section
+    :param float units_per_pixel: Size of a full resolution pixel in nm
+    :param int seed: Seed for the tile contents and the per-section jitter
+    '''
+    rng = numpy.random.RandomState(seed)
+    os.makedirs(path, exist_ok=True)
+
+    volume_element = ElementTree.Element('Volume', {'Name': os.path.basename(os.path.normpath(path)), 'Path': '', 'Version': '1.0'})
+    block_element = ElementTree.SubElement(volume_element, 'Block', {'Name': DefaultBlockName, 'Path': DefaultBlockName, 'Version': '1.0'})
+
+    stride = (int(tile_shape[0] * (1.0 - overlap)), int(tile_shape[1] * (1.0 - overlap)))
+
+    for sectionNumber in range(first_section, first_section + num_sections):
+        section_dir = '%04d' % sectionNumber
+        section_element = ElementTree.SubElement(block_element, 'Section', {'Name': section_dir,
+                                                                             'Number': str(sectionNumber),
+                                                                             'Path': section_dir,
+                                                                             'Version': '1.0'})
+
+        # Jitter each section slightly so sections have different bounds, as registered data does
+        jitter = rng.randint(-8, 9, size=2)
+
+        for channel_name in channels:
+            channel_path = os.path.join(path, DefaultBlockName, section_dir, channel_name)
+            pyramid_path = os.path.join(channel_path, 'Leveled', 'TilePyramid')
+
+            channel_element = ElementTree.SubElement(section_element, 'Channel', {'Name': channel_name, 'Path': channel_name, 'Version': '1.0'})
+            _ScaleElement(channel_element, units_per_pixel, DefaultSectionThickness)
+
+            filter_element = ElementTree.SubElement(channel_element, 'Filter', {'Name': 'Leveled', 'Path': 'Leveled', 'Version': '1.0'})
+            pyramid_element = ElementTree.SubElement(filter_element, 'TilePyramid', {'Path': 'TilePyramid',
+                                                                                     'ImageFormatExt': '.png',
+                                                                                     'LevelFormat': '%03d',
+                                                                                     'NumberOfTiles': str(grid_shape[0] * grid_shape[1])})
+            for level in levels:
+                ElementTree.SubElement(pyramid_element, 'Level', {'Downsample': str(level), 'Path': '%03d' % level})
+                os.makedirs(os.path.join(pyramid_path, '%03d' % level), exist_ok=True)
+
+            image_to_transform = {}
+            for iRow in range(0, grid_shape[0]):
+                for iCol in range(0, grid_shape[1]):
+                    tile_name = '%03d.png' % (iRow * grid_shape[1] + iCol)
+                    tile = TileImage(rng, tile_shape)
+                    for level in levels:
+                        nornir_imageregistration.SaveImage(os.path.join(pyramid_path, '%03d' % level, tile_name), DownsampleImage(tile, level))
+
+                    offset = (iRow * stride[0] + jitter[0], iCol * stride[1] + jitter[1])
+                    image_to_transform[tile_name] = nornir_imageregistration.transforms.factory.CreateRigidTransform(target_image_shape=tile_shape,
+                                                                                                                      source_image_shape=tile_shape,
+                                                                                                                      rangle=0,
+                                                                                                                      warped_offset=offset)
+
+            mosaic = nornir_imageregistration.Mosaic(image_to_transform)
+            mosaic.SaveToMosaicFile(os.path.join(channel_path, 'ChannelToVolume.mosaic'))
+
+            ElementTree.SubElement(channel_element, 'Transform', {'Name': 'ChannelToVolume',
+                                                                  'Path': 'ChannelToVolume.mosaic',
+                                                                  'Type': 'ChannelToVolume'})
+
+    volume_xml_path = os.path.join(path, 'VolumeData.xml')
+    ElementTree.ElementTree(volume_element).write(volume_xml_path, xml_declaration=True, encoding='utf-8')
+    return volume_xml_path
+
+
+def UnalignedRegion(bounds):
+    '''A region of the first section whose edges fall between the pixels of every pyramid level'''
+    iBox = nornir_imageregistration.iBox
+    height = bounds[iBox.MaxY] - bounds[iBox.MinY]
+    width = bounds[iBox.MaxX] - bounds[iBox.MinX]
+
+    region = list(bounds)
+    region[iBox.MinY] = bounds[iBox.MinY] + int(height * 0.1) + 0.37
+    region[iBox.MinX] = bounds[iBox.MinX] + int(width * 0.2) + 0.61
+    region[iBox.MaxY] = bounds[iBox.MinY] + int(height * 0.7) + 0.13
+    region[iBox.MaxX] = bounds[iBox.MinX] + int(width * 0.75) + 0.29
+    region[iBox.MaxZ] = region[iBox.MinZ]
+    return region
+
+
+def AlignedSuperset(bounds, downsample, step=54.0):
+    '''Regions of the first section to check that a region between pixels is sampled without shifting or stretching.
+       The superset starts on a multiple of step, a multiple of pyramid levels 1 and 2 and of downsamples 1.35 and 2.7,
+       so its output pixels start on the pixel grid of the level.  The region starts a whole number of output pixels
+       into the superset, but between the pixels of the level, so its output should be a crop of the superset's.
+    :returns: (superset, region, (row, column) of the region's first output pixel in the superset's output)
+    '''
+    iBox = nornir_imageregistration.iBox
+    (rows, columns) = (3, 5)
+    minY = step * math.ceil(bounds[iBox.MinY] / step)
+    minX = step * math.ceil(bounds[iBox.MinX] / step)
+
+    superset = [bounds[iBox.MinZ], minY, minX, bounds[iBox.MinZ], minY + 40 * downsample, minX + 40 * downsample]
+    region = [bounds[iBox.MinZ], minY + rows * downsample, minX + columns * downsample,
+              bounds[iBox.MinZ], minY + (rows + 20) * downsample, minX + (columns + 30) * downsample]
+    return (superset, region, (rows, columns))
+
+
+class SyntheticVolumeTestCase(unittest.TestCase):
+    '''Creates a synthetic volume once for all of the tests in a class'''
+
+    NumSections = 3
+    GridShape = (2, 2)
+    TileShape = (128, 128)
+    Channels = ('TEM',)
+    Levels = (1, 2, 4)
+
+    @classmethod
+    def setUpClass(cls):
+        super(SyntheticVolumeTestCase, cls).setUpClass()
+        cls.TempDir = tempfile.mkdtemp()
+        cls.VolumeXML = CreateSyntheticVolume(os.path.join(cls.TempDir, cls.__name__),
+                                              num_sections=cls.NumSections,
+                                              grid_shape=cls.GridShape,
+                                              tile_shape=cls.TileShape,
+                                              channels=cls.Channels,
+                                              levels=cls.Levels)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.TempDir)
+        super(SyntheticVolumeTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        super(SyntheticVolumeTestCase, self).setUp()
+        self.volumeModel = nornir_volumemodel.Load_Xml(self.VolumeXML)
+        self.volumeController = nornir_volumecontroller.CreateVolumeController(self.volumeModel)
@@ -0,0 +1,197 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import unittest
+
+import numpy
+
+import nornir_imageregistration
+import nornir_volumecontroller
+from nornir_volumecontroller import assemble, spatial
+
+import test.synthetic
+
+
+class SelectLevelTest(unittest.TestCase):
+
+    Levels = {1: '001', 2: '002', 4: '004', 8: '008'}
+
+    def test_CoarsestSufficientLevel(self):
+        self.assertEqual(assemble.SelectLevel(self.Levels, 1), (1, '001'))
+        self.assertEqual(assemble.SelectLevel(self.Levels, 3), (2, '002'))
+        self.assertEqual(assemble.SelectLevel(self.Levels, 7.5), (4, '004'))
+        self.assertEqual(assemble.SelectLevel(self.Levels, 100), (8, '008'))
+
+    def test_RoundingError(self):
+        self.assertEqual(assemble.SelectLevel(self.Levels, 4 - 1e-9), (4, '004'), "Rounding error should not select a finer level")
+
+    def test_FinerThanAvailable(self):
+        self.assertEqual(assemble.SelectLevel({2: '002', 4: '004'}, 1), (2, '002'))
+
+
+class ResampleToShapeTest(unittest.TestCase):
+
+    def test_ExactShape(self):
+        image = numpy.random.rand(100, 120).astype(numpy.float32)
+        for shape in [(37, 41), (100, 120), (150, 181), (1, 1)]:
+            resampled = assemble.ResampleToShape(image, shape)
+            self.assertEqual(resampled.shape, shape)
+
+        self.assertIs(assemble.ResampleToShape(image, image.shape), image, "Matching shape should not be resampled")
+
+    def test_PreservesConstant(self):
+        image = numpy.full((64, 64), 0.5, dtype=numpy.float32)
+        resampled = assemble.ResampleToShape(image, (21, 23))
+        self.assertTrue(numpy.allclose(resampled, 0.5))
+
+    def test_AntiAliased(self):
+        # A one pixel checkerboard has no representation at a lower resolution and should average to gray
+        image = (numpy.indices((128, 128)).sum(axis=0) % 2).astype(numpy.float32)
+        resampled = assemble.ResampleToShape(image, (43, 43))
+        self.assertLess(numpy.abs(resampled[4:-4, 4:-4] - 0.5).max(), 0.1)
+
+    def test_StackMatchesSingleImages(self):
+        rng = numpy.random.RandomState(0)
+        images = [rng.random_sample((96, 80)).astype(numpy.float32) for i in range(0, 3)]
+
+        for shape in [(32, 27), (96, 80), (150, 101)]:
+            stacked = assemble.ResampleStackToShape(images, shape)
+            self.assertEqual(len(stacked), len(images))
+            for (image, resampled) in zip(images, stacked):
+                self.assertTrue(numpy.allclose(assemble.ResampleToShape(image, shape), resampled, atol=1e-6))
+
+
+class ResampleRegionTest(unittest.TestCase):
+    '''Regions whose edges fall between the pixels of a level sample only the region'''
+
+    Level = 2.0
+
+    def LevelImage(self, rect):
+        '''Image of the level covering the pixels the rect touches, each pixel holds the volume space Y of its center'''
+        pixel_region = spatial.PixelRegion(rect, self.Level)
+        rows = (numpy.arange(pixel_region[0], pixel_region[2], dtype=numpy.float32) + 0.5) * self.Level
+        return numpy.repeat(rows[:, numpy.newaxis], pixel_region[3] - pixel_region[1], axis=1)
+
+    def test_RegionIsNotStretched(self):
+        downsample = 2.7
+        rect = numpy.array((8.1, 13.5, 62.1, 94.5))
+        shape = (20, 30)
+        resampled = assemble.ResampleToShape(self.LevelImage(rect), shape, rect, self.Level)
+
+        # Linear interpolation reproduces a ramp, so away from the clamped edges each output pixel holds the Y of its center
+        expected = rect[0] + (numpy.arange(0, shape[0]) + 0.5) * downsample
+        self.assertTrue(numpy.allclose(resampled[1:-1, 0], expected[1:-1], atol=1e-3))
+
+    def test_MatchesCropOfAlignedSuperset(self):
+        rng = numpy.random.RandomState(0)
+        downsample = 2.7
+        superset = numpy.array((0, 0, 40 * downsample, 60 * downsample))
+        image = rng.random_sample(spatial.PixelShape(superset, self.Level)).astype(numpy.float32)
+        expected = assemble.ResampleToShape(image, (40, 60), superset, self.Level)
+
+        # Starts three rows and five columns of output pixels into the superset, between the pixels of the level
+        rect = numpy.array((3 * downsample, 5 * downsample, 23 * downsample, 35 * downsample))
+        pixel_region = spatial.PixelRegion(rect, self.Level)
+        crop = image[pixel_region[0]:pixel_region[2], pixel_region[1]:pixel_region[3]]
+        resampled = assemble.ResampleToShape(crop, (20, 30), rect, self.Level)
+
+        self.assertTrue(numpy.allclose(resampled, expected[3:23, 5:35], atol=1e-5))
+
+    def test_AlignedRegionIsCropped(self):
+        image = numpy.random.rand(50, 60).astype(numpy.float32)
+        rect = numpy.array((0, 0, 100, 120))
+        self.assertIs(assemble.ResampleToShape(image, (50, 60), rect, self.Level), image)
+
+        stacked = assemble.ResampleStackToShape([image, image * 2], (49, 60), rect - numpy.array((0, 0, 2, 0)), self.Level)
+        self.assertTrue(numpy.array_equal(stacked[1], image[:49] * 2))
+
+
+class OutputDTypeTest(unittest.TestCase):
+
+    def test_Supported(self):
+        for dtype in (numpy.uint8, numpy.uint16, numpy.float16, numpy.float32, 'uint8'):
+            self.assertEqual(assemble.OutputDType(dtype), numpy.dtype(dtype))
+
+        self.assertRaises(ValueError, assemble.OutputDType, numpy.float64)
+        self.assertRaises(ValueError, assemble.OutputDType, numpy.int32)
+
+    def test_IntegerRoundingAndClipping(self):
+        source = numpy.array([[-0.5, 0.0, 0.5 / 255.0, 1.5 / 255.0, 0.5, 1.0, 2.0, numpy.nan]], dtype=numpy.float32)
+        dest = numpy.empty(source.shape, dtype=numpy.uint8)
+        assemble.CopyConverted(dest, source)
+        # Halves round to even, values outside [0, 1] are clipped and NaN is zero
+        self.assertEqual(dest.tolist(), [[0, 0, 0, 2, 128, 255, 255, 0]])
+
+        dest16 = numpy.empty((1, 2), dtype=numpy.uint16)
+        assemble.CopyConverted(dest16, source[:, 4:6])
+        self.assertEqual(dest16.tolist(), [[32768, 65535]])
+
+    def test_BlocksMatchSinglePass(self):
+        source = numpy.random.RandomState(0).random_sample((300, 700)).astype(numpy.float32)
+        dest = numpy.empty(source.shape, dtype=numpy.uint8)
+        assemble.CopyConverted(dest, source)
+        expected = numpy.clip(numpy.rint(source.astype(numpy.float64) * 255), 0, 255).astype(numpy.uint8)
+        self.assertLessEqual(numpy.abs(dest.astype(int) - expected.astype(int)).max(), 1)
+
+    def test_OutputBuffer(self):
+        output = assemble.OutputBuffer((1, 2, 4, 4), ['TEM'], 10, dtype=numpy.uint8)
+        output.Write(10, 'TEM', numpy.full((3, 3), 1.0, dtype=numpy.float32))
+        data = output.Finish()
+        self.assertEqual(data.dtype, numpy.uint8)
+        self.assertEqual(int(data[0, 0, 0, 0]), 255)
+        self.assertEqual(int(data[0, 0, 3, 3]), 0)
+        self.assertFalse(numpy.any(data[0, 1]))
+
+        out = numpy.zeros((1, 2, 4, 4), dtype=numpy.float16)
+        self.assertIs(assemble.OutputBuffer((1, 2, 4, 4), ['TEM'], 10, out=out).Data, out, "The type of out is used by default")
+        self.assertRaises(ValueError, assemble.OutputBuffer, (1, 2, 4, 4), ['TEM'], 10, out=out, dtype=numpy.uint8)
+
+
+class FusedAssemblyTest(test.synthetic.SyntheticVolumeTestCase):
+    '''The synthetic volume writes identical mosaics for every channel of a section'''
+
+    Channels = ('GABA', 'TEM')
+
+    def test_FusedMatchesSeparateAssembly(self):
+        bounds = self.volumeController.Bounds
+        resolution = self.volumeController.GetHighestResolution(bounds).X * 2.0
+        channel_names = sorted(self.Channels)
+
+        images = self.volumeController.GetData(bounds, resolution, channel_names)
+        self.assertEqual(self.volumeController.Metrics.Counter('fused_channels'), self.NumSections)
+        self.assertEqual(self.volumeController.TransformCache.Shared, self.NumSections)
+
+        separate = nornir_volumecontroller.Volume(self.volumeModel)
+        output_shape = images.shape[2:]
+        rect = nornir_imageregistration.BoundingBox.CreateFromBounds(bounds).RectangleXY.ToArray()
+        for sectionNumber in range(bounds[0], bounds[3] + 1):
+            for (iChannel, channel_name) in enumerate(channel_names):
+                channel = separate.transform_path_map[sectionNumber][channel_name]
+                expected = separate._AssembleChannel(sectionNumber, channel, rect, resolution, output_shape)
+                self.assertTrue(numpy.allclose(expected, images[iChannel, sectionNumber - bounds[0]], atol=1e-5),
+                                "Fused channel %s of section %d does not match" % (channel_name, sectionNumber))
+
+
+class GetDataDTypeTest(test.synthetic.SyntheticVolumeTestCase):
+
+    def test_DTypes(self):
+        bounds = self.volumeController.Bounds
+        resolution = self.volumeController.GetHighestResolution(bounds).X * 2.0
+        expected = self.volumeController.GetData(bounds, resolution, None)
+        self.assertEqual(expected.dtype, numpy.float32)
+
+        for (dtype, atol) in [(numpy.float16, 1e-3), (numpy.uint16, 1.0 / 65535), (numpy.uint8, 1.0 / 255)]:
+            images = self.volumeController.GetData(bounds, resolution, None, dtype=dtype)
+            self.assertEqual(images.dtype, numpy.dtype(dtype))
+
+            scale = numpy.iinfo(dtype).max if numpy.dtype(dtype).kind == 'u' else 1.0
+            self.assertTrue(numpy.allclose(images.astype(numpy.float32) / scale, numpy.clip(expected, 0, 1), atol=atol),
+                            "%s output does not match float32 output" % numpy.dtype(dtype).name)
+
+        self.assertRaises(ValueError, self.volumeController.GetData, bounds, resolution, None, dtype=numpy.float64)
+
+
+if __name__ == "__main__":
+    unittest.main()
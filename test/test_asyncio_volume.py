@@ -0,0 +1,74 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import asyncio
+import threading
+import types
+import unittest
+
+import numpy
+
+from nornir_volumecontroller.asyncio_volume import AsyncVolume
+
+
+class BlockingVolume(object):
+    '''Volume double whose sections block until released and then write into the request's output'''
+
+    def __init__(self, num_sections):
+        self.NumSections = num_sections
+        self.Running = threading.Semaphore(0)
+        self.Release = threading.Event()
+        self.Started = 0
+        self.Finished = 0
+        self._lock = threading.Lock()
+
+    def PlanRequest(self, region, resolution, channel_names, out=None, dtype=None):
+        return types.SimpleNamespace(Output=out, SectionNumbers=list(range(0, self.NumSections)))
+
+    def AssembleSection(self, request, sectionNumber):
+        with self._lock:
+            self.Started += 1
+
+        self.Running.release()
+        self.Release.wait(5)
+        request.Output[sectionNumber] = 1
+
+        with self._lock:
+            self.Finished += 1
+
+    def FinishRequest(self, request):
+        return request.Output
+
+
+class AsyncVolumeCancelTest(unittest.TestCase):
+
+    def test_CancelWaitsForRunningSections(self):
+        volume = BlockingVolume(num_sections=4)
+        asyncVolume = AsyncVolume(volume, max_concurrency=2)
+        out = numpy.zeros((4,), dtype=numpy.float32)
+
+        async def CancelWhileRunning():
+            loop = asyncio.get_running_loop()
+            task = asyncio.ensure_future(asyncVolume.GetData(None, 1.0, None, out=out))
+            for i in range(0, asyncVolume.MaxConcurrency):
+                await loop.run_in_executor(None, volume.Running.acquire)
+
+            task.cancel()
+            threading.Timer(0.05, volume.Release.set).start()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+            # Closing the event loop waits for its executor, so check before returning
+            self.assertEqual(volume.Finished, volume.Started, "Cancelling should wait for sections already running")
+            written = out.copy()
+            await asyncio.sleep(0.1)
+            self.assertTrue(numpy.array_equal(out, written), "Nothing should be written into out after GetData raises")
+
+        asyncio.run(CancelWhileRunning())
+        self.assertEqual(volume.Started, asyncVolume.MaxConcurrency, "Sections waiting for a slot should not start")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy
+
+import nornir_imageregistration
+import nornir_volumecontroller
+from nornir_volumecontroller import spatial
+from nornir_volumecontroller.baked import BakedStore, BakedVolume, BakedStorePathForVolumeXml
+
+import test.synthetic
+
+
+class BakedStoreTest(test.synthetic.SyntheticVolumeTestCase):
+
+    ChunkShape = (128, 128)
+
+    def setUp(self):
+        super(BakedStoreTest, self).setUp()
+        self.Store = BakedStore.Create(tempfile.mkdtemp(dir=self.TempDir), chunk_shape=self.ChunkShape)
+        self.Baked = self.Store.Bake(self.volumeController)
+
+        bounds = self.volumeController.Bounds
+        self.Region = bounds
+        self.Resolution = self.volumeController.GetHighestResolution(bounds).X * 2.0
+
+    def test_BakeEverySection(self):
+        self.assertEqual(len(self.Baked), self.NumSections * len(self.Channels))
+        self.assertEqual(self.Store.SectionNumbers, list(range(1, self.NumSections + 1)))
+        self.assertEqual(self.Store.Levels(1, 'TEM'), [float(level) for level in self.Levels])
+
+    def test_BakedVolumeMatchesAssembly(self):
+        '''Compare the store with the pixels of a full resolution tile read from its file, for a region that only the
+           tile covers and that lies on the pixel grid of the level, so the expected image does not depend on assembly'''
+        channel_path = os.path.join(os.path.dirname(self.VolumeXML), test.synthetic.DefaultBlockName, '0001', 'TEM')
+        mosaic = nornir_imageregistration.Mosaic.LoadFromMosaicFile(os.path.join(channel_path, 'ChannelToVolume.mosaic'))
+        tile_bounds = spatial.RectToArray(mosaic.ImageToTransform['000.png'].FixedBoundingBox)
+        tile = nornir_imageregistration.LoadImage(os.path.join(channel_path, 'Leveled', 'TilePyramid', '001', '000.png'))
+
+        # Stay clear of the tile's neighbors, which overlap its last rows and columns
+        (margin, size) = (8, 64)
+        (minY, minX) = (int(tile_bounds[0]) + margin, int(tile_bounds[1]) + margin)
+        region = [1, minY, minX, 1, minY + size, minX + size]
+        expected = tile[margin:margin + size, margin:margin + size]
+
+        bakedVolume = BakedVolume(BakedStore.Open(self.Store.Path))
+        self.assertEqual(bakedVolume.Channels, set(self.Channels))
+        images = bakedVolume.GetData(region, self.volumeController.GetHighestResolution(region).X, None)
+        self.assertEqual(images.shape, (len(self.Channels), 1, size, size))
+        self.assertTrue(numpy.allclose(images[0, 0], expected, atol=1e-4), "Baked data does not match the tile")
+
+        # The rest of the volume matches assembly from tiles
+        expected = self.volumeController.GetData(self.Region, self.Resolution, None)
+        images = bakedVolume.GetData(self.Region, self.Resolution, None)
+        self.assertEqual(images.shape, expected.shape)
+        self.assertTrue(numpy.array_equal(expected, images), "Baked data does not match assembled data")
+
+    def test_MatchesUnalignedRegion(self):
+        '''Baked reads are taken from the pixel grid of the level, like tiles assembled without a store'''
+        region = test.synthetic.UnalignedRegion(self.volumeController.Bounds)
+        bakedController = nornir_volumecontroller.Volume(self.volumeModel, baked_store=self.Store)
+        bakedVolume = BakedVolume(self.Store)
+        highest = self.volumeController.GetHighestResolution(region).X
+
+        for downsample in (1.0, 2.0, 2.7):
+            expected = self.volumeController.GetData(region, highest * downsample, None)
+
+            images = bakedController.GetData(region, highest * downsample, None)
+            self.assertTrue(numpy.array_equal(expected, images), "Volume reading the store differs at downsample %g" % downsample)
+
+            images = bakedVolume.GetData(region, highest * downsample, None)
+            self.assertTrue(numpy.array_equal(expected, images), "BakedVolume differs at downsample %g" % downsample)
+
+        self.assertGreater(bakedController.Metrics.Counter('baked_reads'), 0)
+        self.assertEqual(bakedController.Metrics.Counter('tiles_touched'), 0)
+
+    def test_StoreDiscovery(self):
+        volumeController = nornir_volumecontroller.CreateVolumeController(self.VolumeXML, use_manifest=False)
+        self.assertIsNone(volumeController.BakedStore, "Without a store beside VolumeData.xml sections are assembled from tiles")
+
+        store = BakedStore.Create(BakedStorePathForVolumeXml(self.VolumeXML), chunk_shape=self.ChunkShape)
+        try:
+            store.Bake(self.volumeController, sections=[1])
+
+            volumeController = nornir_volumecontroller.CreateVolumeController(self.VolumeXML, use_manifest=False)
+            self.assertIsNotNone(volumeController.BakedStore, "A valid store beside VolumeData.xml is used automatically")
+
+            volumeController = nornir_volumecontroller.CreateVolumeController(self.VolumeXML, use_manifest=False, use_baked_store=False)
+            self.assertIsNone(volumeController.BakedStore)
+        finally:
+            store.Close()
+            shutil.rmtree(store.Path)
+
+    def test_EmptyChunksNotWritten(self):
+        level_entry = self.Store._Entry(1, 'TEM')['levels'][repr(1.0)]
+        self.assertIn('empty_chunks', level_entry)
+
+        chunk_shape = self.Store.ChunkShape
+        for (iRow, iCol) in self.Store.EmptyChunks(1, 'TEM', 1.0):
+            pixel_region = (iRow * chunk_shape[0], iCol * chunk_shape[1], (iRow + 1) * chunk_shape[0], (iCol + 1) * chunk_shape[1])
+            self.assertFalse(numpy.any(self.Store.Read(1, 'TEM', 1.0, pixel_region)))
+
+    def test_ZeroCopyRead(self):
+        image = self.Store.Read(1, 'TEM', 1.0, (10, 10, 50, 50))
+        self.assertIsInstance(image, numpy.memmap)
+        self.assertEqual(image.shape, (40, 40))
+
+    def test_VolumeUsesStore(self):
+        volumeController = nornir_volumecontroller.Volume(self.volumeModel, baked_store=self.Store)
+        images = volumeController.GetData(self.Region, self.Resolution, None)
+
+        self.assertEqual(volumeController.Metrics.Counter('baked_reads'), self.NumSections * len(self.Channels))
+        self.assertEqual(volumeController.Metrics.Counter('tiles_touched'), 0)
+        self.assertEqual(images.shape, volumeController.GetOutputShape(self.Region, self.Resolution, None))
+
+    def test_MosaicWithoutTiles(self):
+        '''A section whose mosaic has no tiles is skipped and the rest of the volume is still baked'''
+        empty_path = os.path.abspath(self.volumeController.transform_path_map[2]['TEM'].Transform.FullPath)
+        GetTileIndex = self.volumeController.TransformCache.GetTileIndex
+
+        def GetTileIndexWithoutSection2(path):
+            (transform, tile_index) = GetTileIndex(path)
+            if os.path.abspath(path) == empty_path:
+                return (transform, spatial.TileIndex({}))
+
+            return (transform, tile_index)
+
+        store = BakedStore.Create(tempfile.mkdtemp(dir=self.TempDir), chunk_shape=self.ChunkShape)
+        with mock.patch.object(self.volumeController.TransformCache, 'GetTileIndex', side_effect=GetTileIndexWithoutSection2):
+            baked = store.Bake(self.volumeController, force=True)
+
+        self.assertEqual(baked, [(1, 'TEM'), (3, 'TEM')])
+        self.assertEqual(store.Levels(2, 'TEM'), [])
+        self.assertEqual(store.SectionNumbers, [1, 3])
+
+    def test_IncrementalRebake(self):
+        self.assertEqual(self.Store.Bake(self.volumeController), [], "Nothing changed, so nothing should be rebaked")
+
+        transform_path = self.volumeController.transform_path_map[2]['TEM'].Transform.FullPath
+        stat = os.stat(transform_path)
+        os.utime(transform_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        self.assertFalse(self.Store.IsCurrent(2, 'TEM'))
+
+        # A stale section is assembled from tiles while the others are read from the store
+        volumeController = nornir_volumecontroller.Volume(self.volumeModel, baked_store=self.Store)
+        volumeController.GetData(self.Region, self.Resolution, None)
+        self.assertEqual(volumeController.Metrics.Counter('baked_reads'), self.NumSections - 1)
+        self.assertGreater(volumeController.Metrics.Counter('tiles_touched'), 0)
+
+        self.assertEqual(self.Store.Bake(self.volumeController), [(2, 'TEM')])
+        self.assertTrue(self.Store.IsCurrent(2, 'TEM'))
+
+
+if __name__ == "__main__":
+    unittest.main()
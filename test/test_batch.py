@@ -0,0 +1,86 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import concurrent.futures
+import unittest
+
+import numpy
+
+import nornir_volumecontroller
+from nornir_imageregistration import iBox
+
+import test.benchmark
+import test.synthetic
+
+
+class GetDataBatchTest(test.synthetic.SyntheticVolumeTestCase):
+
+    Channels = ('GABA', 'TEM')
+
+    def Cutouts(self):
+        bounds = self.volumeController.Bounds
+        regions = test.benchmark.Cutouts(bounds, count=6, size=64, spacing=24)
+
+        # One cutout far from the others shares nothing
+        isolated = list(regions[0])
+        isolated[iBox.MinY] = float(int(bounds[iBox.MaxY]) - 64)
+        isolated[iBox.MinX] = float(int(bounds[iBox.MaxX]) - 64)
+        isolated[iBox.MaxY] = isolated[iBox.MinY] + 64
+        isolated[iBox.MaxX] = isolated[iBox.MinX] + 64
+        return regions + [isolated]
+
+    def test_MatchesIndividualRequests(self):
+        regions = self.Cutouts()
+        resolution = self.volumeController.GetHighestResolution(None).X
+
+        stats = {}
+        batch = self.volumeController.GetDataBatch(regions, resolution, None, stats=stats)
+        self.assertEqual(len(batch), len(regions))
+
+        for (region, images) in zip(regions, batch):
+            expected = self.volumeController.GetData(region, resolution, None)
+            self.assertEqual(images.shape, expected.shape)
+            self.assertTrue(numpy.allclose(expected, images, atol=1e-3), "Batched cutout does not match an individual request")
+
+        self.assertEqual(stats['regions'], len(regions))
+        self.assertGreater(stats['assemblies_saved'], 0, "Overlapping cutouts should be assembled together")
+        self.assertLess(stats['tiles_read'], stats['tiles_requested'])
+
+    def test_UnalignedRegion(self):
+        '''A region between pixels is sampled the same alone, in an overlapping batch and by GetData'''
+        region = test.synthetic.UnalignedRegion(self.volumeController.Bounds)
+        overlapping = list(region)
+        shift = (region[iBox.MaxX] - region[iBox.MinX]) / 4.0 + 0.17
+        overlapping[iBox.MinX] += shift
+        overlapping[iBox.MaxX] += shift
+
+        highest = self.volumeController.GetHighestResolution(region).X
+        for downsample in (1.0, 2.7):
+            resolution = highest * downsample
+            expected = self.volumeController.GetData(region, resolution, None)
+
+            (alone,) = self.volumeController.GetDataBatch([region], resolution, None)
+            self.assertTrue(numpy.array_equal(expected, alone), "Region alone differs at downsample %g" % downsample)
+
+            stats = {}
+            (batched, _) = self.volumeController.GetDataBatch([region, overlapping], resolution, None, stats=stats)
+            self.assertGreater(stats['assemblies_saved'], 0, "Overlapping regions should be assembled together")
+            self.assertTrue(numpy.array_equal(expected, batched), "Region in a batch differs at downsample %g" % downsample)
+
+    def test_ThreadPool(self):
+        regions = self.Cutouts()
+        resolution = self.volumeController.GetHighestResolution(None).X * 2.0
+        expected = self.volumeController.GetDataBatch(regions, resolution, None)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            volumeController = nornir_volumecontroller.Volume(self.volumeModel, executor=executor)
+            batch = volumeController.GetDataBatch(regions, resolution, None)
+
+        for (a, b) in zip(expected, batch):
+            self.assertTrue(numpy.array_equal(a, b))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,247 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy
+
+from nornir_volumecontroller.cache import TransformCache, ChunkCache, RequestCoalescer, EmptyChunk, EmptyChunkBytes
+
+
+class TransformCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        super(TransformCacheTest, self).setUp()
+        self.TempDir = tempfile.mkdtemp()
+        self.LoadCount = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.TempDir)
+        super(TransformCacheTest, self).tearDown()
+
+    def Loader(self, path):
+        self.LoadCount += 1
+        with open(path, 'r') as hFile:
+            return hFile.read()
+
+    def WriteFile(self, name, content):
+        path = os.path.join(self.TempDir, name)
+        with open(path, 'w') as hFile:
+            hFile.write(content)
+
+        return path
+
+    def test_HitsAndMisses(self):
+        cache = TransformCache(loader=self.Loader)
+        path = self.WriteFile('A.mosaic', 'A')
+
+        self.assertEqual(cache.Get(path), 'A')
+        self.assertEqual(cache.Get(path), 'A')
+        self.assertEqual(self.LoadCount, 1, "Second lookup should not reload the file")
+        self.assertEqual(cache.Hits, 1)
+        self.assertEqual(cache.Misses, 1)
+
+    def test_ReloadOnChange(self):
+        cache = TransformCache(loader=self.Loader)
+        path = self.WriteFile('A.mosaic', 'A')
+        cache.Get(path)
+
+        self.WriteFile('A.mosaic', 'AB')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+        self.assertEqual(cache.Get(path), 'AB', "Modified transform should be reloaded")
+        self.assertEqual(cache.ResidentBytes, 2)
+
+    def test_Eviction(self):
+        cache = TransformCache(max_bytes=8, loader=self.Loader)
+        A = self.WriteFile('A.mosaic', 'AAAA')
+        B = self.WriteFile('B.mosaic', 'BBBB')
+        C = self.WriteFile('C.mosaic', 'CCCC')
+
+        cache.Get(A)
+        cache.Get(B)
+        cache.Get(A)
+        cache.Get(C)
+
+        self.assertIn(A, cache)
+        self.assertNotIn(B, cache, "Least recently used transform should be evicted")
+        self.assertIn(C, cache)
+        self.assertEqual(cache.Evictions, 1)
+        self.assertLessEqual(cache.ResidentBytes, 8)
+
+    def test_Invalidate(self):
+        cache = TransformCache(loader=self.Loader)
+        A = self.WriteFile('A.mosaic', 'A')
+        B = self.WriteFile('B.mosaic', 'B')
+        cache.Get(A)
+        cache.Get(B)
+
+        cache.Invalidate(A)
+        self.assertNotIn(A, cache)
+        self.assertIn(B, cache)
+
+        cache.Invalidate()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.ResidentBytes, 0)
+
+    def test_IdenticalContentsShared(self):
+        cache = TransformCache(loader=self.Loader)
+        A = self.WriteFile('A.mosaic', 'Same')
+        B = self.WriteFile('B.mosaic', 'Same')
+        C = self.WriteFile('C.mosaic', 'Other')
+
+        self.assertIs(cache.Get(A), cache.Get(B), "Files with identical contents should share the parsed transform")
+        self.assertIsNot(cache.Get(A), cache.Get(C))
+        self.assertEqual(self.LoadCount, 2)
+        self.assertEqual(cache.Shared, 1)
+
+        # The shared transform survives removal of the file that was parsed
+        cache.Invalidate(A)
+        D = self.WriteFile('D.mosaic', 'Same')
+        self.assertIs(cache.Get(D), cache.Get(B))
+        self.assertEqual(self.LoadCount, 2)
+
+
+class ChunkCacheTest(unittest.TestCase):
+
+    def test_EvictionByBytes(self):
+        chunk = numpy.zeros((16, 16), dtype=numpy.uint8)
+        cache = ChunkCache(max_bytes=chunk.nbytes * 2, chunk_shape=(16, 16))
+
+        cache.Put((1, 'TEM', 1, 0, 0), chunk.copy())
+        cache.Put((1, 'TEM', 1, 0, 1), chunk.copy())
+        self.assertIsNotNone(cache.Get((1, 'TEM', 1, 0, 0)))
+        cache.Put((1, 'TEM', 1, 1, 0), chunk.copy())
+
+        self.assertNotIn((1, 'TEM', 1, 0, 1), cache, "Least recently used chunk should be evicted")
+        self.assertEqual(cache.ResidentBytes, chunk.nbytes * 2)
+        self.assertEqual(cache.Evictions, 1)
+        self.assertIsNone(cache.Get((1, 'TEM', 1, 0, 1)))
+        self.assertEqual(cache.Stats()['hits'], 1)
+        self.assertEqual(cache.Stats()['misses'], 1)
+
+    def test_ChunksAreReadOnly(self):
+        cache = ChunkCache(chunk_shape=(4, 4))
+        cache.Put((1, 'TEM', 1, 0, 0), numpy.zeros((4, 4)))
+        chunk = cache.Get((1, 'TEM', 1, 0, 0))
+        self.assertRaises(ValueError, chunk.fill, 1)
+
+    def test_InvalidateSection(self):
+        cache = ChunkCache(chunk_shape=(4, 4))
+        cache.Put((1, 'TEM', 1, 0, 0), numpy.zeros((4, 4)))
+        cache.Put((2, 'TEM', 1, 0, 0), numpy.zeros((4, 4)))
+        cache.Put((2, 'GABA', 1, 0, 0), numpy.zeros((4, 4)))
+
+        cache.Invalidate(sectionNumber=2, channel_name='TEM')
+        self.assertEqual(len(cache), 2)
+
+        cache.Invalidate(sectionNumber=2)
+        self.assertEqual(len(cache), 1)
+        self.assertIn((1, 'TEM', 1, 0, 0), cache)
+
+    def test_EmptyChunksCostLittle(self):
+        chunk = numpy.ones((16, 16), dtype=numpy.uint8)
+        cache = ChunkCache(max_bytes=chunk.nbytes + 2 * EmptyChunkBytes, chunk_shape=(16, 16))
+
+        cache.Put((1, 'TEM', 1, 0, 0), chunk)
+        cache.PutEmpty((1, 'TEM', 1, 0, 1))
+        cache.PutEmpty((1, 'TEM', 1, 0, 2))
+
+        self.assertIs(cache.Get((1, 'TEM', 1, 0, 1)), EmptyChunk)
+        self.assertEqual(cache.Evictions, 0)
+        self.assertEqual(cache.ResidentBytes, chunk.nbytes + 2 * EmptyChunkBytes)
+        self.assertEqual(cache.Stats()['empty_entries'], 2)
+
+        # Replacing an empty chunk with data, and invalidating, keep the count of empty entries consistent
+        cache.Put((1, 'TEM', 1, 0, 2), chunk.copy())
+        self.assertEqual(cache.EmptyEntries, 1)
+        cache.Invalidate(sectionNumber=1)
+        self.assertEqual(cache.EmptyEntries, 0)
+        self.assertEqual(cache.ResidentBytes, 0)
+
+    def test_EmptyChunksEvicted(self):
+        cache = ChunkCache(max_bytes=10 * EmptyChunkBytes, chunk_shape=(16, 16))
+        for iCol in range(0, 100):
+            cache.PutEmpty((1, 'TEM', 1, 0, iCol))
+
+        self.assertEqual(cache.EmptyEntries, 10, "Empty chunks should be bounded by the budget")
+        self.assertEqual(cache.Evictions, 90)
+        self.assertEqual(cache.ResidentBytes, 10 * EmptyChunkBytes)
+        self.assertIs(cache.Get((1, 'TEM', 1, 0, 99)), EmptyChunk)
+        self.assertIsNone(cache.Get((1, 'TEM', 1, 0, 0)))
+
+
+class RequestCoalescerTest(unittest.TestCase):
+
+    NumThreads = 8
+
+    def RunConcurrently(self, coalescer, key, func):
+        '''Call Do from many threads at once, returning the (result, coalesced) or exception of each'''
+        barrier = threading.Barrier(self.NumThreads)
+        results = [None] * self.NumThreads
+
+        def Worker(i):
+            barrier.wait()
+            try:
+                results[i] = coalescer.Do(key, func)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=Worker, args=(i,)) for i in range(0, self.NumThreads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_ConcurrentCallsShareWork(self):
+        coalescer = RequestCoalescer()
+        calls = []
+
+        def Work():
+            calls.append(1)
+            time.sleep(0.1)
+            return numpy.arange(4)
+
+        results = self.RunConcurrently(coalescer, (1, 'TEM', 1.0, 0, 0), Work)
+
+        self.assertEqual(len(calls), 1, "Work should run once for concurrent callers")
+        self.assertTrue(all([result is results[0][0] for (result, coalesced) in results]), "Every caller should receive the same result")
+        self.assertEqual(len([coalesced for (result, coalesced) in results if coalesced]), self.NumThreads - 1)
+        self.assertEqual(coalescer.Stats(), {'executed': 1, 'coalesced': self.NumThreads - 1, 'failed': 0, 'inflight': 0})
+
+    def test_ErrorsReachEveryWaiter(self):
+        coalescer = RequestCoalescer()
+
+        def Work():
+            time.sleep(0.1)
+            raise IOError("Missing tile")
+
+        results = self.RunConcurrently(coalescer, 'key', Work)
+
+        self.assertTrue(all([isinstance(result, IOError) for result in results]), "Every caller should see the exception")
+        self.assertEqual(coalescer.Failed, 1)
+        self.assertEqual(len(coalescer), 0, "Failed work should not remain in flight")
+
+        # The key can be retried once the failed work has completed
+        self.assertEqual(coalescer.Do('key', lambda: 5), (5, False))
+
+    def test_SequentialCallsRunAgain(self):
+        coalescer = RequestCoalescer()
+        coalescer.Do('key', lambda: 1)
+        coalescer.Do('key', lambda: 1)
+        self.assertEqual(coalescer.Executed, 2, "Results are not retained after the work completes")
+        self.assertEqual(coalescer.Coalesced, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy
+
+import nornir_volumecontroller
+import nornir_volumecontroller.spatial
+from nornir_volumecontroller.cache import ChunkCache
+
+import test.synthetic
+
+
+class SlowBuilds(object):
+    '''Counts calls to the expensive builders of a volume and makes them slow enough to overlap'''
+
+    def __init__(self, delay=0.05):
+        self.Delay = delay
+        self.TransformMapBuilds = 0
+        self.BoundingBoxBuilds = 0
+        self._lock = threading.Lock()
+
+    def BuildVolumeTransformMap(self, volume):
+        with self._lock:
+            self.TransformMapBuilds += 1
+
+        time.sleep(self.Delay)
+        return dict([(sectionNumber, {}) for sectionNumber in range(1, 11)])
+
+    def Calculate2DBoundingBox(self):
+        with self._lock:
+            self.BoundingBoxBuilds += 1
+
+        time.sleep(self.Delay)
+        return (0.0, 0.0, 100.0, 200.0)
+
+
+def RunConcurrently(func, num_threads):
+    '''Call func from many threads released at the same moment, returning the results'''
+    barrier = threading.Barrier(num_threads)
+    results = [None] * num_threads
+
+    def Worker(i):
+        barrier.wait()
+        results[i] = func()
+
+    threads = [threading.Thread(target=Worker, args=(i,)) for i in range(0, num_threads)]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+class LazyInitializationStressTest(unittest.TestCase):
+
+    NumThreads = 16
+
+    def test_BuildsOnce(self):
+        builds = SlowBuilds()
+        # Mocks are not descriptors, so the patched method is called without the controller
+        with mock.patch.object(nornir_volumecontroller.spatial, 'BuildVolumeTransformMap', side_effect=builds.BuildVolumeTransformMap), \
+             mock.patch.object(nornir_volumecontroller.Volume, 'Calculate2DBoundingBox', side_effect=builds.Calculate2DBoundingBox):
+            volumeController = nornir_volumecontroller.Volume(object())
+            bounds = RunConcurrently(lambda: volumeController.Bounds, self.NumThreads)
+            maps = RunConcurrently(lambda: volumeController.transform_path_map, self.NumThreads)
+
+        self.assertEqual(builds.TransformMapBuilds, 1, "The transform map should be built once")
+        self.assertEqual(builds.BoundingBoxBuilds, 1, "Bounds should be calculated once")
+        self.assertTrue(all([b is bounds[0] for b in bounds]), "Every thread should see the same bounds")
+        self.assertTrue(all([m is maps[0] for m in maps]))
+        self.assertEqual(bounds[0], [1, 0.0, 0.0, 10, 100.0, 200.0])
+
+
+class VolumeStressTest(test.synthetic.SyntheticVolumeTestCase):
+
+    NumSections = 4
+    NumThreads = 16
+
+    def test_ColdControllerLoadsTransformsOnce(self):
+        volumeController = nornir_volumecontroller.Volume(self.volumeModel)
+        with mock.patch.object(nornir_volumecontroller.spatial, 'BuildVolumeTransformMap',
+                               wraps=nornir_volumecontroller.spatial.BuildVolumeTransformMap) as build:
+            bounds = RunConcurrently(lambda: volumeController.Bounds, self.NumThreads)
+
+        self.assertEqual(build.call_count, 1)
+        self.assertTrue(all([b == bounds[0] for b in bounds]))
+        self.assertEqual(volumeController.TransformCache.Misses, self.NumSections, "Each mosaic should be loaded once")
+
+
+class CoalescedGetDataTest(test.synthetic.SyntheticVolumeTestCase):
+
+    NumThreads = 8
+
+    def setUp(self):
+        super(CoalescedGetDataTest, self).setUp()
+        self.Region = self.volumeController.Bounds
+        self.Resolution = self.volumeController.GetHighestResolution(self.Region).X
+
+    def TilesTouchedBySingleRequest(self, create_chunk_cache=None):
+        volumeController = nornir_volumecontroller.Volume(self.volumeModel, chunk_cache=create_chunk_cache() if create_chunk_cache else None)
+        expected = volumeController.GetData(self.Region, self.Resolution, None)
+        return (expected, volumeController.Metrics.Counter('tiles_touched'))
+
+    def CheckCoalesced(self, create_chunk_cache=None):
+        (expected, tiles_touched) = self.TilesTouchedBySingleRequest(create_chunk_cache)
+
+        volumeController = nornir_volumecontroller.Volume(self.volumeModel, chunk_cache=create_chunk_cache() if create_chunk_cache else None)
+        # Slow the assembly so every request is in flight at the same time
+        AssembleRegion = nornir_volumecontroller.assemble.AssembleRegion
+        with mock.patch.object(nornir_volumecontroller.assemble, 'AssembleRegion',
+                               side_effect=lambda *args, **kwargs: time.sleep(0.05) or AssembleRegion(*args, **kwargs)):
+            results = RunConcurrently(lambda: volumeController.GetData(self.Region, self.Resolution, None), self.NumThreads)
+
+        for images in results:
+            self.assertTrue(numpy.array_equal(images, expected), "Coalesced requests should return the same data")
+
+        self.assertEqual(volumeController.Metrics.Counter('tiles_touched'), tiles_touched, "Identical requests should assemble the tiles once")
+        self.assertGreater(volumeController.Metrics.Counter('coalesced_requests'), 0)
+        self.assertEqual(volumeController.MetricsSnapshot()['coalescing']['inflight'], 0)
+
+    def test_IdenticalRegions(self):
+        self.CheckCoalesced()
+
+    def test_SharedChunks(self):
+        self.CheckCoalesced(lambda: ChunkCache(chunk_shape=(64, 64)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import unittest
+
+from nornir_volumecontroller.metrics import VolumeMetrics
+
+import test.synthetic
+
+
+class VolumeMetricsTest(unittest.TestCase):
+
+    def test_Stage(self):
+        metrics = VolumeMetrics()
+        calls = []
+        metrics.AddHook(lambda name, seconds, attributes: calls.append((name, attributes)))
+
+        with metrics.Stage('AssembleTiles', tiles=3):
+            pass
+        with metrics.Stage('AssembleTiles', tiles=1):
+            pass
+
+        snapshot = metrics.Snapshot()
+        self.assertEqual(snapshot['stages']['AssembleTiles']['count'], 2)
+        self.assertGreaterEqual(snapshot['stages']['AssembleTiles']['max_seconds'], 0)
+        self.assertEqual(calls, [('AssembleTiles', {'tiles': 3}), ('AssembleTiles', {'tiles': 1})])
+
+    def test_StageRecordedOnException(self):
+        metrics = VolumeMetrics()
+        try:
+            with metrics.Stage('LoadTransform'):
+                raise IOError()
+        except IOError:
+            pass
+
+        self.assertEqual(metrics.Snapshot()['stages']['LoadTransform']['count'], 1)
+
+    def test_Counters(self):
+        metrics = VolumeMetrics()
+        metrics.Increment('tiles_touched', 4)
+        metrics.Increment('tiles_touched')
+        self.assertEqual(metrics.Counter('tiles_touched'), 5)
+
+        metrics.Reset()
+        self.assertEqual(metrics.Snapshot(), {'stages': {}, 'counters': {}})
+
+
+class VolumeInstrumentationTest(test.synthetic.SyntheticVolumeTestCase):
+
+    def test_GetDataMetrics(self):
+        bounds = self.volumeController.Bounds
+        resolution = self.volumeController.GetHighestResolution(bounds).X * 2.0
+        self.volumeController.GetData(bounds, resolution, None)
+
+        snapshot = self.volumeController.MetricsSnapshot()
+        for stage in ['GetData', 'LoadTransform', 'AssembleTiles', 'Resample']:
+            self.assertIn(stage, snapshot['stages'])
+
+        self.assertEqual(snapshot['counters']['requests'], 1)
+        self.assertEqual(snapshot['counters']['sections'], self.NumSections)
+        self.assertGreater(snapshot['counters']['tiles_touched'], 0)
+        self.assertGreater(snapshot['counters']['tile_bytes_read'], 0)
+        self.assertIn('hit_rate', snapshot['caches']['transform'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import concurrent.futures
+import logging
+import os
+import time
+import unittest
+
+import nornir_volumecontroller
+import test.synthetic
+
+
+@unittest.skipUnless('NORNIR_BENCHMARK' in os.environ, "Set the NORNIR_BENCHMARK environment variable to run benchmarks")
+class ParallelAssemblyBenchmark(test.synthetic.SyntheticVolumeTestCase):
+    '''Logs GetData latency for a range of worker counts'''
+
+    WorkerCounts = [1, 2, 4, 8]
+
+    NumSections = 16
+    GridShape = (4, 4)
+    TileShape = (256, 256)
+
+    def setUp(self):
+        super(ParallelAssemblyBenchmark, self).setUp()
+        self.Logger = logging.getLogger(self.__class__.__name__)
+
+    def TimeGetData(self, volumeController, bounds, resolution):
+        start = time.perf_counter()
+        volumeController.GetData(bounds, resolution, volumeController.Channels)
+        return time.perf_counter() - start
+
+    def test_WorkerScaling(self):
+        bounds = self.volumeController.Bounds
+        resolution = self.volumeController.GetHighestResolution(bounds).X
+
+        # Warm the transform cache so only assembly is measured
+        serial_time = self.TimeGetData(self.volumeController, bounds, resolution)
+        serial_time = self.TimeGetData(self.volumeController, bounds, resolution)
+        self.Logger.info("Serial: %gs" % serial_time)
+
+        for num_workers in self.WorkerCounts:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+                volumeController = nornir_volumecontroller.Volume(self.volumeModel,
+                                                                  transform_cache=self.volumeController.TransformCache,
+                                                                  executor=executor)
+                elapsed = self.TimeGetData(volumeController, bounds, resolution)
+
+            message = "%d workers: %gs, %.2fx speedup" % (num_workers, elapsed, serial_time / elapsed)
+            self.Logger.info(message)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import concurrent.futures
+import threading
+import unittest
+
+import numpy
+
+import nornir_volumecontroller
+from nornir_volumecontroller.metrics import VolumeMetrics
+from nornir_volumecontroller.prefetch import ZPrefetcher, PrefetchKey
+
+import test.synthetic
+
+
+class RecordingVolume(object):
+    '''Minimal volume that records which sections the prefetcher assembles'''
+
+    def __init__(self, sectionNumbers):
+        self.transform_path_map = dict([(number, {'TEM': 'TEM'}) for number in sectionNumbers])
+        self.Metrics = VolumeMetrics()
+        self.Assembled = []
+
+    def _AssembleChannel(self, sectionNumber, channel, rect, resolution, output_shape):
+        self.Assembled.append(sectionNumber)
+        return numpy.full(output_shape, sectionNumber, dtype=numpy.float32)
+
+
+class ZPrefetcherTest(unittest.TestCase):
+
+    Rect = (0, 0, 10, 10)
+    Shape = (10, 10)
+
+    def setUp(self):
+        super(ZPrefetcherTest, self).setUp()
+        self.Executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.Volume = RecordingVolume(range(1, 20))
+        self.Prefetcher = ZPrefetcher(depth=2, executor=self.Executor)
+        self.Prefetcher.Attach(self.Volume)
+
+    def tearDown(self):
+        self.Executor.shutdown(wait=True)
+        super(ZPrefetcherTest, self).tearDown()
+
+    def Observe(self, sectionNumber, rect=None):
+        self.Prefetcher.Observe(rect if rect is not None else self.Rect, 4.0, ['TEM'], self.Shape, sectionNumber, sectionNumber)
+
+    def Key(self, sectionNumber):
+        return PrefetchKey(sectionNumber, 'TEM', self.Rect, 4.0, self.Shape)
+
+    def test_ForwardScroll(self):
+        self.Observe(5)
+        self.assertEqual(self.Prefetcher.Stats()['issued'], 0, "A single request is not a pattern")
+
+        self.Observe(6)
+        self.assertEqual(self.Prefetcher.Stats()['issued'], 2)
+
+        future = self.Prefetcher.Take(self.Key(7))
+        self.assertIsNotNone(future)
+        self.assertEqual(future.result()[0, 0], 7)
+        self.assertEqual(self.Prefetcher.Stats()['hits'], 1)
+        self.assertIsNone(self.Prefetcher.Take(self.Key(7)), "A prefetched image is only taken once")
+
+    def test_BackwardScroll(self):
+        self.Observe(10)
+        self.Observe(9)
+        self.Executor.submit(lambda: None).result()
+        self.assertEqual(sorted(self.Volume.Assembled), [7, 8])
+
+    def test_PatternBreakDiscards(self):
+        self.Observe(5)
+        self.Observe(6)
+        self.Executor.submit(lambda: None).result()
+
+        self.Observe(6, rect=(5, 5, 15, 15))
+        stats = self.Prefetcher.Stats()
+        self.assertEqual(stats['entries'], 0)
+        self.assertEqual(stats['wasted'] + stats['cancelled'], 2)
+        self.assertEqual(stats['resident_bytes'], 0)
+
+    def test_MemoryBudget(self):
+        self.Prefetcher = ZPrefetcher(depth=4, max_bytes=numpy.zeros(self.Shape, dtype=numpy.float32).nbytes * 2, executor=self.Executor)
+        self.Prefetcher.Attach(self.Volume)
+        self.Observe(1)
+        self.Observe(2)
+        self.Executor.submit(lambda: None).result()
+
+        stats = self.Prefetcher.Stats()
+        self.assertLessEqual(stats['resident_bytes'], self.Prefetcher._max_bytes)
+        self.assertEqual(stats['wasted'], 2)
+
+    def test_BudgetKeepsNextSection(self):
+        '''A budget smaller than one image per read-ahead section discards the farthest sections, not the next one'''
+        self.Prefetcher = ZPrefetcher(depth=3, max_bytes=numpy.zeros(self.Shape, dtype=numpy.float32).nbytes // 2, executor=self.Executor)
+        self.Prefetcher.Attach(self.Volume)
+
+        # Hold the worker so every read-ahead section is issued before the first completes
+        release = threading.Event()
+        self.Executor.submit(release.wait)
+        self.Observe(1)
+        self.Observe(2)
+        release.set()
+        self.Executor.submit(lambda: None).result()
+        self.assertEqual(self.Prefetcher.Stats()['issued'], 3)
+        self.assertEqual(self.Prefetcher.Stats()['wasted'], 2)
+
+        # Nothing more is scheduled while the held image exceeds the budget
+        self.Observe(3)
+        self.assertEqual(self.Prefetcher.Stats()['issued'], 3)
+
+        future = self.Prefetcher.Take(self.Key(3))
+        self.assertIsNotNone(future, "The next section should still be a prefetch hit")
+        self.assertEqual(future.result()[0, 0], 3)
+
+
+class VolumePrefetchTest(test.synthetic.SyntheticVolumeTestCase):
+
+    NumSections = 5
+
+    def test_SequentialBrowsing(self):
+        prefetcher = ZPrefetcher(depth=1)
+        volumeController = nornir_volumecontroller.Volume(self.volumeModel, prefetcher=prefetcher)
+        bounds = volumeController.Bounds
+        resolution = volumeController.GetHighestResolution(bounds).X * 2.0
+
+        for sectionNumber in range(bounds[0], bounds[3] + 1):
+            region = list(bounds)
+            region[0] = sectionNumber
+            region[3] = sectionNumber
+            expected = self.volumeController.GetData(region, resolution, None)
+            self.assertTrue(numpy.array_equal(expected, volumeController.GetData(region, resolution, None)),
+                            "Prefetched section %d does not match" % sectionNumber)
+
+        prefetcher.Close()
+        self.assertGreater(volumeController.MetricsSnapshot()['prefetch']['hits'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
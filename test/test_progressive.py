@@ -0,0 +1,77 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import unittest
+from unittest import mock
+
+import numpy
+
+import nornir_volumecontroller
+import nornir_volumecontroller.spatial
+
+import test.synthetic
+
+
+class ProgressiveGetDataTest(test.synthetic.SyntheticVolumeTestCase):
+
+    Levels = (1, 2, 4)
+
+    def setUp(self):
+        super(ProgressiveGetDataTest, self).setUp()
+        self.Region = self.volumeController.Bounds
+        self.Resolution = self.volumeController.GetHighestResolution(self.Region).X
+
+    def test_CoarseToFine(self):
+        results = list(self.volumeController.GetDataProgressive(self.Region, self.Resolution, None))
+
+        self.assertEqual([level for (level, data, complete) in results], [4.0, 2.0, 1.0])
+        self.assertEqual([complete for (level, data, complete) in results], [False, False, True])
+
+        expected_shape = self.volumeController.GetOutputShape(self.Region, self.Resolution, None)
+        for (level, data, complete) in results:
+            self.assertEqual(data.shape, expected_shape, "Every refinement should have the requested shape")
+
+        expected = self.volumeController.GetData(self.Region, self.Resolution, None)
+        self.assertTrue(numpy.allclose(results[-1][1], expected, atol=1e-5), "The final pass should match GetData")
+
+    def test_UnalignedRegionMatchesAlignedCrop(self):
+        '''Every pass samples a region between pixels at the positions of the aligned superset's output pixels'''
+        resolution = self.Resolution * 1.35
+        (superset, region, (row, column)) = test.synthetic.AlignedSuperset(self.volumeController.Bounds, 1.35)
+        expected = self.volumeController.GetData(superset, resolution, None)
+
+        results = list(self.volumeController.GetDataProgressive(region, resolution, None))
+        (rows, columns) = results[-1][1].shape[2:]
+        self.assertTrue(numpy.allclose(results[-1][1], expected[:, :, row:row + rows, column:column + columns], atol=1e-3))
+
+        coarse = list(self.volumeController.GetDataProgressive(superset, resolution, None))
+        for ((level, data, complete), (superset_level, superset_data, superset_complete)) in zip(results, coarse):
+            self.assertEqual(level, superset_level)
+            self.assertTrue(numpy.allclose(data, superset_data[:, :, row:row + rows, column:column + columns], atol=1e-3),
+                            "Pass at level %g is not a crop of the superset's" % level)
+
+    def test_StopsAtRequestedResolution(self):
+        results = list(self.volumeController.GetDataProgressive(self.Region, self.Resolution * 2.0, None))
+        self.assertEqual([level for (level, data, complete) in results], [4.0, 2.0])
+        self.assertTrue(results[-1][2])
+
+    def test_TimeBudget(self):
+        results = list(self.volumeController.GetDataProgressive(self.Region, self.Resolution, None, time_budget=0))
+        self.assertEqual(len(results), 1, "Only the coarsest pass runs once the budget is spent")
+        (level, data, complete) = results[0]
+        self.assertEqual(level, 4.0)
+        self.assertFalse(complete)
+        self.assertEqual(self.volumeController.Metrics.Counter('progressive_refinements_skipped'), 2)
+
+    def test_TilePlacementReused(self):
+        with mock.patch.object(nornir_volumecontroller.spatial, 'MosaicForRegion',
+                               wraps=nornir_volumecontroller.spatial.MosaicForRegion) as place:
+            list(self.volumeController.GetDataProgressive(self.Region, self.Resolution, None))
+
+        self.assertEqual(place.call_count, self.NumSections * len(self.Channels), "Tiles should be placed once per section/channel")
+
+
+if __name__ == "__main__":
+    unittest.main()
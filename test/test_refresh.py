@@ -0,0 +1,148 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+import nornir_volumecontroller
+from nornir_volumecontroller.cache import ChunkCache
+from nornir_volumecontroller.watch import VolumeWatcher
+
+import test.synthetic
+
+
+class RefreshTest(unittest.TestCase):
+    '''Each test modifies the volume on disk, so every test writes its own copy'''
+
+    NumSections = 4
+
+    def setUp(self):
+        super(RefreshTest, self).setUp()
+        self.TempDir = tempfile.mkdtemp()
+        self.VolumeXML = test.synthetic.CreateSyntheticVolume(os.path.join(self.TempDir, 'Volume'),
+                                                              num_sections=self.NumSections,
+                                                              grid_shape=(2, 2),
+                                                              tile_shape=(128, 128))
+        with open(self.VolumeXML, 'rb') as hFile:
+            self.FullXML = hFile.read()
+
+        # The controller starts without the last section, tests add it back to simulate the pipeline
+        self.WriteXMLWithoutSections([self.NumSections])
+
+    def tearDown(self):
+        shutil.rmtree(self.TempDir)
+        super(RefreshTest, self).tearDown()
+
+    def WriteXMLWithoutSections(self, section_numbers):
+        tree = ElementTree.ElementTree(ElementTree.fromstring(self.FullXML))
+        for block in tree.getroot().findall('Block'):
+            for section in block.findall('Section'):
+                if int(section.get('Number')) in section_numbers:
+                    block.remove(section)
+
+        tree.write(self.VolumeXML, xml_declaration=True, encoding='utf-8')
+
+    def RestoreXML(self):
+        with open(self.VolumeXML, 'wb') as hFile:
+            hFile.write(self.FullXML)
+
+    def TouchTransform(self, volumeController, sectionNumber):
+        transform_path = volumeController.transform_path_map[sectionNumber]['TEM'].Transform.FullPath
+        stat = os.stat(transform_path)
+        os.utime(transform_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    def CreateController(self, use_manifest=False):
+        return nornir_volumecontroller.CreateVolumeController(self.VolumeXML, use_manifest=use_manifest,
+                                                              chunk_cache=ChunkCache(chunk_shape=(64, 64)))
+
+    def test_NoChanges(self):
+        volumeController = self.CreateController()
+        bounds = volumeController.Bounds
+        self.assertEqual(volumeController.Refresh(), [])
+        self.assertIs(volumeController.Bounds, bounds)
+
+    def test_TransformChanged(self):
+        volumeController = self.CreateController()
+        bounds = volumeController.Bounds
+        volumeController.GetData(bounds, volumeController.GetHighestResolution(bounds).X, None)
+        sections_cached = set([key[0] for key in volumeController.ChunkCache._entries.keys()])
+        self.assertEqual(sections_cached, set(range(1, self.NumSections)))
+
+        self.TouchTransform(volumeController, 2)
+        self.assertEqual(volumeController.Refresh(), [2])
+
+        sections_cached = set([key[0] for key in volumeController.ChunkCache._entries.keys()])
+        self.assertEqual(sections_cached, set([1, 3]), "Only chunks of the changed section should be discarded")
+        self.assertEqual(volumeController.Bounds, bounds, "Touching a transform does not move the section")
+        self.assertEqual(volumeController.Refresh(), [], "The changed stamp is the new baseline")
+
+    def test_SectionBoundsRemembered(self):
+        volumeController = self.CreateController()
+        bounds = volumeController.Bounds
+        self.assertEqual(sorted(volumeController._section_bounds.keys()), list(range(1, self.NumSections)))
+
+        # Only the changed section's transform is loaded to update the bounds
+        volumeController.TransformCache.Invalidate()
+        misses = volumeController.TransformCache.Stats()['misses']
+        self.TouchTransform(volumeController, 2)
+        self.assertEqual(volumeController.Refresh(), [2])
+        self.assertEqual(volumeController.Bounds, bounds)
+        self.assertEqual(volumeController.TransformCache.Stats()['misses'] - misses, 1)
+
+    def test_SectionAdded(self):
+        for use_manifest in (False, True):
+            volumeController = self.CreateController(use_manifest=use_manifest)
+            self.assertEqual(volumeController.Bounds[3], self.NumSections - 1)
+            unchanged_entry = volumeController.transform_path_map[1]
+
+            self.RestoreXML()
+            self.assertEqual(volumeController.Refresh(), [self.NumSections])
+
+            expected = nornir_volumecontroller.CreateVolumeController(self.VolumeXML, use_manifest=False)
+            self.assertEqual(volumeController.Bounds, expected.Bounds, "Bounds should grow to include the new section")
+            self.assertEqual(sorted(volumeController.transform_path_map.keys()), list(range(1, self.NumSections + 1)))
+            if not use_manifest:
+                self.assertIs(volumeController.transform_path_map[1], unchanged_entry, "Unchanged sections should keep their entries")
+
+            self.WriteXMLWithoutSections([self.NumSections])
+
+    def test_SectionRemoved(self):
+        volumeController = self.CreateController()
+        volumeController.Bounds
+
+        self.WriteXMLWithoutSections([self.NumSections, self.NumSections - 1])
+        self.assertEqual(volumeController.Refresh(), [self.NumSections - 1])
+        self.assertEqual(volumeController.Bounds[3], self.NumSections - 2)
+        self.assertNotIn(self.NumSections - 1, volumeController.transform_path_map)
+
+    def test_Watcher(self):
+        volumeController = self.CreateController()
+        volumeController.Bounds
+
+        changes = []
+        changed = threading.Event()
+
+        def OnChange(section_numbers):
+            changes.append(section_numbers)
+            changed.set()
+
+        watcher = VolumeWatcher(volumeController, interval=0.05, on_change=OnChange)
+        watcher.Start()
+        try:
+            self.RestoreXML()
+            self.assertTrue(changed.wait(10.0), "Watcher should notice the new section")
+        finally:
+            watcher.Stop()
+
+        self.assertEqual(changes, [[self.NumSections]])
+        self.assertEqual(volumeController.Bounds[3], self.NumSections)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import unittest
+
+import numpy
+
+from nornir_volumecontroller.base_objects import VolumeInterface
+
+import test.synthetic
+
+
+class StackVolume(VolumeInterface):
+    '''Volume double serving a Z,Y,X array at one volume space pixel per output pixel'''
+
+    @property
+    def Bounds(self):
+        return [0, 0, 0, self.Data.shape[0] - 1, self.Data.shape[1], self.Data.shape[2]]
+
+    @property
+    def Channels(self):
+        return set(['TEM'])
+
+    def __init__(self, data):
+        self.Data = data
+        self.Regions = []
+
+    def _OutputDownsample(self, resolution, channel_names):
+        return 1.0
+
+    def GetData(self, region, resolution, channel_names, out=None, dtype=None):
+        self.Regions.append(list(region))
+        (minZ, minY, minX, maxZ, maxY, maxX) = [int(v) for v in region]
+        return self.Data[numpy.newaxis, minZ:maxZ + 1, minY:maxY, minX:maxX].copy()
+
+
+class ResliceTest(unittest.TestCase):
+
+    def setUp(self):
+        super(ResliceTest, self).setUp()
+        self.Data = numpy.arange(5 * 40 * 60, dtype=numpy.float32).reshape((5, 40, 60))
+        self.Volume = StackVolume(self.Data)
+
+    def test_XZ(self):
+        plane = self.Volume.GetReslice('XZ', 12, self.Volume.Bounds, 1.0, None)
+        self.assertEqual(plane.shape, (1, 5, 1, 60))
+        self.assertTrue(numpy.array_equal(plane[0, :, 0, :], self.Data[:, 12, :]))
+        self.assertEqual(self.Volume.Regions, [[0, 12.0, 0, 4, 13.0, 60]], "Only the strip at the plane should be requested")
+
+    def test_YZ(self):
+        plane = self.Volume.GetReslice('yz', 7, [1, 10, 0, 3, 30, 60], 1.0, None)
+        self.assertEqual(plane.shape, (1, 3, 1, 20))
+        self.assertTrue(plane.flags.c_contiguous)
+        self.assertTrue(numpy.array_equal(plane[0, :, 0, :], self.Data[1:4, 10:30, 7]))
+
+    def test_Slab(self):
+        slab = self.Volume.GetReslice('YZ', 7, self.Volume.Bounds, 1.0, None, thickness=3)
+        self.assertEqual(slab.shape, (1, 5, 3, 40))
+        self.assertTrue(numpy.array_equal(slab[0], self.Data[:, :, 7:10].transpose(0, 2, 1)))
+
+    def test_InvalidArguments(self):
+        self.assertRaises(ValueError, self.Volume.GetReslice, 'XY', 0, self.Volume.Bounds, 1.0, None)
+        self.assertRaises(ValueError, self.Volume.GetReslice, 'XZ', 0, self.Volume.Bounds, 1.0, None, thickness=0)
+
+
+class VolumeResliceTest(test.synthetic.SyntheticVolumeTestCase):
+
+    def test_MatchesFullSections(self):
+        bounds = self.volumeController.Bounds
+        resolution = self.volumeController.GetHighestResolution(bounds).X
+        row = 100
+
+        full = self.volumeController.GetData(bounds, resolution, None)
+        full_tiles = self.volumeController.Metrics.Counter('tiles_touched')
+        self.volumeController.Metrics.Reset()
+
+        plane = self.volumeController.GetReslice('XZ', bounds[1] + row, bounds, resolution, None)
+        self.assertEqual(plane.shape, (1, self.NumSections, 1, full.shape[3]))
+        self.assertTrue(numpy.allclose(plane[:, :, 0, :], full[:, :, row, :], atol=1e-4), "Reslice should match the row of the full sections")
+        self.assertLess(self.volumeController.Metrics.Counter('tiles_touched'), full_tiles, "Only tiles crossing the plane should be read")
+
+
+if __name__ == "__main__":
+    unittest.main()
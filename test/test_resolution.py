@@ -0,0 +1,107 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import unittest
+
+import numpy
+
+from nornir_volumecontroller.base_objects import Scale
+from nornir_volumecontroller.resolution import ResolutionIndex
+
+import test.synthetic
+
+
+class AxisDouble(object):
+
+    def __init__(self, units_per_pixel, units_of_measure='nm'):
+        self.UnitsPerPixel = units_per_pixel
+        self.UnitsOfMeasure = units_of_measure
+
+
+class ScaleDouble(object):
+
+    def __init__(self, **axes):
+        self._axes = dict([(name, AxisDouble(value)) for (name, value) in axes.items()])
+
+    @property
+    def AxisNames(self):
+        return list(self._axes.keys())
+
+    def GetAxis(self, axis_name):
+        return self._axes.get(axis_name, None)
+
+
+class ChannelDouble(object):
+    '''Minimal channel exposing the members the index reads'''
+
+    def __init__(self, units_per_pixel, levels, section_thickness=90.0):
+        self.Scale = ScaleDouble(X=units_per_pixel, Y=units_per_pixel, Z=section_thickness)
+        self._levels = dict([(level, None) for level in levels])
+
+    @property
+    def FilterNames(self):
+        return ['Leveled']
+
+    def GetLevelPaths(self, filtername):
+        return self._levels
+
+
+class ResolutionIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        super(ResolutionIndexTest, self).setUp()
+        transform_path_map = {}
+        for sectionNumber in range(1, 11):
+            channelmap = {'TEM': ChannelDouble(2.18, (1, 2, 4, 8))}
+            if sectionNumber >= 6:
+                channelmap['GABA'] = ChannelDouble(1.09 * sectionNumber, (1, 2))
+
+            transform_path_map[sectionNumber] = channelmap
+
+        self.Index = ResolutionIndex.Build(transform_path_map)
+
+    def test_Layout(self):
+        self.assertEqual(list(self.Index.SectionNumbers), list(range(1, 11)))
+        self.assertEqual(self.Index.ChannelNames, ['GABA', 'TEM'])
+        self.assertEqual(list(self.Index.Levels), [1.0, 2.0, 4.0, 8.0])
+        self.assertEqual(self.Index.UnitsPerPixel.shape, (10, 2, 3))
+
+    def test_HighestResolution(self):
+        self.assertAlmostEqual(self.Index.HighestResolution().GetAxis('X').UnitsPerPixel, 2.18)
+        self.assertAlmostEqual(self.Index.HighestResolution(channel_names=['GABA']).GetAxis('X').UnitsPerPixel, 1.09 * 6)
+        self.assertAlmostEqual(self.Index.HighestResolution(8, 9, ['GABA']).GetAxis('X').UnitsPerPixel, 1.09 * 8)
+        self.assertIsNone(self.Index.HighestResolution(1, 5, ['GABA']).GetAxis('X'), "No section in the range has the channel")
+
+    def test_AvailableLevels(self):
+        self.assertEqual(list(self.Index.AvailableLevels(1, 5)), [1.0, 2.0, 4.0, 8.0])
+        self.assertEqual(list(self.Index.AvailableLevels(1, 10)), [1.0, 2.0])
+        self.assertEqual(list(self.Index.AvailableLevels(1, 10, ['TEM'])), [1.0, 2.0, 4.0, 8.0])
+        self.assertEqual(len(self.Index.AvailableLevels(20, 30)), 0)
+
+    def test_ChannelCoverage(self):
+        self.assertEqual(self.Index.ChannelCoverage(), {'GABA': 5, 'TEM': 10})
+        self.assertEqual(self.Index.ChannelCoverage(4, 7), {'GABA': 2, 'TEM': 4})
+        self.assertEqual(self.Index.ChannelCoverage(4, 7, ['GABA', 'Missing']), {'GABA': 2})
+
+
+class VolumeResolutionIndexTest(test.synthetic.SyntheticVolumeTestCase):
+
+    Channels = ('GABA', 'TEM')
+
+    def test_MatchesModelScales(self):
+        '''The index should agree with comparing the scale of every channel model'''
+        ScaleObj = None
+        for channelmap in self.volumeController.transform_path_map.values():
+            for channel in channelmap.values():
+                ScaleObj = channel.Scale if ScaleObj is None else Scale.MinAxisScales(ScaleObj, channel.Scale)
+
+        highest = self.volumeController.GetHighestResolution(self.volumeController.Bounds)
+        self.assertAlmostEqual(highest.X, Scale(ScaleObj).X)
+        self.assertAlmostEqual(highest.Z, Scale(ScaleObj).Z)
+        self.assertTrue(numpy.array_equal(self.volumeController.ResolutionIndex.AvailableLevels(), numpy.array(self.Levels, dtype=numpy.float64)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,359 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import email.utils
+import http.client
+import io
+import json
+import os
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+import numpy
+
+import nornir_volumecontroller
+import nornir_volumecontroller.server
+from nornir_volumecontroller.sparse import SparseVolumeData
+
+import test.loadtest
+import test.synthetic
+from test.test_concurrency import RunConcurrently
+
+
+class ArrayVolume(object):
+    '''Volume double serving a numpy array whose source is a single file'''
+
+    Name = 'Array'
+    Channels = set(['TEM'])
+
+    def __init__(self, data, source_path):
+        self.Data = data
+        self.Bounds = [0, 0, 0, data.shape[0] - 1, data.shape[1], data.shape[2]]
+        self.SourcePath = source_path
+        self.Requests = 0
+        self.Levels = [1.0, 2.0]
+
+    def UnitsPerPixel(self):
+        return 2.0
+
+    def SourceFiles(self, region, resolution, channel_names=None):
+        return [self.SourcePath]
+
+    def GetData(self, region, resolution, channel_names):
+        self.Requests += 1
+        (minZ, minY, minX, maxZ, maxY, maxX) = [int(v) for v in region]
+        level = int(resolution / self.UnitsPerPixel())
+        image = self.Data[minZ, minY:maxY:level, minX:maxX:level]
+        output = numpy.zeros((len(channel_names), 1, (maxY - minY) // level, (maxX - minX) // level), dtype=numpy.float32)
+        output[:, 0, :image.shape[0], :image.shape[1]] = image
+        return output
+
+
+class TransformArrayVolume(ArrayVolume):
+    '''Array volume whose sections are "assembled" with a transform, the source file, from a tile, and that counts source lookups'''
+
+    def __init__(self, data, source_path, tile_path):
+        super(TransformArrayVolume, self).__init__(data, source_path)
+        self.TilePath = tile_path
+        self.SourceFileRequests = 0
+
+        channel = types.SimpleNamespace(Name='TEM', Transform=types.SimpleNamespace(FullPath=source_path))
+        self.transform_path_map = dict([(sectionNumber, {'TEM': channel}) for sectionNumber in range(0, data.shape[0])])
+
+    def SourceFiles(self, region, resolution, channel_names=None):
+        self.SourceFileRequests += 1
+        return [self.SourcePath, self.TilePath]
+
+
+class CoverageArrayVolume(ArrayVolume):
+    '''Array volume reporting the pixels of the array as covered by tiles'''
+
+    def GetDataSparse(self, region, resolution, channel_names, chunk_shape):
+        data = self.GetData(region, resolution, channel_names)
+        (minZ, minY, minX, maxZ, maxY, maxX) = [int(v) for v in region]
+        level = int(resolution / self.UnitsPerPixel())
+
+        valid = numpy.zeros(data.shape[2:], dtype=bool)
+        valid[:max(self.Data.shape[1] - minY, 0) // level, :max(self.Data.shape[2] - minX, 0) // level] = True
+
+        sparse = SparseVolumeData(data.shape, chunk_shape=chunk_shape, channel_names=channel_names, minZ=minZ)
+        for key in numpy.ndindex(data.shape[0], data.shape[1], *sparse.GridShape):
+            (ySlice, xSlice) = sparse.ChunkSlices(key)
+            if numpy.any(valid[ySlice, xSlice]):
+                sparse.Set(key, data[key[0], key[1], ySlice, xSlice], valid[ySlice, xSlice])
+
+        return sparse
+
+
+class FailingVolume(ArrayVolume):
+    '''Array volume that cannot produce the data of the second section'''
+
+    def GetData(self, region, resolution, channel_names):
+        if int(region[0]) == 1:
+            raise RuntimeError("Tile is unreadable")
+
+        return super(FailingVolume, self).GetData(region, resolution, channel_names)
+
+
+class MisconfiguredVolume(ArrayVolume):
+    '''Array volume raising a ValueError that is not caused by the request'''
+
+    def GetData(self, region, resolution, channel_names):
+        raise ValueError("No pyramid levels available")
+
+
+class ChunkServerTest(unittest.TestCase):
+
+    def setUp(self):
+        super(ChunkServerTest, self).setUp()
+        (handle, self.SourcePath) = tempfile.mkstemp()
+        os.close(handle)
+
+        self.Volume = ArrayVolume(numpy.arange(2 * 100 * 120, dtype=numpy.float32).reshape((2, 100, 120)), self.SourcePath)
+        self.Server = nornir_volumecontroller.server.Serve(self.Volume, chunk_shape=(32, 32), max_workers=2)
+        self.Connection = http.client.HTTPConnection(*self.Server.server_address[0:2])
+
+    def tearDown(self):
+        self.Connection.close()
+        self.Server.shutdown()
+        self.Server.server_close()
+        os.remove(self.SourcePath)
+        super(ChunkServerTest, self).tearDown()
+
+    def Get(self, path, headers=None):
+        self.Connection.request('GET', path, headers=headers if headers is not None else {})
+        response = self.Connection.getresponse()
+        return (response, response.read())
+
+    def test_Metadata(self):
+        (response, body) = self.Get('/metadata')
+        self.assertEqual(response.status, 200)
+        metadata = json.loads(body)
+        self.assertEqual(metadata['channels'], ['TEM'])
+        self.assertEqual(metadata['bounds'], [0, 0, 0, 1, 100, 120])
+        self.assertEqual(metadata['units_per_pixel'], 2.0)
+        self.assertEqual(metadata['chunk_shape'], [32, 32])
+
+    def test_Chunk(self):
+        (response, body) = self.Get('/chunk/1/1/2/1')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Content-Type'), nornir_volumecontroller.server.NpyContentType)
+
+        chunk = numpy.load(io.BytesIO(body))
+        self.assertEqual(chunk.shape, (1, 32, 32))
+        self.assertTrue(numpy.array_equal(chunk[0], self.Volume.Data[1, 32:64, 64:96]))
+
+        # Downsampled level, on one keep-alive connection
+        (response, body) = self.Get('/chunk/0/2/0/0')
+        self.assertTrue(numpy.array_equal(numpy.load(io.BytesIO(body))[0], self.Volume.Data[0, 0:64:2, 0:64:2]))
+
+    def test_ConditionalGet(self):
+        (response, body) = self.Get('/chunk/0/1/0/0')
+        etag = response.getheader('ETag')
+        last_modified = response.getheader('Last-Modified')
+        self.assertIsNotNone(etag)
+        self.assertEqual(self.Volume.Requests, 1)
+
+        (response, body) = self.Get('/chunk/0/1/0/0', {'If-None-Match': etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(len(body), 0)
+
+        (response, body) = self.Get('/chunk/0/1/0/0', {'If-Modified-Since': last_modified})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(self.Volume.Requests, 1, "Revalidated chunks should not be produced again")
+
+        # Modifying a source file changes the validators
+        stat = os.stat(self.SourcePath)
+        os.utime(self.SourcePath, ns=(stat.st_atime_ns, time.time_ns() + 10 * 1000000000))
+        (response, body) = self.Get('/chunk/0/1/0/0', {'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader('ETag'), etag)
+
+        since = email.utils.formatdate(time.time() - 3600, usegmt=True)
+        (response, body) = self.Get('/chunk/0/1/0/0', {'If-Modified-Since': since})
+        self.assertEqual(response.status, 200)
+
+    def test_EmptyChunk(self):
+        # Chunk 5 of the first row lies past the 120 columns of the array
+        (response, body) = self.Get('/chunk/0/1/5/0')
+        self.assertEqual(response.status, 204)
+        self.assertEqual(len(body), 0)
+        etag = response.getheader('ETag')
+        self.assertIsNotNone(etag)
+
+        (response, body) = self.Get('/chunk/0/1/5/0', {'If-None-Match': etag})
+        self.assertEqual(response.status, 304)
+
+    def test_BlackChunkInsideCoverage(self):
+        '''A covered chunk is sent even when its pixels are zero, only chunks without tiles are empty'''
+        self.Server.shutdown()
+        self.Server.server_close()
+
+        data = self.Volume.Data.copy()
+        data[0, 0:32, 0:32] = 0
+        self.Volume = CoverageArrayVolume(data, self.SourcePath)
+        self.Server = nornir_volumecontroller.server.Serve(self.Volume, chunk_shape=(32, 32))
+        self.Connection.close()
+        self.Connection = http.client.HTTPConnection(*self.Server.server_address[0:2])
+
+        (response, body) = self.Get('/chunk/0/1/0/0')
+        self.assertEqual(response.status, 200)
+        chunk = numpy.load(io.BytesIO(body))
+        self.assertEqual(chunk.shape, (1, 32, 32))
+        self.assertFalse(numpy.any(chunk))
+
+        (response, body) = self.Get('/chunk/0/1/5/0')
+        self.assertEqual(response.status, 204)
+
+    def test_BadRequests(self):
+        (response, body) = self.Get('/chunk/0/0/0/0')
+        self.assertEqual(response.status, 400)
+        (response, body) = self.Get('/chunk/0/nan/0/0')
+        self.assertEqual(response.status, 400)
+        (response, body) = self.Get('/chunk/0/one/0/0')
+        self.assertEqual(response.status, 400)
+        (response, body) = self.Get('/unknown')
+        self.assertEqual(response.status, 404)
+
+    def test_UnknownSectionOrChannel(self):
+        (response, body) = self.Get('/chunk/7/1/0/0')
+        self.assertEqual(response.status, 404)
+        (response, body) = self.Get('/chunk/0/1/0/0?channels=TEM,GABA')
+        self.assertEqual(response.status, 404)
+        self.assertEqual(self.Volume.Requests, 0)
+
+    def test_InternalError(self):
+        self.Server.shutdown()
+        self.Server.server_close()
+
+        self.Volume = FailingVolume(self.Volume.Data, self.SourcePath)
+        self.Server = nornir_volumecontroller.server.Serve(self.Volume, chunk_shape=(32, 32))
+        self.Connection.close()
+        self.Connection = http.client.HTTPConnection(*self.Server.server_address[0:2])
+
+        with self.assertLogs('nornir_volumecontroller.server', level='ERROR'):
+            (response, body) = self.Get('/chunk/1/1/0/0')
+        self.assertEqual(response.status, 500)
+
+        # The server keeps serving other chunks
+        (response, body) = self.Get('/chunk/0/1/0/0')
+        self.assertEqual(response.status, 200)
+
+    def test_ValueErrorOfVolumeIsInternal(self):
+        '''Only errors parsing the request are the client's fault'''
+        self.Server.shutdown()
+        self.Server.server_close()
+
+        self.Volume = MisconfiguredVolume(self.Volume.Data, self.SourcePath)
+        self.Server = nornir_volumecontroller.server.Serve(self.Volume, chunk_shape=(32, 32))
+        self.Connection.close()
+        self.Connection = http.client.HTTPConnection(*self.Server.server_address[0:2])
+
+        with self.assertLogs('nornir_volumecontroller.server', level='ERROR'):
+            (response, body) = self.Get('/chunk/0/1/0/0')
+        self.assertEqual(response.status, 500)
+
+    def test_ValidatorsCached(self):
+        self.Server.shutdown()
+        self.Server.server_close()
+
+        (handle, tile_path) = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, tile_path)
+
+        self.Volume = TransformArrayVolume(self.Volume.Data, self.SourcePath, tile_path)
+        self.Server = nornir_volumecontroller.server.Serve(self.Volume, chunk_shape=(32, 32))
+        self.Connection.close()
+        self.Connection = http.client.HTTPConnection(*self.Server.server_address[0:2])
+
+        (response, body) = self.Get('/chunk/0/1/0/0')
+        etag = response.getheader('ETag')
+        for i in range(0, 3):
+            (response, body) = self.Get('/chunk/0/1/0/0', {'If-None-Match': etag})
+            self.assertEqual(response.status, 304)
+
+        self.assertEqual(self.Volume.SourceFileRequests, 1, "Revalidation should not list the source files again")
+
+        # Rewriting a tile changes the validators, without listing the files again
+        stat = os.stat(tile_path)
+        os.utime(tile_path, ns=(stat.st_atime_ns, time.time_ns() + 10 * 1000000000))
+        (response, body) = self.Get('/chunk/0/1/0/0', {'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader('ETag'), etag)
+        self.assertEqual(self.Volume.SourceFileRequests, 1)
+        etag = response.getheader('ETag')
+
+        # Changing the transform lists the files again, the tiles it maps may have changed
+        stat = os.stat(self.SourcePath)
+        os.utime(self.SourcePath, ns=(stat.st_atime_ns, time.time_ns() + 20 * 1000000000))
+        (response, body) = self.Get('/chunk/0/1/0/0', {'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader('ETag'), etag)
+        self.assertEqual(self.Volume.SourceFileRequests, 2)
+
+    def test_LoadTest(self):
+        results = test.loadtest.RunLoadTest(self.Server, num_clients=3, num_requests=20)
+        self.assertEqual(results['requests'], 60)
+        self.assertEqual(set(results['statuses'].keys()) - set(['200', '204', '304']), set())
+        self.assertGreater(results['statuses'].get('304', 0), 0, "Clients revalidate chunks they have seen")
+
+
+class VolumeChunkServerTest(test.synthetic.SyntheticVolumeTestCase):
+
+    def test_ChunkMatchesGetData(self):
+        server = nornir_volumecontroller.server.Serve(self.volumeController, chunk_shape=(64, 64))
+        try:
+            connection = http.client.HTTPConnection(*server.server_address[0:2])
+            connection.request('GET', '/chunk/1/2/1/0')
+            response = connection.getresponse()
+            chunk = numpy.load(io.BytesIO(response.read()))
+            connection.close()
+
+            (region, resolution) = server.ChunkRequest(1, 2.0, 1, 0)
+            expected = self.volumeController.GetData(region, resolution, ['TEM'])
+            self.assertTrue(numpy.array_equal(chunk, expected[:, 0]))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_ConcurrentChunksCoalesced(self):
+        '''Clients requesting the same chunk at once share one assembly of its tiles'''
+        volumeController = nornir_volumecontroller.Volume(self.volumeModel)
+        server = nornir_volumecontroller.server.Serve(volumeController, chunk_shape=(64, 64), max_workers=8)
+        (region, resolution) = server.ChunkRequest(1, 2.0, 1, 0)
+        single = nornir_volumecontroller.Volume(self.volumeModel)
+        single.GetDataSparse(region, resolution, ['TEM'], chunk_shape=(64, 64))
+
+        def Fetch():
+            connection = http.client.HTTPConnection(*server.server_address[0:2])
+            try:
+                connection.request('GET', '/chunk/1/2/1/0')
+                response = connection.getresponse()
+                return (response.status, response.read())
+            finally:
+                connection.close()
+
+        try:
+            # Slow the assembly so every request is in flight at the same time
+            AssembleRegion = nornir_volumecontroller.assemble.AssembleRegion
+            with mock.patch.object(nornir_volumecontroller.assemble, 'AssembleRegion',
+                                   side_effect=lambda *args, **kwargs: time.sleep(0.05) or AssembleRegion(*args, **kwargs)):
+                results = RunConcurrently(Fetch, 8)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(set([status for (status, body) in results]), set([200]))
+        self.assertEqual(len(set([body for (status, body) in results])), 1, "Coalesced requests should serve the same chunk")
+        self.assertEqual(volumeController.Metrics.Counter('tiles_touched'), single.Metrics.Counter('tiles_touched'),
+                         "Identical chunk requests should assemble the tiles once")
+        self.assertGreater(volumeController.Metrics.Counter('coalesced_requests'), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
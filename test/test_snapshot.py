@@ -0,0 +1,88 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import os
+import unittest
+from unittest import mock
+
+import nornir_volumecontroller
+import nornir_volumecontroller.snapshot
+from nornir_volumecontroller.snapshot import VolumeSnapshot, SnapshotPathForVolumeXml
+
+import test.synthetic
+
+
+class VolumeSnapshotTest(test.synthetic.SyntheticVolumeTestCase):
+
+    NumSections = 4
+
+    def tearDown(self):
+        snapshot_path = SnapshotPathForVolumeXml(self.VolumeXML)
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+
+        super(VolumeSnapshotTest, self).tearDown()
+
+    def test_SnapshotRoundTrip(self):
+        built_controller = nornir_volumecontroller.CreateVolumeController(self.VolumeXML, use_snapshot=True)
+        self.assertTrue(os.path.exists(SnapshotPathForVolumeXml(self.VolumeXML)), "Snapshot should be written when none exists")
+
+        loaded_controller = nornir_volumecontroller.CreateVolumeController(self.VolumeXML, use_snapshot=True)
+        self.assertFalse(loaded_controller._volume.IsLoaded, "The model should not be loaded to construct the controller")
+
+        self.assertEqual(loaded_controller.Name, built_controller.Name)
+        self.assertEqual(loaded_controller.Bounds, built_controller.Bounds)
+        self.assertEqual(loaded_controller.Channels, built_controller.Channels)
+        self.assertEqual(sorted(loaded_controller.transform_path_map.keys()), sorted(built_controller.transform_path_map.keys()))
+
+        bounds = loaded_controller.Bounds
+        resolution = loaded_controller.GetHighestResolution(bounds).X * 2.0
+        images = loaded_controller.GetData(bounds, resolution, None)
+        self.assertEqual(images.shape, built_controller.GetOutputShape(bounds, resolution, None))
+        self.assertFalse(loaded_controller._volume.IsLoaded, "Serving data should not require the model")
+
+        # Blocks are loaded from the snapshot on first use
+        self.assertEqual(len(list(loaded_controller._volume.Blocks)), len(list(self.volumeModel.Blocks)))
+
+    def test_TouchedXmlRemainsValid(self):
+        nornir_volumecontroller.CreateVolumeController(self.VolumeXML, use_snapshot=True)
+        snapshot = VolumeSnapshot.Load(SnapshotPathForVolumeXml(self.VolumeXML))
+
+        with open(self.VolumeXML, 'rb') as hFile:
+            contents = hFile.read()
+
+        stat = os.stat(self.VolumeXML)
+        os.utime(self.VolumeXML, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        try:
+            self.assertTrue(snapshot.IsValid(self.VolumeXML), "An unchanged XML should match by content")
+
+            with open(self.VolumeXML, 'ab') as hFile:
+                hFile.write(b'\n')
+
+            self.assertFalse(snapshot.IsValid(self.VolumeXML), "A modified XML should invalidate the snapshot")
+        finally:
+            with open(self.VolumeXML, 'wb') as hFile:
+                hFile.write(contents)
+
+    def test_TouchedXmlStampSaved(self):
+        '''Once a touched XML matches by content, later starts compare its stamp without hashing it'''
+        nornir_volumecontroller.CreateVolumeController(self.VolumeXML, use_snapshot=True)
+
+        stat = os.stat(self.VolumeXML)
+        os.utime(self.VolumeXML, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        try:
+            nornir_volumecontroller.CreateVolumeController(self.VolumeXML, use_snapshot=True)
+
+            snapshot = VolumeSnapshot.Load(SnapshotPathForVolumeXml(self.VolumeXML))
+            with mock.patch.object(nornir_volumecontroller.snapshot, 'FileSHA1', side_effect=AssertionError("The XML should not be hashed")):
+                self.assertTrue(snapshot.IsValid(self.VolumeXML))
+
+            self.assertFalse(snapshot.Modified)
+        finally:
+            os.utime(self.VolumeXML, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+if __name__ == "__main__":
+    unittest.main()
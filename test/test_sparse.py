@@ -0,0 +1,130 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import unittest
+
+import numpy
+
+import nornir_volumecontroller
+from nornir_volumecontroller.cache import ChunkCache
+from nornir_volumecontroller.sparse import SparseVolumeData
+
+from nornir_imageregistration import iBox
+
+import test.synthetic
+
+
+class SparseVolumeDataTest(unittest.TestCase):
+
+    def test_ToDense(self):
+        sparse = SparseVolumeData((1, 2, 10, 7), chunk_shape=(4, 4))
+        self.assertEqual(sparse.GridShape, (3, 2))
+        self.assertEqual(sparse.NumChunks, 12)
+
+        sparse.Set((0, 1, 2, 1), numpy.ones((2, 3), dtype=numpy.float32))
+        valid = numpy.zeros((4, 4), dtype=bool)
+        valid[0:2, :] = True
+        sparse.Set((0, 0, 0, 0), numpy.full((4, 4), 0.5, dtype=numpy.float32), valid)
+
+        dense = sparse.ToDense()
+        expected = numpy.zeros((1, 2, 10, 7), dtype=numpy.float32)
+        expected[0, 1, 8:10, 4:7] = 1
+        expected[0, 0, 0:4, 0:4] = 0.5
+        self.assertTrue(numpy.array_equal(dense, expected))
+
+        mask = sparse.ValidMask()
+        self.assertEqual(int(mask.sum()), 6 + 8)
+        self.assertFalse(mask[0, 0, 2:4, 0:4].any())
+
+        self.assertEqual(list(sparse), [(0, 0, 0, 0), (0, 1, 2, 1)])
+        self.assertIsNone(sparse.Get((0, 0, 1, 1)))
+
+    def test_ConvertsAndCopies(self):
+        sparse = SparseVolumeData((1, 1, 4, 4), dtype=numpy.uint8, chunk_shape=(4, 4))
+        image = numpy.full((4, 4), 1.0, dtype=numpy.float32)
+        sparse.Set((0, 0, 0, 0), image)
+        image.fill(0)
+
+        (data, valid) = sparse.Get((0, 0, 0, 0))
+        self.assertEqual(data.dtype, numpy.uint8)
+        self.assertTrue(numpy.all(data == 255), "Stored chunks should not share memory with the caller's array")
+        self.assertIsNone(valid)
+
+    def test_ShapeMismatch(self):
+        sparse = SparseVolumeData((1, 1, 6, 6), chunk_shape=(4, 4))
+        self.assertRaises(ValueError, sparse.Set, (0, 0, 1, 1), numpy.zeros((4, 4), dtype=numpy.float32))
+        self.assertRaises(ValueError, sparse.ToDense, numpy.zeros((1, 1, 6, 6), dtype=numpy.uint8))
+
+
+class GetDataSparseTest(test.synthetic.SyntheticVolumeTestCase):
+
+    ChunkShape = (64, 64)
+
+    def setUp(self):
+        super(GetDataSparseTest, self).setUp()
+        bounds = self.volumeController.Bounds
+        self.Resolution = self.volumeController.GetHighestResolution(bounds).X
+
+        # Half of the region lies past the right edge of every section
+        width = bounds[iBox.MaxX] - bounds[iBox.MinX]
+        self.Region = list(bounds)
+        self.Region[iBox.MinX] = bounds[iBox.MaxX] - width / 2.0
+        self.Region[iBox.MaxX] = bounds[iBox.MaxX] + width / 2.0
+
+    def test_MatchesGetData(self):
+        sparse = self.volumeController.GetDataSparse(self.Region, self.Resolution, None, chunk_shape=self.ChunkShape)
+        expected = self.volumeController.GetData(self.Region, self.Resolution, None)
+
+        self.assertEqual(sparse.Shape, expected.shape)
+        self.assertTrue(numpy.allclose(sparse.ToDense(), expected, atol=1e-5))
+        self.assertLess(len(sparse), sparse.NumChunks, "Chunks past the edge of the sections should not be stored")
+        self.assertLess(sparse.nbytes, expected.nbytes)
+
+    def test_UnalignedRegionMatchesAlignedCrop(self):
+        '''Sparse chunks of a region between pixels are sampled at the positions of the aligned superset's output pixels'''
+        resolution = self.Resolution * 2.7
+        (superset, region, (row, column)) = test.synthetic.AlignedSuperset(self.volumeController.Bounds, 2.7)
+        expected = self.volumeController.GetData(superset, resolution, None)
+
+        dense = self.volumeController.GetDataSparse(region, resolution, None, chunk_shape=(8, 8)).ToDense()
+        (rows, columns) = dense.shape[2:]
+        self.assertTrue(numpy.allclose(dense, expected[:, :, row:row + rows, column:column + columns], atol=1e-3))
+
+    def test_CoverageMask(self):
+        sparse = self.volumeController.GetDataSparse(self.Region, self.Resolution, None, chunk_shape=self.ChunkShape)
+        mask = sparse.ValidMask()
+
+        (rows, cols) = sparse.Shape[2:]
+        # Sections are offset by a few pixels, so only the middle rows are covered in every section
+        self.assertTrue(mask[:, :, 16:rows - 16, 0].all(), "The left edge of the region is inside the sections")
+        self.assertFalse(mask[:, :, :, cols - 1].any(), "The right edge of the region is past the sections")
+
+    def test_RegionWithoutTiles(self):
+        bounds = self.volumeController.Bounds
+        region = list(bounds)
+        region[iBox.MinX] = bounds[iBox.MaxX] + 100
+        region[iBox.MaxX] = bounds[iBox.MaxX] + 300
+
+        sparse = self.volumeController.GetDataSparse(region, self.Resolution, None, chunk_shape=self.ChunkShape)
+        self.assertEqual(len(sparse), 0)
+        self.assertEqual(sparse.nbytes, 0)
+        self.assertEqual(self.volumeController.Metrics.Counter('tiles_touched'), 0)
+        self.assertEqual(self.volumeController.Metrics.Counter('sparse_section_channels_skipped'), self.NumSections * len(self.Channels))
+
+    def test_ChunkCacheStoresEmptyChunks(self):
+        cache = ChunkCache(chunk_shape=self.ChunkShape)
+        volumeController = nornir_volumecontroller.Volume(self.volumeModel, chunk_cache=cache)
+        data = volumeController.GetData(self.Region, self.Resolution, None)
+
+        expected = self.volumeController.GetData(self.Region, self.Resolution, None)
+        self.assertTrue(numpy.allclose(data, expected, atol=1e-3))
+
+        self.assertGreater(cache.EmptyEntries, 0)
+        self.assertEqual(cache.ResidentBytes, sum([chunk.nbytes for chunk in cache._entries.values()]))
+        self.assertEqual(volumeController.Metrics.Counter('empty_chunks'), cache.EmptyEntries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import unittest
+
+from nornir_volumecontroller import spatial
+
+
+class TileIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        super(TileIndexTest, self).setUp()
+
+        # 10x10 grid of 100 pixel tiles overlapping their neighbors by 10 pixels
+        tile_bounds = {}
+        for iRow in range(0, 10):
+            for iCol in range(0, 10):
+                tile_bounds['%03d_%03d.png' % (iRow, iCol)] = (iRow * 90, iCol * 90, iRow * 90 + 100, iCol * 90 + 100)
+
+        self.TileBounds = tile_bounds
+        self.Index = spatial.TileIndex(tile_bounds)
+
+    def BruteForce(self, region):
+        return sorted([name for (name, b) in self.TileBounds.items()
+                       if b[0] < region[2] and b[2] > region[0] and b[1] < region[3] and b[3] > region[1]])
+
+    def test_SmallRegion(self):
+        region = (150, 150, 160, 160)
+        self.assertEqual(sorted(self.Index.Intersecting(region)), ['001_001.png'])
+
+    def test_OverlapRegion(self):
+        region = (185, 185, 195, 195)
+        self.assertEqual(sorted(self.Index.Intersecting(region)), self.BruteForce(region))
+        self.assertEqual(len(self.Index.Intersecting(region)), 4)
+
+    def test_MatchesBruteForce(self):
+        for region in [(0, 0, 910, 910), (-50, -50, 10, 10), (450, 20, 460, 800), (1000, 1000, 1100, 1100)]:
+            self.assertEqual(sorted(self.Index.Intersecting(region)), self.BruteForce(region), "Index disagrees for region %s" % str(region))
+
+
+class ChunkGridTest(unittest.TestCase):
+
+    def test_ChunksInRegion(self):
+        chunks = list(spatial.ChunksInRegion((5, 0, 20, 16), (8, 8)))
+        self.assertEqual(chunks, [(0, 0), (0, 1), (1, 0), (1, 1), (2, 0), (2, 1)])
+
+    def test_ChunkRegion(self):
+        self.assertEqual(list(spatial.ChunkRegion((1, 2), (8, 8), 4)), [32, 64, 64, 96])
+
+    def test_PixelRegion(self):
+        self.assertEqual(spatial.PixelRegion((10, 0, 30, 17), 4), (2, 0, 8, 5))
+
+    def test_SnapRegion(self):
+        snapped = spatial.SnapRegion((10.3, 0.5, 30.1, 17), 4)
+        self.assertEqual(list(snapped), [8, 0, 32, 20])
+        self.assertEqual(spatial.PixelShape(snapped, 4), (6, 5))
+        self.assertEqual(list(spatial.SnapRegion(snapped, 4)), list(snapped), "Snapping is idempotent")
+
+        # Rounding errors of fractional levels do not add a pixel
+        self.assertEqual(spatial.PixelRegion(spatial.SnapRegion((0.35, 0, 0.61, 0.1), 0.1), 0.1), (3, 0, 7, 1))
+
+
+
+class ClusterRegionsTest(unittest.TestCase):
+
+    def test_OverlappingRegionsClustered(self):
+        regions = [(0, 0, 100, 100), (50, 50, 150, 150), (500, 500, 600, 600), (40, 40, 120, 120)]
+        self.assertEqual(sorted(spatial.ClusterOverlappingRegions(regions, 1)), [[0, 1, 3], [2]])
+
+    def test_WastefulUnionNotClustered(self):
+        # Touching corners would make the union far larger than the regions
+        regions = [(0, 0, 100, 100), (99, 99, 1000, 1000)]
+        self.assertEqual(sorted(spatial.ClusterOverlappingRegions(regions, 1)), [[0], [1]])
+
+    def test_UnionPixelRegion(self):
+        union = spatial.UnionPixelRegion([(0, 1, 5, 6), (2, 0, 8, 3)], 2.0)
+        self.assertEqual(list(union), [0, 0, 16, 12])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+'''
+Created on Oct 18, 2026
+
+@author: u0490822
+'''
+import asyncio
+import json
+import unittest
+
+import numpy
+
+import nornir_volumecontroller
+from nornir_volumecontroller.asyncio_volume import AsyncVolume
+from nornir_imageregistration import iBox
+
+import test.benchmark
+import test.synthetic
+
+
+class SyntheticVolumeTest(test.synthetic.SyntheticVolumeTestCase):
+
+    Channels = ('GABA', 'TEM')
+
+    def test_Load(self):
+        self.assertEqual(self.volumeController.Channels, set(self.Channels))
+        self.assertEqual(sorted(self.volumeController.transform_path_map.keys()), list(range(1, self.NumSections + 1)))
+
+    def test_Bounds(self):
+        bounds = self.volumeController.Bounds
+        self.assertEqual(bounds[iBox.MinZ], 1)
+        self.assertEqual(bounds[iBox.MaxZ], self.NumSections)
+
+        # Tiles overlap, so the mosaic is smaller than the sum of the tiles but larger than one tile
+        height = bounds[iBox.MaxY] - bounds[iBox.MinY]
+        self.assertGreater(height, self.TileShape[0])
+        self.assertLessEqual(height, self.GridShape[0] * self.TileShape[0] + 16)
+
+    def test_GetData(self):
+        bounds = self.volumeController.Bounds
+        resolution = self.volumeController.GetHighestResolution(bounds).X * 2.0
+
+        images = self.volumeController.GetData(bounds, resolution, None)
+        self.assertEqual(images.shape, self.volumeController.GetOutputShape(bounds, resolution, None))
+        self.assertEqual(images.shape[0], len(self.Channels))
+        self.assertGreater(images.max(), 0, "Synthetic tiles should produce non-empty images")
+
+    def test_FractionalResolution(self):
+        bounds = self.volumeController.Bounds
+        max_resolution = self.volumeController.GetHighestResolution(bounds).X
+
+        for downsample in [1.5, 3.0, 5.5]:
+            resolution = max_resolution * downsample
+            images = self.volumeController.GetData(bounds, resolution, None)
+            self.assertEqual(images.shape, self.volumeController.GetOutputShape(bounds, resolution, None),
+                             "Downsample %g should produce the requested size" % downsample)
+
+        # Level 2 is the coarsest level meeting a downsample of 3 and should read fewer tile bytes than level 1
+        self.volumeController.Metrics.Reset()
+        self.volumeController.GetData(bounds, max_resolution * 3.0, None)
+        level_2_bytes = self.volumeController.Metrics.Counter('tile_bytes_read')
+
+        self.volumeController.Metrics.Reset()
+        self.volumeController.GetData(bounds, max_resolution, None)
+        level_1_bytes = self.volumeController.Metrics.Counter('tile_bytes_read')
+
+        self.assertLess(level_2_bytes, level_1_bytes)
+
+    def test_AsyncMatchesGetData(self):
+        '''The asyncio front end assembles through the same section pipeline, fusing channels and recording metrics'''
+        bounds = self.volumeController.Bounds
+        resolution = self.volumeController.GetHighestResolution(bounds).X * 2.0
+        asyncVolume = AsyncVolume(self.volumeController, max_concurrency=2)
+
+        images = asyncio.run(asyncVolume.GetData(bounds, resolution, None))
+        self.assertEqual(self.volumeController.Metrics.Counter('requests'), 1)
+        self.assertEqual(self.volumeController.Metrics.Counter('section_channels'), self.NumSections * len(self.Channels))
+        self.assertEqual(self.volumeController.Metrics.Counter('fused_channels'), self.NumSections, "Channels with identical transforms should be fused")
+        self.assertIn('GetData', self.volumeController.Metrics.Snapshot()['stages'])
+
+        expected = self.volumeController.GetData(bounds, resolution, None)
+        self.assertTrue(numpy.array_equal(expected, images))
+
+    def test_ChunkCacheMatchesUnalignedRegion(self):
+        '''Regions between pixel edges are assembled on the pixel grid of the level with or without a chunk cache'''
+        region = test.synthetic.UnalignedRegion(self.volumeController.Bounds)
+        max_resolution = self.volumeController.GetHighestResolution(None).X
+
+        for downsample in [1.0, 2.0, 2.7]:
+            resolution = max_resolution * downsample
+            expected = self.volumeController.GetData(region, resolution, None)
+
+            cachedController = nornir_volumecontroller.Volume(self.volumeModel, chunk_cache=nornir_volumecontroller.ChunkCache(chunk_shape=(64, 64)))
+            images = cachedController.GetData(region, resolution, None)
+            self.assertTrue(numpy.array_equal(expected, images), "Downsample %g differs with a chunk cache" % downsample)
+
+    def test_UnalignedRegionMatchesAlignedCrop(self):
+        '''A region between the pixels of the level is sampled at the positions of the aligned superset's output pixels'''
+        max_resolution = self.volumeController.GetHighestResolution(None).X
+
+        for downsample in [1.35, 2.7]:
+            (superset, region, (row, column)) = test.synthetic.AlignedSuperset(self.volumeController.Bounds, downsample)
+            expected = self.volumeController.GetData(superset, max_resolution * downsample, None)
+            images = self.volumeController.GetData(region, max_resolution * downsample, None)
+
+            (rows, columns) = images.shape[2:]
+            self.assertTrue(numpy.allclose(expected[:, :, row:row + rows, column:column + columns], images, atol=1e-3),
+                            "Downsample %g is not a crop of the aligned superset" % downsample)
+
+
+class BenchmarkTest(test.synthetic.SyntheticVolumeTestCase):
+
+    def test_Benchmark(self):
+        results = test.benchmark.RunBenchmarks(self.VolumeXML, repeat=1)
+        for name in ['Load_Xml', 'BuildVolumeTransformMap', 'Bounds', 'GetHighestResolution', 'GetData_Small', 'GetData_Volume']:
+            self.assertIn(name, results)
+            self.assertGreater(results[name]['cold']['median_seconds'], 0)
+
+        self.assertIn('megapixels_per_second', results['GetData_Volume']['warm'])
+
+        # Results must be serializable so runs can be compared
+        json.dumps(results)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,15 +3,20 @@ Created on Apr 15, 2014
 
 @author: u0490822
 '''
+import asyncio
+import concurrent.futures
 import os
 import unittest
 
+import numpy
+
 import nornir_imageregistration
 import nornir_volumecontroller
 import nornir_volumemodel
 import test.test_base
 
 import nornir_volumecontroller.spatial
+from nornir_volumecontroller.asyncio_volume import AsyncVolume
 
 from nornir_imageregistration import iBox
 
@@ -65,7 +70,8 @@ class Test(test.test_base.PlatformTest):
 
         images = self.volumeController.GetData(bounds, max_res_scale.X * 16.0, self.volumeController.Channels)
         self.assertIsNotNone(images)
-        nornir_imageregistration.core.ShowGrayscale(images.values())
+        self.assertEqual(images.shape, self.volumeController.GetOutputShape(bounds, max_res_scale.X * 16.0, self.volumeController.Channels))
+        nornir_imageregistration.core.ShowGrayscale(list(images[0]))
 
     def test_SmallHighResRegionImageServing(self):
         bounds = self.volumeController.Bounds
@@ -83,7 +89,136 @@ class Test(test.test_base.PlatformTest):
 
         images = self.volumeController.GetData(smaller_bounds, max_res_scale.X * 16.0, self.volumeController.Channels)
         self.assertIsNotNone(images)
-        nornir_imageregistration.core.ShowGrayscale(images.values())
+        self.assertEqual(images.ndim, 4, "GetData should return a Channel,Z,Y,X array")
+        nornir_imageregistration.core.ShowGrayscale(list(images[0]))
+
+    def test_ParallelImageServing(self):
+        bounds = self.volumeController.Bounds
+        max_res_scale = self.volumeController.GetHighestResolution(bounds)
+        resolution = max_res_scale.X * 16.0
+
+        serial_images = self.volumeController.GetData(bounds, resolution, self.volumeController.Channels)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            parallelController = nornir_volumecontroller.CreateVolumeController(self.volumeModel, executor=executor, max_inflight_sections=2)
+            parallel_images = parallelController.GetData(bounds, resolution, self.volumeController.Channels)
+
+        self.assertTrue(numpy.array_equal(serial_images, parallel_images), "Parallel assembly does not match serial assembly")
+
+    def test_Manifest(self):
+        VolumeXML = os.path.join(self.ImportedDataPath, 'VolumeData.xml')
+        manifest_path = os.path.join(self.TestOutputPath, 'VolumeController.manifest.json')
+
+        built_controller = nornir_volumecontroller.CreateVolumeController(VolumeXML, manifest_path=manifest_path)
+        self.assertTrue(os.path.exists(manifest_path), "Manifest should be written when none exists")
+
+        loaded_controller = nornir_volumecontroller.CreateVolumeController(VolumeXML, manifest_path=manifest_path)
+        self.assertIsNotNone(loaded_controller.Manifest)
+
+        self.assertEqual(loaded_controller.Bounds, built_controller.Bounds)
+        self.assertEqual(loaded_controller.Channels, built_controller.Channels)
+        self.assertEqual(sorted(loaded_controller.transform_path_map.keys()), sorted(self.volumeController.transform_path_map.keys()))
+
+        self.assertTrue(loaded_controller.Manifest.IsValid())
+        stat = os.stat(VolumeXML)
+        os.utime(VolumeXML, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        try:
+            self.assertFalse(loaded_controller.Manifest.IsValid(), "Manifest should be invalidated when the volume changes")
+        finally:
+            os.utime(VolumeXML, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    def test_ChunkCacheImageServing(self):
+        bounds = self.volumeController.Bounds
+        max_res_scale = self.volumeController.GetHighestResolution(bounds)
+        level = 4
+        resolution = max_res_scale.X * level
+
+        # Align the region to the pixel grid of the level so chunked and whole-region assembly sample identical points
+        region = [bounds[iBox.MinZ],
+                  (bounds[iBox.MaxY] // (2 * level)) * level,
+                  (bounds[iBox.MaxX] // (2 * level)) * level,
+                  bounds[iBox.MinZ] + 1,
+                  (bounds[iBox.MaxY] // (2 * level)) * level + 1000 * level,
+                  (bounds[iBox.MaxX] // (2 * level)) * level + 1000 * level]
+
+        uncached_images = self.volumeController.GetData(region, resolution, self.volumeController.Channels)
+
+        chunk_cache = nornir_volumecontroller.ChunkCache(chunk_shape=(256, 256))
+        cachedController = nornir_volumecontroller.CreateVolumeController(self.volumeModel, chunk_cache=chunk_cache)
+        cold_images = cachedController.GetData(region, resolution, self.volumeController.Channels)
+        self.assertGreater(chunk_cache.Misses, 0)
+        self.assertEqual(chunk_cache.Hits, 0)
+
+        warm_images = cachedController.GetData(region, resolution, self.volumeController.Channels)
+        self.assertGreater(chunk_cache.Hits, 0, "Repeated request should be served from the chunk cache")
+
+        self.assertEqual(uncached_images.tobytes(), cold_images.tobytes(), "Chunked assembly does not match whole region assembly")
+        self.assertEqual(cold_images.tobytes(), warm_images.tobytes(), "Cached chunks do not match the assembled chunks")
+
+    def test_OutputBuffer(self):
+        bounds = self.volumeController.Bounds
+        resolution = self.volumeController.GetHighestResolution(bounds).X * 16.0
+        channels = self.volumeController.Channels
+
+        shape = self.volumeController.GetOutputShape(bounds, resolution, channels)
+        self.assertEqual(shape[0], len(channels))
+        self.assertEqual(shape[1], bounds[iBox.MaxZ] - bounds[iBox.MinZ] + 1)
+
+        expected = self.volumeController.GetData(bounds, resolution, channels)
+
+        out = numpy.full(shape, 7, dtype=numpy.float32)
+        result = self.volumeController.GetData(bounds, resolution, channels, out=out)
+        self.assertIs(result, out, "GetData should return the buffer it was passed")
+        self.assertTrue(numpy.array_equal(expected, out), "Reused buffer should not contain stale values")
+
+        wrong_shape = numpy.zeros((shape[0], shape[1], shape[2] + 1, shape[3]), dtype=numpy.float32)
+        self.assertRaises(ValueError, self.volumeController.GetData, bounds, resolution, channels, out=wrong_shape)
+
+    def test_IterData(self):
+        bounds = self.volumeController.Bounds
+        resolution = self.volumeController.GetHighestResolution(bounds).X * 16.0
+        channels = self.volumeController.Channels
+
+        expected = self.volumeController.GetData(bounds, resolution, channels)
+
+        for prefetch in [False, True]:
+            slabs = list(self.volumeController.IterData(bounds, resolution, channels, slab_depth=2, prefetch=prefetch))
+            self.assertEqual(slabs[0][0][0], bounds[iBox.MinZ])
+            self.assertEqual(slabs[-1][0][1], bounds[iBox.MaxZ])
+
+            for ((minZ, maxZ), slab) in slabs:
+                self.assertLessEqual(slab.shape[1], 2, "Slab should not exceed the requested depth")
+                self.assertEqual(slab.shape[1], maxZ - minZ + 1)
+
+            combined = numpy.concatenate([slab for (z_range, slab) in slabs], axis=1)
+            self.assertTrue(numpy.array_equal(expected, combined), "Slabs should match the data of a single request")
+
+    def test_AsyncImageServing(self):
+        asyncVolume = AsyncVolume(self.volumeController, max_concurrency=2)
+
+        async def Request():
+            bounds = await asyncVolume.Bounds()
+            max_res_scale = await asyncVolume.GetHighestResolution(bounds)
+            resolution = max_res_scale.X * 16.0
+            images = await asyncVolume.GetData(bounds, resolution, self.volumeController.Channels)
+            return (bounds, resolution, images)
+
+        (bounds, resolution, images) = asyncio.run(Request())
+        expected = self.volumeController.GetData(bounds, resolution, self.volumeController.Channels)
+        self.assertTrue(numpy.array_equal(expected, images), "Async GetData should match synchronous GetData")
+
+    def test_AsyncCancellation(self):
+        asyncVolume = AsyncVolume(self.volumeController, max_concurrency=1)
+        bounds = self.volumeController.Bounds
+        resolution = self.volumeController.GetHighestResolution(bounds).X * 4.0
+
+        async def CancelRequest():
+            task = asyncio.ensure_future(asyncVolume.GetData(bounds, resolution, self.volumeController.Channels))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await task
+
+        self.assertRaises(asyncio.CancelledError, asyncio.run, CancelRequest())
 
 
 if __name__ == "__main__":